@@ -6,13 +6,15 @@ const router = express.Router();
 
 // Scrape Reddit posts
 router.post('/', (req, res) => {
-  const { redditUrl, numPosts, sortBy } = req.body;
+  const { redditUrl, numPosts, sortBy, stream } = req.body;
 
   if (!redditUrl) {
     return res.status(400).json({ error: 'Reddit URL is required' });
   }
 
-  const pythonScript = path.join(__dirname, '..', '..', '..', 'video-processor', 'reddit_scraper.py');
+  // REDDIT_ASYNC_SCRAPER=1 switches to the concurrent httpx scraper (same output format)
+  const scraperScript = process.env.REDDIT_ASYNC_SCRAPER === '1' ? 'async_reddit_scraper.py' : 'reddit_scraper.py';
+  const pythonScript = path.join(__dirname, '..', '..', '..', 'video-processor', scraperScript);
   
   const scriptArgs = [
     pythonScript,
@@ -21,6 +23,10 @@ router.post('/', (req, res) => {
     '--sort-by', sortBy || 'hot'
   ];
 
+  if (stream) {
+    return streamScrape(scriptArgs, res);
+  }
+
   const pythonProcess = spawn('python', scriptArgs);
 
   let resultData = '';
@@ -56,4 +62,44 @@ router.post('/', (req, res) => {
   });
 });
 
+// Streams the scraper's JSON-lines records to the client as NDJSON as soon as
+// each post is scraped. The last record is {type: 'summary'} or {type: 'error'}.
+function streamScrape(scriptArgs, res) {
+  const pythonProcess = spawn('python', [...scriptArgs, '--stream']);
+  let sawFinalRecord = false;
+  let buffer = '';
+  let errorData = '';
+
+  res.setHeader('Content-Type', 'application/x-ndjson');
+
+  pythonProcess.stdout.on('data', (data) => {
+    buffer += data.toString();
+    const lines = buffer.split('\n');
+    // Keep last line fragment
+    buffer = lines.pop();
+    lines.forEach((line) => {
+      if (!line.trim()) return;
+      if (line.startsWith('{"type":"summary"') || line.startsWith('{"type":"error"')) {
+        sawFinalRecord = true;
+      }
+      res.write(`${line}\n`);
+    });
+  });
+
+  pythonProcess.stderr.on('data', (data) => {
+    errorData += data.toString();
+  });
+
+  pythonProcess.on('close', (code) => {
+    if (code !== 0) {
+      console.error(`Scraping script exited with code ${code}`);
+      console.error(errorData);
+    }
+    if (!sawFinalRecord) {
+      res.write(`${JSON.stringify({ type: 'error', message: 'Failed to scrape Reddit posts.', details: errorData })}\n`);
+    }
+    res.end();
+  });
+}
+
 module.exports = router; 
\ No newline at end of file
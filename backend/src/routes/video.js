@@ -4,6 +4,7 @@ const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
 const { createJob, updateJob, getJob } = require('../utils/database');
+const { isWorkerEnabled, submitJob } = require('../utils/videoWorker');
 
 const router = express.Router();
 
@@ -223,6 +224,41 @@ async function generateVideoFromText(jobId, config) {
     const tempTextFile = path.join(outputDir, `${jobId}_text.txt`);
     fs.writeFileSync(tempTextFile, fullTextForScript);
 
+    if (isWorkerEnabled()) {
+      // Hand the job to the persistent worker instead of a fresh process
+      submitJob({
+        job_id: jobId,
+        text_file: tempTextFile,
+        voice_type: config.voiceType,
+        background_type: config.backgroundType,
+        output_path: outputPath
+      }, {
+        onProgress: (progress) => updateJob(jobId, { progress }),
+        onDone: async () => {
+          if (fs.existsSync(tempTextFile)) {
+            fs.unlinkSync(tempTextFile);
+          }
+          console.log(`Video generation from text for job ${jobId} successful.`);
+          await updateJob(jobId, {
+            status: 'completed',
+            progress: 100,
+            videoUrl: `/output/${newFilename}`
+          });
+        },
+        onError: async (message) => {
+          if (fs.existsSync(tempTextFile)) {
+            fs.unlinkSync(tempTextFile);
+          }
+          console.error(`Video worker failed job ${jobId}: ${message}`);
+          await updateJob(jobId, {
+            status: 'failed',
+            error: `Video generation failed: ${message}`
+          });
+        }
+      });
+      return;
+    }
+
     // Spawn Python process
     const pythonProcess = spawn('python', [
       pythonScript,
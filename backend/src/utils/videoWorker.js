@@ -0,0 +1,78 @@
+const { spawn } = require('child_process');
+const path = require('path');
+
+// Persistent Python worker that keeps Whisper/TTS/MoviePy loaded between jobs.
+// Enabled with VIDEO_WORKER_DAEMON=1; VIDEO_WORKERS sets the process count.
+const WORKER_SCRIPT = path.join(__dirname, '..', '..', '..', 'video-processor', 'worker_daemon.py');
+
+let workerProcess = null;
+let stdoutBuffer = '';
+const jobHandlers = new Map();
+
+function isWorkerEnabled() {
+  return process.env.VIDEO_WORKER_DAEMON === '1';
+}
+
+function handleLine(line) {
+  // Lines look like KIND:<jobId>:<payload>
+  const match = line.match(/^(PROGRESS|ERROR|DONE):([^:]*):(.*)$/);
+  if (!match) {
+    return;
+  }
+  const [, kind, jobId, payload] = match;
+  const handlers = jobHandlers.get(jobId);
+  if (!handlers) {
+    return;
+  }
+
+  if (kind === 'PROGRESS') {
+    handlers.onProgress(parseInt(payload));
+  } else if (kind === 'DONE') {
+    jobHandlers.delete(jobId);
+    handlers.onDone(payload);
+  } else {
+    jobHandlers.delete(jobId);
+    handlers.onError(payload);
+  }
+}
+
+function startWorker() {
+  const workers = process.env.VIDEO_WORKERS || '1';
+  workerProcess = spawn('python', ['-u', WORKER_SCRIPT, '--workers', workers], {
+    cwd: path.dirname(WORKER_SCRIPT)
+  });
+
+  workerProcess.stdout.on('data', (data) => {
+    stdoutBuffer += data.toString();
+    const lines = stdoutBuffer.split('\n');
+    // Keep last line fragment
+    stdoutBuffer = lines.pop();
+    lines.forEach((line) => handleLine(line.trim()));
+  });
+
+  workerProcess.stderr.on('data', (data) => {
+    console.error(`[VIDEO WORKER] ${data.toString()}`);
+  });
+
+  workerProcess.on('close', (code) => {
+    console.error(`Video worker daemon exited with code ${code}`);
+    workerProcess = null;
+    stdoutBuffer = '';
+    // Fail anything still in flight; the next job restarts the daemon
+    for (const [jobId, handlers] of jobHandlers) {
+      handlers.onError(`Video worker exited with code ${code}`);
+      jobHandlers.delete(jobId);
+    }
+  });
+}
+
+// Submit a job to the persistent worker. Handlers: onProgress, onDone, onError.
+function submitJob(job, handlers) {
+  if (!workerProcess) {
+    startWorker();
+  }
+  jobHandlers.set(job.job_id, handlers);
+  workerProcess.stdin.write(`${JSON.stringify(job)}\n`);
+}
+
+module.exports = { isWorkerEnabled, submitJob };
@@ -0,0 +1,143 @@
+"""
+Per-job store of intermediate pipeline artifacts, for resuming failed jobs.
+
+Every stage writes its output under temp/artifacts/<job_id>/ as
+<stage>-<hash of the stage inputs><suffix>. A rerun of the same job
+computes the same hashes, finds the outputs of the stages that already
+finished and skips them, so a crash late in the render no longer costs the
+TTS and transcription work. Stages chain their keys (the captions key
+includes the audio key, and so on), so changing an input invalidates every
+artifact downstream of it.
+
+Garbage collection works on whole jobs. A job directory is removed once
+nothing in it has been used for ARTIFACT_MAX_AGE_HOURS; beyond that, only
+jobs that finished (see finish()) are evicted to stay under ARTIFACT_MAX_MB,
+least recently used first. Running jobs and failed jobs waiting to be
+resumed are never evicted for space.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from utils.disk_cache import DiskCache
+from utils.logger import setup_logger
+
+ARTIFACT_DIR = Path(__file__).parent / 'temp' / 'artifacts'
+ARTIFACT_MAX_BYTES = int(os.getenv('ARTIFACT_MAX_MB', '4096')) * 1024 * 1024
+ARTIFACT_MAX_AGE = int(os.getenv('ARTIFACT_MAX_AGE_HOURS', '72')) * 3600
+
+# Markers in a job's directory: touched when an attempt starts, and once the job has produced its video
+RUNNING_MARKER = '.running'
+DONE_MARKER = '.done'
+
+
+class ArtifactStore:
+    def __init__(
+        self,
+        root: Union[str, Path] = ARTIFACT_DIR,
+        max_bytes: int = ARTIFACT_MAX_BYTES,
+        max_age: float = ARTIFACT_MAX_AGE
+    ):
+        self.logger = setup_logger('artifact_store')
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    @staticmethod
+    def make_key(stage: str, *inputs) -> str:
+        """Key of a stage output: the stage name plus a hash of everything it depends on."""
+        return f"{stage}-{DiskCache.make_key(stage, *inputs)[:32]}"
+
+    def job(self, job_id: str) -> DiskCache:
+        """
+        The artifact directory of one job, as a DiskCache (atomic writes,
+        reads refresh mtimes). Its size limit is enforced by gc(), not evict().
+        """
+        safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', str(job_id)) or '_'
+        return DiskCache(self.root / safe_id, self.max_bytes)
+
+    def begin(self, job_id: str):
+        """
+        Marks an attempt of a job as started: the job counts as just used
+        and is not evicted for space until finish().
+        """
+        job_dir = self.job(job_id).cache_dir
+        (job_dir / DONE_MARKER).unlink(missing_ok=True)
+        (job_dir / RUNNING_MARKER).touch()
+
+    def finish(self, job_id: str):
+        """Marks a job as finished; its artifacts become evictable for space."""
+        job_dir = self.job(job_id).cache_dir
+        (job_dir / DONE_MARKER).touch()
+        (job_dir / RUNNING_MARKER).unlink(missing_ok=True)
+
+    def contains(self, path: Union[str, Path]) -> bool:
+        """Whether a path points into this store (so its owner must not delete it)."""
+        try:
+            Path(path).resolve().relative_to(self.root.resolve())
+            return True
+        except ValueError:
+            return False
+
+    def get_json(self, job_id: str, key: str) -> Optional[Dict]:
+        """Returns a JSON artifact, or None if it is missing or unreadable."""
+        path = self.job(job_id).get(key, '.json')
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable artifact {path}: {e}")
+            return None
+
+    def put_json(self, job_id: str, key: str, data: Dict) -> Path:
+        return self.job(job_id).put_bytes(key, '.json', json.dumps(data).encode('utf-8'))
+
+    def remove_job(self, job_id: str):
+        """Deletes every artifact of a job."""
+        shutil.rmtree(self.job(job_id).cache_dir, ignore_errors=True)
+
+    def _scan(self) -> List[Tuple[float, int, bool, Path]]:
+        """(last use, size, finished, directory) of every job directory."""
+        jobs = []
+        for job_dir in self.root.iterdir():
+            if not job_dir.is_dir():
+                continue
+            newest, size = 0.0, 0
+            for dirpath, _, filenames in os.walk(job_dir):
+                for name in filenames:
+                    try:
+                        stat = (Path(dirpath) / name).stat()
+                    except FileNotFoundError:
+                        continue
+                    newest = max(newest, stat.st_mtime)
+                    size += stat.st_size
+            jobs.append((newest, size, (job_dir / DONE_MARKER).is_file(), job_dir))
+        return jobs
+
+    def gc(self, now: Optional[float] = None) -> int:
+        """
+        Removes jobs unused for longer than max_age, then finished jobs,
+        least recently used first, until the store fits in max_bytes.
+
+        Returns:
+            Number of bytes freed.
+        """
+        now = time.time() if now is None else now
+        jobs = sorted(self._scan())
+        total = sum(size for _, size, _, _ in jobs)
+        freed = 0
+        for newest, size, finished, job_dir in jobs:
+            expired = now - newest > self.max_age
+            if expired or (finished and total - freed > self.max_bytes):
+                shutil.rmtree(job_dir, ignore_errors=True)
+                freed += size
+        if freed:
+            self.logger.info(f"Garbage-collected {freed / (1024 * 1024):.1f} MB of old artifacts")
+        return freed
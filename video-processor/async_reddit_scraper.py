@@ -0,0 +1,375 @@
+"""
+Asynchronous Reddit scraper for bulk scraping.
+
+Talks to Reddit's JSON endpoints over one pooled keep-alive httpx client:
+listing pages are followed in order, while the comment trees of the posts
+already found are fetched concurrently. Every request goes through a shared
+rate limiter. Returns the same post dictionaries as RedditScraper.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from dotenv import load_dotenv
+from crawl_state import CrawlState, reached_mark
+from utils.logger import setup_logger
+
+# Load environment variables from a .env file at the project root
+dotenv_path = Path(__file__).parent.parent / '.env'
+load_dotenv(dotenv_path=dotenv_path)
+
+PUBLIC_BASE_URL = 'https://www.reddit.com'
+OAUTH_BASE_URL = 'https://oauth.reddit.com'
+TOKEN_URL = 'https://www.reddit.com/api/v1/access_token'
+
+# Reddit allows 100 requests per minute for OAuth clients, averaged over a
+# window of several minutes, so a full minute's worth may be sent at once
+REDDIT_REQUESTS_PER_MINUTE = int(os.getenv('REDDIT_REQUESTS_PER_MINUTE', '100'))
+LISTING_PAGE_SIZE = 100
+MAX_RETRIES = 3
+
+
+class RateLimiter:
+    """
+    Token bucket: up to `burst` requests start at once, after which requests
+    are spaced to average `per_minute`.
+    """
+
+    def __init__(self, per_minute: int, burst: Optional[int] = None):
+        self.rate = max(per_minute, 1) / 60.0
+        self.burst = burst if burst is not None else max(per_minute, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going into debt reserves this caller's slot; it waits for the debt to refill
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AsyncRedditScraper:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        requests_per_minute: int = REDDIT_REQUESTS_PER_MINUTE,
+        max_connections: int = 16,
+        include_comments: bool = True,
+        num_comments: int = 5
+    ):
+        """
+        Args:
+            base_url: Server to scrape, e.g. a local stub server in tests.
+                Defaults to REDDIT_BASE_URL, else the OAuth API when Reddit
+                credentials are configured, else the public site.
+            requests_per_minute: Rate limit shared by all requests
+            max_connections: Size of the keep-alive connection pool
+            include_comments: Fetch the top comments of every post
+            num_comments: Number of top comments to keep per post
+        """
+        self.logger = setup_logger('async_reddit_scraper')
+        self.base_url = base_url or os.getenv('REDDIT_BASE_URL')
+        self.requests_per_minute = requests_per_minute
+        self.max_connections = max_connections
+        self.include_comments = include_comments
+        self.num_comments = num_comments
+        self.user_agent = os.getenv('REDDIT_USER_AGENT', 'RedditStoryGenerator/1.0')
+        self.client_id = os.getenv('REDDIT_CLIENT_ID')
+        self.client_secret = os.getenv('REDDIT_CLIENT_SECRET')
+
+    def scrape_posts(
+        self,
+        reddit_url: str,
+        num_posts: int = 5,
+        sort_method: str = 'hot',
+        since_last_run: bool = False,
+        on_post: Optional[Callable[[Dict], None]] = None
+    ) -> List[Dict]:
+        """Synchronous wrapper around scrape_posts_async."""
+        return asyncio.run(self.scrape_posts_async(reddit_url, num_posts, sort_method, since_last_run, on_post))
+
+    async def scrape_posts_async(
+        self,
+        reddit_url: str,
+        num_posts: int = 5,
+        sort_method: str = 'hot',
+        since_last_run: bool = False,
+        on_post: Optional[Callable[[Dict], None]] = None
+    ) -> List[Dict]:
+        """
+        Scrape Reddit posts from a given URL
+
+        Args:
+            reddit_url: Reddit URL (post or subreddit)
+            num_posts: Number of posts to scrape
+            sort_method: Sort method for subreddit posts ('hot', 'new', 'top', 'rising', 'controversial')
+            since_last_run: Only return subreddit posts that earlier
+                since_last_run scrapes haven't returned (see CrawlState)
+            on_post: Optional callback receiving each post as soon as it is
+                complete (in completion order, comments included). Posts
+                handed to it are not collected, so memory stays constant.
+
+        Returns:
+            List of post dictionaries with text content (and 'comments' when
+            include_comments is set); empty when on_post is given
+        """
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(
+            headers={'User-Agent': self.user_agent},
+            limits=limits,
+            timeout=30.0,
+            follow_redirects=True
+        ) as client:
+            self._client = client
+            self._limiter = RateLimiter(self.requests_per_minute)
+            try:
+                await self._authenticate()
+                if '/comments/' in reddit_url:
+                    post = await self._scrape_single_post(reddit_url)
+                    if post and on_post:
+                        on_post(post)
+                    return [post] if post else []
+                return await self._scrape_subreddit_posts(reddit_url, num_posts, sort_method, since_last_run, on_post)
+            except Exception as e:
+                self.logger.error(f'Error scraping Reddit: {str(e)}')
+                raise
+
+    async def _authenticate(self):
+        """Uses an application-only OAuth token when credentials are available."""
+        if self.base_url:
+            return
+        if not (self.client_id and self.client_secret):
+            self.base_url = PUBLIC_BASE_URL
+            return
+
+        response = await self._client.post(
+            TOKEN_URL,
+            data={'grant_type': 'client_credentials'},
+            auth=(self.client_id, self.client_secret)
+        )
+        response.raise_for_status()
+        token = response.json()['access_token']
+        self._client.headers['Authorization'] = f'bearer {token}'
+        self.base_url = OAUTH_BASE_URL
+
+    async def _get_json(self, path: str, params: Optional[Dict] = None):
+        """GETs a JSON endpoint, waiting for the rate limiter and retrying 429/5xx responses."""
+        url = f"{self.base_url.rstrip('/')}{path}"
+        for attempt in range(1, MAX_RETRIES + 1):
+            await self._limiter.wait()
+            response = await self._client.get(url, params={**(params or {}), 'raw_json': 1})
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == MAX_RETRIES:
+                    response.raise_for_status()
+                retry_after = float(response.headers.get('Retry-After', 2 ** attempt))
+                self.logger.warning(f'{url} returned {response.status_code}; retrying in {retry_after:.0f}s')
+                await asyncio.sleep(retry_after)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    @staticmethod
+    def _post_from_data(data: Dict) -> Dict:
+        return {
+            'id': data['id'],
+            'title': data['title'],
+            'text': data.get('selftext') or data['title'],
+            'score': data.get('score', 0),
+            'created_utc': data.get('created_utc'),
+            'url': data.get('permalink'),
+            'subreddit': data.get('subreddit')
+        }
+
+    def _top_comments(self, listing: Dict) -> List[str]:
+        """Top-level comment bodies, skipping 'load more' stubs like replace_more(limit=0)."""
+        comments = []
+        for child in listing['data']['children']:
+            if child['kind'] != 't1':
+                continue
+            body = child['data'].get('body', '')
+            if len(body) > 20:  # Only meaningful comments
+                comments.append(body)
+            if len(comments) >= self.num_comments:
+                break
+        return comments
+
+    async def _fetch_comments(self, post: Dict) -> Dict:
+        """Adds the post's top comments; a failure leaves the post without comments."""
+        try:
+            _, comment_listing = await self._get_json(
+                f"/comments/{post['id']}.json",
+                {'sort': 'top', 'depth': 1, 'limit': self.num_comments * 4}
+            )
+            post['comments'] = self._top_comments(comment_listing)
+        except Exception as e:
+            self.logger.warning(f"Could not fetch comments for {post['id']}: {e}")
+            post['comments'] = []
+        return post
+
+    async def _scrape_single_post(self, post_url: str) -> Optional[Dict]:
+        """Scrape a single Reddit post and its top comments"""
+        try:
+            path = urlparse(post_url).path.rstrip('/')
+            post_listing, comment_listing = await self._get_json(
+                f'{path}.json', {'sort': 'top', 'depth': 1, 'limit': self.num_comments * 4}
+            )
+            post = self._post_from_data(post_listing['data']['children'][0]['data'])
+            post['comments'] = self._top_comments(comment_listing)
+            return post
+        except Exception as e:
+            self.logger.error(f'Error scraping single post: {str(e)}')
+            return None
+
+    async def _scrape_subreddit_posts(
+        self,
+        subreddit_url: str,
+        num_posts: int,
+        sort_method: str,
+        since_last_run: bool = False,
+        on_post: Optional[Callable[[Dict], None]] = None
+    ) -> List[Dict]:
+        """Scrape text posts from a subreddit, fetching comments while later pages load"""
+        match = re.search(r'/r/([^/]+)', subreddit_url)
+        if not match:
+            raise ValueError(f"Could not extract subreddit from URL: {subreddit_url}")
+        subreddit_name = match.group(1)
+        if sort_method not in ('hot', 'new', 'top', 'rising', 'controversial'):
+            sort_method = 'hot'
+
+        self.logger.info(f"Scraping subreddit: {subreddit_name} (sorting by {sort_method})")
+        params = {'limit': LISTING_PAGE_SIZE}
+        if sort_method in ('top', 'controversial'):
+            params['t'] = 'day'
+
+        state = CrawlState() if since_last_run else None
+        mark = state.get_mark(subreddit_name, sort_method) if state else None
+
+        # With on_post, posts are only handed to the callback, not kept
+        posts = []
+        returned_ids = []
+        comment_tasks = set()
+        after = None
+        top_id = None
+        # Set when the scan covered everything from the top of the listing down to the mark
+        complete = False
+        try:
+            while len(returned_ids) < num_posts:
+                page = await self._get_json(
+                    f'/r/{subreddit_name}/{sort_method}.json',
+                    {**params, **({'after': after} if after else {})}
+                )
+                children = page['data']['children']
+                seen = state.seen_ids(child['data']['id'] for child in children) if state else set()
+                for child in children:
+                    data = child['data']
+                    if state:
+                        top_id = top_id or data['id']
+                        if reached_mark(data['id'], mark, sort_method):
+                            complete = True
+                            break
+                    # Above the mark, seen posts are skipped rather than ending the scan:
+                    # posts that an earlier run scanned but didn't return can sit below them
+                    if data['id'] in seen:
+                        continue
+                    # Take any post that has text content, ignoring images/links
+                    if child['kind'] != 't3' or not data.get('selftext'):
+                        continue
+                    post = self._post_from_data(data)
+                    returned_ids.append(post['id'])
+                    if not on_post:
+                        posts.append(post)
+                    if self.include_comments:
+                        task = asyncio.create_task(self._fetch_comments(post))
+                        if on_post:
+                            task.add_done_callback(lambda done: on_post(done.result()))
+                        # Finished tasks are dropped, releasing their posts
+                        comment_tasks.add(task)
+                        task.add_done_callback(comment_tasks.discard)
+                    elif on_post:
+                        on_post(post)
+                    if len(returned_ids) >= num_posts:
+                        break
+                else:
+                    after = page['data'].get('after')
+                    if not after:
+                        complete = True
+                if complete or len(returned_ids) >= num_posts:
+                    break
+
+            if comment_tasks:
+                await asyncio.gather(*comment_tasks)
+        finally:
+            # Also runs when the scrape fails part way, so returned posts stay seen
+            if state:
+                state.mark_seen(returned_ids, subreddit_name)
+                if complete and top_id:
+                    state.set_mark(subreddit_name, sort_method, top_id)
+        self.logger.info(f"Scraped {len(returned_ids)} posts from r/{subreddit_name}")
+        return posts
+
+
+def _emit(record: Dict):
+    """Writes one compact JSON-lines record to stdout (same records as reddit_scraper.py --stream)."""
+    print(json.dumps(record, separators=(',', ':')))
+    sys.stdout.flush()
+
+def main():
+    """Main function to run the scraper from the command line."""
+    parser = argparse.ArgumentParser(description="Scrape posts from Reddit concurrently.")
+    parser.add_argument("--url", required=True, help="The Reddit URL to scrape (subreddit or post).")
+    parser.add_argument("--num-posts", type=int, default=10, help="Number of posts to scrape.")
+    parser.add_argument("--sort-by", type=str, default='hot', choices=['hot', 'new', 'top', 'rising', 'controversial'], help="The sort method for subreddit posts.")
+    parser.add_argument("--base-url", help="Reddit server to use (e.g. a local stub server).")
+    parser.add_argument("--requests-per-minute", type=int, default=REDDIT_REQUESTS_PER_MINUTE, help="Rate limit for Reddit requests.")
+    parser.add_argument("--no-comments", action='store_true', help="Don't fetch comments for subreddit posts.")
+    parser.add_argument("--since-last-run", action='store_true', help="Only return posts that earlier --since-last-run scrapes haven't returned.")
+    parser.add_argument("--stream", action='store_true', help="Print one JSON object per line as posts complete, then a summary record (constant memory).")
+    args = parser.parse_args()
+
+    scraper = AsyncRedditScraper(
+        base_url=args.base_url,
+        requests_per_minute=args.requests_per_minute,
+        include_comments=not args.no_comments
+    )
+    started = time.time()
+    emitted = 0
+
+    def stream_post(post: Dict):
+        nonlocal emitted
+        _emit({'type': 'post', 'post': post})
+        emitted += 1
+
+    on_post = stream_post if args.stream else None
+    try:
+        posts = scraper.scrape_posts(args.url, args.num_posts, args.sort_by, since_last_run=args.since_last_run, on_post=on_post)
+        if args.stream:
+            _emit({'type': 'summary', 'count': emitted, 'elapsed': round(time.time() - started, 3)})
+        else:
+            # Print the result to stdout as a JSON string
+            print(json.dumps(posts, indent=2))
+    except Exception as e:
+        scraper.logger.error(f"A critical error occurred: {e}", exc_info=True)
+        if args.stream:
+            _emit({'type': 'error', 'message': str(e), 'count': emitted})
+            sys.exit(1)
+        # Print a specific error message to stderr for the backend to catch
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
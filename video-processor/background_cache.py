@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Pre-normalized background video cache.
+
+Each source background is transcoded once into a 1080x1920, 30 fps,
+keyframe-dense "mezzanine" file. Renders seek into the mezzanine instead of
+decoding, cropping and rescaling the full-resolution source on every job.
+
+Mezzanines are never replaced in place: a changed source gets a new key, and
+old mezzanines are only removed by gc(), least recently used first and never
+while a preview manifest or job artifact that pinned them still exists.
+Concurrent workers transcode each key once, behind a per-key OS file lock
+that the kernel releases if the worker holding it dies.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from background_index import VIDEO_SUFFIXES
+from ffmpeg_renderer import background_filter
+from utils.disk_cache import DiskCache
+from utils.logger import setup_logger
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+BACKGROUND_CACHE_MAX_BYTES = int(os.getenv('BACKGROUND_CACHE_MAX_MB', '20480')) * 1024 * 1024
+
+
+class BackgroundCache:
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        width: int = 1080,
+        height: int = 1920,
+        fps: int = 30,
+        max_bytes: int = BACKGROUND_CACHE_MAX_BYTES
+    ):
+        self.logger = setup_logger('background_cache')
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(__file__).parent / 'temp' / 'backgrounds'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.cache_dir / 'manifest.json'
+        self.pins_dir = self.cache_dir / 'pins'
+        self.max_bytes = max_bytes
+        self.width = width
+        self.height = height
+        self.fps = fps
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self, manifest: Dict):
+        """Writes the manifest atomically so concurrent workers never see a partial file."""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.json.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def _cache_key(self, source: Path, manifest: Dict) -> Tuple[str, str]:
+        """
+        Returns the content hash and cache key (content hash + mtime) for a source file.
+
+        The content hash is reused from the manifest while the file's size and
+        mtime are unchanged, so large sources are only hashed once.
+        """
+        stat = source.stat()
+        entry = manifest.get(str(source.resolve()))
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            content_hash = entry['sha256']
+        else:
+            self.logger.info(f"Hashing background video: {source.name}")
+            content_hash = DiskCache.hash_file(source)
+        return content_hash, f"{content_hash[:32]}-{int(stat.st_mtime)}"
+
+    @staticmethod
+    def _lock_file(f):
+        """Blocks until this process holds an exclusive lock on the open file."""
+        if sys.platform == 'win32':
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after about 10 seconds, so keep retrying
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError:
+                    continue
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    @staticmethod
+    def _unlock_file(f):
+        if sys.platform == 'win32':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def _transcode_lock(self, key: str):
+        """
+        Holds an OS lock on <key>.lock, so only one worker transcodes a given
+        mezzanine. The lock file is left in place: removing it would let a
+        waiter lock the old inode while a newcomer locks a new one.
+        """
+        lock_path = self.cache_dir / f"{key}.lock"
+        with open(lock_path, 'a+b') as f:
+            self._lock_file(f)
+            try:
+                yield
+            finally:
+                self._unlock_file(f)
+
+    def _transcode(self, source: Path, destination: Path):
+        """Transcodes a source into a 9:16, keyframe-dense mezzanine file."""
+        fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.mp4.tmp')
+        os.close(fd)
+        command = [
+            'ffmpeg', '-y', '-nostdin', '-loglevel', 'error',
+            '-i', str(source),
+            # Same crop and scale as the direct ffmpeg render path
+            '-vf', background_filter(self.width, self.height, self.fps),
+            '-an',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p',
+            # One keyframe per second so seeks land close to the requested offset
+            '-g', str(self.fps), '-keyint_min', str(self.fps), '-sc_threshold', '0',
+            '-movflags', '+faststart',
+            '-f', 'mp4', temp_name
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"ffmpeg failed to normalize {source}: {result.stderr.strip()}")
+            os.replace(temp_name, destination)
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+
+    def get_normalized(self, source: Path) -> Path:
+        """
+        Returns the mezzanine for a background video, creating it on a cache miss.
+
+        Args:
+            source: Path to the original background video.
+
+        Returns:
+            Path to the normalized 1080x1920 mezzanine file.
+        """
+        source = Path(source)
+        manifest = self._load_manifest()
+        content_hash, key = self._cache_key(source, manifest)
+        mezzanine = self.cache_dir / f"{key}.mp4"
+
+        source_id = str(source.resolve())
+
+        created = False
+        if mezzanine.is_file():
+            self.logger.info(f"Using cached background mezzanine: {mezzanine.name}")
+            os.utime(mezzanine)  # Recently used, for gc()
+        else:
+            with self._transcode_lock(key):
+                # Another worker may have finished it while this one waited for the lock
+                if mezzanine.is_file():
+                    self.logger.info(f"Using background mezzanine created by another worker: {mezzanine.name}")
+                else:
+                    self.logger.info(f"Normalizing background video {source.name} to {self.width}x{self.height}@{self.fps}...")
+                    self._transcode(source, mezzanine)
+                    self.logger.info(f"Background mezzanine created: {mezzanine.name}")
+                    created = True
+
+        stat = source.stat()
+        manifest = self._load_manifest()
+        manifest[source_id] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': content_hash,
+            'mezzanine': mezzanine.name
+        }
+        self._save_manifest(manifest)
+        if created:
+            self.gc()
+        return mezzanine
+
+    def pin(self, mezzanine: Path, owner: Path):
+        """
+        Keeps a mezzanine out of gc() for as long as the owner file exists
+        (e.g. a preview manifest or a job artifact that refers to it).
+        Paths outside the cache are ignored.
+        """
+        mezzanine = Path(mezzanine)
+        if mezzanine.parent.resolve() != self.cache_dir.resolve():
+            return
+        owner = str(Path(owner).resolve())
+        self.pins_dir.mkdir(exist_ok=True)
+        owner_hash = hashlib.sha256(owner.encode('utf-8')).hexdigest()[:16]
+        (self.pins_dir / f"{mezzanine.stem}.{owner_hash}.pin").write_text(owner, encoding='utf-8')
+
+    def _pinned(self) -> Set[str]:
+        """Names of the mezzanines with a live pin; pins whose owner is gone are deleted."""
+        pinned = set()
+        if not self.pins_dir.is_dir():
+            return pinned
+        for pin_path in self.pins_dir.glob('*.pin'):
+            try:
+                owner = pin_path.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            if os.path.exists(owner):
+                pinned.add(f"{pin_path.name.split('.', 1)[0]}.mp4")
+            else:
+                pin_path.unlink(missing_ok=True)
+        return pinned
+
+    def gc(self) -> int:
+        """
+        Removes unpinned mezzanines, least recently used first, until the
+        cache fits in max_bytes.
+
+        Returns:
+            Number of bytes freed.
+        """
+        pinned = self._pinned()
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob('*.mp4'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            if path.name not in pinned:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            self.logger.info(f"Removing least recently used background mezzanine: {path.name}")
+            path.unlink(missing_ok=True)
+            freed += size
+        return freed
+
+    def ingest_directory(self, directory: Path) -> int:
+        """Normalizes every background video in a directory. Returns the number of files ingested."""
+        count = 0
+        for path in sorted(Path(directory).iterdir()):
+            if path.is_file() and path.suffix.lower() in VIDEO_SUFFIXES:
+                self.get_normalized(path)
+                count += 1
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-normalize background videos into the mezzanine cache.')
+    parser.add_argument('--category', help='Background category under downloads/ (default: all categories)')
+    parser.add_argument('--gc', action='store_true', help='Only remove least recently used, unpinned mezzanines above BACKGROUND_CACHE_MAX_MB')
+    args = parser.parse_args()
+
+    downloads_dir = Path(__file__).parent.parent / 'downloads'
+    cache = BackgroundCache()
+    try:
+        if args.gc:
+            freed = cache.gc()
+            cache.logger.info(f"Freed {freed / (1024 * 1024):.1f} MB of background mezzanines")
+            return
+
+        if args.category:
+            categories = [downloads_dir / args.category]
+        else:
+            categories = [path for path in downloads_dir.iterdir() if path.is_dir()]
+
+        for category_path in categories:
+            count = cache.ingest_directory(category_path)
+            cache.logger.info(f"Ingested {count} background videos from {category_path.name}")
+    except Exception as e:
+        cache.logger.error(f"Error ingesting background videos: {e}", exc_info=True)
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Persistent index of the background video library.
+
+Stores duration, resolution, codec, fps and keyframe positions of every clip
+under downloads/<category>/ in SQLite, so selecting a background doesn't need
+to open the video to learn its length. Each refresh only stats the files and
+probes those whose size or mtime differs from the index; files that failed
+to probe are retried when they change or after PROBE_RETRY_SECONDS.
+
+select() doesn't refresh on every call: only when the category folder's mtime
+changed (files added, removed or renamed) or REFRESH_INTERVAL_SECONDS passed
+(files overwritten in place, probe retries). Downloads add themselves
+through download_from_url.py.
+"""
+
+import sys
+import time
+import json
+import random
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+from media_probe import probe_media, probe_keyframes
+from utils.logger import setup_logger
+
+VIDEO_SUFFIXES = ['.mp4', '.mov', '.webm']
+
+# How long an unchanged file that failed to probe is left alone before the next attempt
+PROBE_RETRY_SECONDS = 600
+
+# Longest select() goes without rescanning a category whose folder mtime is unchanged
+REFRESH_INTERVAL_SECONDS = 300
+
+
+def is_background_video(path: Path) -> bool:
+    """True for finished video files; skips partial downloads and hidden files."""
+    return (
+        path.is_file()
+        and path.suffix.lower() in VIDEO_SUFFIXES
+        and '.part' not in path.name
+        and not path.name.startswith('.')
+    )
+
+
+class BackgroundIndex:
+    def __init__(self, downloads_dir: Optional[Path] = None, db_path: Optional[Path] = None):
+        self.logger = setup_logger('background_index')
+        self.downloads_dir = Path(downloads_dir) if downloads_dir else Path(__file__).parent.parent / 'downloads'
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / 'temp' / 'background_index.sqlite'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backgrounds (
+                    path TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    duration REAL NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    codec TEXT,
+                    fps REAL,
+                    keyframes TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_backgrounds_category ON backgrounds (category, duration)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS probe_failures (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    failed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS category_scans (
+                    category TEXT PRIMARY KEY,
+                    dir_mtime REAL NOT NULL,
+                    scanned_at REAL NOT NULL
+                )
+            """)
+
+    def add(self, path: Path, category: Optional[str] = None) -> Optional[Dict]:
+        """
+        Probes a video and stores (or updates) its index entry.
+
+        Args:
+            path: Path to the background video.
+            category: Category name, defaults to the name of the parent folder.
+
+        Returns:
+            The stored entry, or None if the file is not a usable video.
+        """
+        path = Path(path)
+        if not is_background_video(path):
+            self.logger.info(f"Skipping non-video file: {path.name}")
+            return None
+
+        stat = path.stat()
+        try:
+            info = probe_media(path)
+            keyframes = probe_keyframes(path)
+        except Exception as e:
+            self.logger.warning(f"Could not probe background video {path.name}: {e}")
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO probe_failures (path, size, mtime, failed_at) VALUES (?, ?, ?, ?)",
+                    (str(path.resolve()), stat.st_size, stat.st_mtime, time.time())
+                )
+                # The stored metadata describes the old content; keep the file out of select() until a probe succeeds
+                conn.execute("DELETE FROM backgrounds WHERE path = ?", (str(path.resolve()),))
+            return None
+
+        entry = {
+            'path': str(path.resolve()),
+            'category': category or path.parent.name,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'duration': info['duration'],
+            'width': info['width'],
+            'height': info['height'],
+            'codec': info['codec'],
+            'fps': info['fps'],
+            'keyframes': keyframes,
+        }
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO backgrounds
+                    (path, category, size, mtime, duration, width, height, codec, fps, keyframes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    entry['path'], entry['category'], entry['size'], entry['mtime'], entry['duration'],
+                    entry['width'], entry['height'], entry['codec'], entry['fps'], json.dumps(keyframes)
+                )
+            )
+            conn.execute("DELETE FROM probe_failures WHERE path = ?", (entry['path'],))
+        self.logger.info(f"Indexed background video {path.name} ({entry['duration']:.1f}s, {entry['width']}x{entry['height']})")
+        return entry
+
+    def refresh(self, category: str, force: bool = False) -> int:
+        """
+        Brings the index of a category in line with its folder.
+
+        Every file's size and mtime is compared with its index entry, so files
+        overwritten in place are picked up too; only new or modified files are
+        probed. With force, every file is probed again.
+
+        Returns:
+            Number of files (re)indexed.
+        """
+        category_path = self.downloads_dir / category
+        if not category_path.is_dir():
+            raise FileNotFoundError(f"Background video category folder not found: {category_path}")
+
+        with self._connect() as conn:
+            known = {
+                r['path']: (r['size'], r['mtime'])
+                for r in conn.execute("SELECT path, size, mtime FROM backgrounds WHERE category = ?", (category,))
+            }
+            failures = {
+                r['path']: (r['size'], r['mtime'], r['failed_at'])
+                for r in conn.execute("SELECT path, size, mtime, failed_at FROM probe_failures")
+            }
+
+        now = time.time()
+        # Taken before the scan, so a file added during it changes the mtime again
+        dir_mtime = category_path.stat().st_mtime
+        indexed = 0
+        present = set()
+        for path in category_path.iterdir():
+            if not is_background_video(path):
+                continue
+            key = str(path.resolve())
+            present.add(key)
+            stat = path.stat()
+            if not force and known.get(key) == (stat.st_size, stat.st_mtime):
+                continue
+            failure = failures.get(key)
+            if (
+                not force and failure
+                and failure[:2] == (stat.st_size, stat.st_mtime)
+                and now - failure[2] < PROBE_RETRY_SECONDS
+            ):
+                continue  # Unchanged since a recent failed probe
+            if self.add(path, category):
+                indexed += 1
+
+        removed = [path for path in known if path not in present]
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM backgrounds WHERE path = ?", [(path,) for path in removed])
+            gone = [path for path in failures if path not in present and Path(path).parent == category_path.resolve()]
+            conn.executemany("DELETE FROM probe_failures WHERE path = ?", [(path,) for path in gone])
+            conn.execute(
+                "INSERT OR REPLACE INTO category_scans (category, dir_mtime, scanned_at) VALUES (?, ?, ?)",
+                (category, dir_mtime, now)
+            )
+
+        if removed:
+            self.logger.info(f"Removed {len(removed)} missing videos from the index")
+        return indexed
+
+    def refresh_if_stale(self, category: str) -> int:
+        """
+        Refreshes a category only if its folder changed since the last scan or
+        the last scan is older than REFRESH_INTERVAL_SECONDS.
+
+        Returns:
+            Number of files (re)indexed.
+        """
+        category_path = self.downloads_dir / category
+        if not category_path.is_dir():
+            raise FileNotFoundError(f"Background video category folder not found: {category_path}")
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT dir_mtime, scanned_at FROM category_scans WHERE category = ?", (category,)
+            ).fetchone()
+        if (
+            row
+            and row['dir_mtime'] == category_path.stat().st_mtime
+            and time.time() - row['scanned_at'] < REFRESH_INTERVAL_SECONDS
+        ):
+            return 0
+        return self.refresh(category)
+
+    def entries(self, category: str) -> List[Dict]:
+        """Returns the indexed entries of a category."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM backgrounds WHERE category = ? ORDER BY duration DESC", (category,)
+            ).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(row)
+            entry['keyframes'] = json.loads(entry['keyframes'] or '[]')
+            entries.append(entry)
+        return entries
+
+    def select(self, category: str, min_duration: Optional[float] = None) -> Dict:
+        """
+        Picks a background, preferring clips at least min_duration long.
+
+        Clips long enough for the narration are chosen at random so they can be
+        trimmed instead of looped; if none qualify, the longest clip is used.
+        """
+        self.refresh_if_stale(category)
+        entries = self.entries(category)
+        if not entries:
+            raise FileNotFoundError(f"No background videos found in category: {category}")
+
+        if min_duration is None:
+            return random.choice(entries)
+
+        long_enough = [entry for entry in entries if entry['duration'] >= min_duration]
+        if long_enough:
+            return random.choice(long_enough)
+
+        self.logger.info(f"No background is at least {min_duration:.1f}s long; using the longest clip (will loop)")
+        return entries[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or refresh the background video index.')
+    parser.add_argument('--category', help='Background category under downloads/ (default: all categories)')
+    parser.add_argument('--force', action='store_true', help='Probe every file again, even if unchanged')
+    args = parser.parse_args()
+
+    index = BackgroundIndex()
+    try:
+        if args.category:
+            categories = [args.category]
+        else:
+            categories = [path.name for path in index.downloads_dir.iterdir() if path.is_dir()]
+
+        for category in categories:
+            count = index.refresh(category, force=args.force)
+            index.logger.info(f"Indexed {count} background videos in {category}")
+    except Exception as e:
+        index.logger.error(f"Error indexing background videos: {e}", exc_info=True)
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
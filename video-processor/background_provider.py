@@ -2,9 +2,9 @@
 Provides background video clips from a local folder.
 """
 
-import os
-import random
 from pathlib import Path
+from typing import Dict, Optional
+from background_index import BackgroundIndex
 from utils.logger import setup_logger
 
 class BackgroundProvider:
@@ -13,31 +13,37 @@ class BackgroundProvider:
         # Assuming the script is run from the root of the video-processor directory
         self.downloads_dir = Path(__file__).parent.parent / 'downloads'
         self.logger.info(f"Looking for background videos in: {self.downloads_dir}")
+        self.index = BackgroundIndex(downloads_dir=self.downloads_dir)
 
-    def get_background_video(self, category: str) -> Path:
+    def get_background_info(self, category: str, min_duration: Optional[float] = None) -> Dict:
         """
-        Get a random background video from the specified category folder.
+        Select a background video from the indexed library of a category.
         
         Args:
             category: The category (subdirectory) to look for videos in.
+            min_duration: Preferred minimum clip length in seconds (usually the narration length).
             
         Returns:
-            Path to a randomly selected video file.
+            Index entry of the selected video (path, duration, width, height, codec, fps, keyframes).
         """
         try:
-            category_path = self.downloads_dir / category
-            if not category_path.is_dir():
-                raise FileNotFoundError(f"Background video category folder not found: {category_path}")
-
-            video_files = [f for f in category_path.iterdir() if f.is_file() and f.suffix.lower() in ['.mp4', '.mov', '.webm']]
-            
-            if not video_files:
-                raise FileNotFoundError(f"No background videos found in category: {category}")
-
-            selected_video = random.choice(video_files)
-            self.logger.info(f"Selected background video: {selected_video}")
-            return selected_video
+            selected = self.index.select(category, min_duration=min_duration)
+            self.logger.info(f"Selected background video: {selected['path']} ({selected['duration']:.1f}s)")
+            return selected
             
         except Exception as e:
             self.logger.error(f'Error getting background video: {str(e)}')
-            raise 
\ No newline at end of file
+            raise
+
+    def get_background_video(self, category: str, min_duration: Optional[float] = None) -> Path:
+        """
+        Get a background video from the specified category folder.
+        
+        Args:
+            category: The category (subdirectory) to look for videos in.
+            min_duration: Preferred minimum clip length in seconds.
+            
+        Returns:
+            Path to the selected video file.
+        """
+        return Path(self.get_background_info(category, min_duration)['path'])
@@ -0,0 +1,238 @@
+"""
+Batch rendering of many posts as one video per post.
+
+Jobs flow through a PipelineScheduler with one pool per kind of work: text,
+TTS and background selection share an asyncio loop (they are mostly network
+and disk bound), captioning has its own small thread pool, and rendering runs
+in a process pool. Bounded queues between the stages let TTS for upcoming
+posts run ahead while earlier posts render, without running arbitrarily far
+ahead. Setup (TTS generators, background index, Whisper) is shared by the
+whole batch.
+"""
+
+import sys
+import queue
+import asyncio
+import functools
+import itertools
+import threading
+import multiprocessing
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from background_provider import BackgroundProvider
+from caption_generator import CaptionGenerator
+from pipeline_scheduler import PipelineScheduler, Stage
+from render_profiles import DEFAULT_RENDER_PROFILE
+from story_pipeline import StoryJob, StoryPipeline
+from utils.logger import setup_logger
+
+# Per-process pipeline used by render workers, created by _init_render_worker
+_render_pipeline: Optional[StoryPipeline] = None
+
+
+def _init_render_worker():
+    global _render_pipeline
+    _render_pipeline = StoryPipeline(logger=setup_logger('batch_render_worker'))
+
+
+def _render_job(job: StoryJob, progress_queue: Optional[queue.Queue] = None) -> str:
+    """
+    Renders a prepared job inside a render worker process.
+
+    Render progress (0-100) is put on progress_queue as (job_id, progress),
+    once per whole percent.
+    """
+    progress_callback = None
+    if progress_queue is not None:
+        last = [-1]
+
+        def progress_callback(progress: float):
+            if int(progress) != last[0]:
+                last[0] = int(progress)
+                progress_queue.put((job.job_id, progress))
+
+    return str(_render_pipeline.render(job, progress_callback=progress_callback))
+
+
+class BatchGenerator:
+    def __init__(
+        self,
+        io_workers: int = 4,
+        render_workers: int = 2,
+        voice_type: str = 'female',
+        background_type: str = 'minecraft',
+        render_backend: str = 'moviepy',
+        caption_mode: str = 'tts',
+        normalize_background: bool = True,
+        transcribe_workers: int = 1,
+        whisper_model: str = 'base.en',
+        transcription_backend: Optional[str] = None,
+        transcription_threads: Optional[int] = None,
+        render_profile: str = DEFAULT_RENDER_PROFILE
+    ):
+        self.logger = setup_logger('batch_generator')
+        self.io_workers = max(1, io_workers)
+        self.transcribe_workers = max(1, transcribe_workers)
+        self.render_workers = max(1, render_workers)
+        self.job_options = {
+            'voice_type': voice_type,
+            'background_type': background_type,
+            'render_backend': render_backend,
+            'caption_mode': caption_mode,
+            'normalize_background': normalize_background,
+            'render_profile': render_profile,
+        }
+        self.pipeline = StoryPipeline(
+            logger=self.logger,
+            caption_gen=CaptionGenerator(
+                model_name=whisper_model, backend=transcription_backend, threads=transcription_threads
+            ),
+            provider=BackgroundProvider()
+        )
+        # Whisper is not thread-safe; captions from TTS timings are
+        self._whisper_lock = threading.Lock()
+        self._print_lock = threading.Lock()
+
+    def report(self, kind: str, job_id: str, payload):
+        """Prints one KIND:job_id:payload line; payloads are kept single-line."""
+        payload = str(payload).replace('\n', ' ')
+        with self._print_lock:
+            print(f'{kind}:{job_id}:{payload}')
+            sys.stdout.flush()
+
+    async def _prepare(self, job: StoryJob) -> StoryJob:
+        """I/O stage: text cleanup, TTS and background selection for one job."""
+        self.pipeline.prepare_text(job)
+        self.report('PROGRESS', job.job_id, 10)
+        await self.pipeline.synthesize_async(job)
+        self.report('PROGRESS', job.job_id, 30)
+        # Index lookups and mezzanine transcodes block, so keep them off the loop
+        await asyncio.to_thread(self.pipeline.select_background, job)
+        self.report('PROGRESS', job.job_id, 50)
+        return job
+
+    def _transcribe(self, job: StoryJob) -> StoryJob:
+        """Caption stage."""
+        if job.caption_mode == 'whisper':
+            with self._whisper_lock:
+                self.pipeline.generate_captions(job)
+        else:
+            self.pipeline.generate_captions(job)
+        self.report('PROGRESS', job.job_id, 80)
+        return job
+
+    def build_jobs(self, posts: List[Dict], output_dir: Path) -> List[StoryJob]:
+        """Creates one StoryJob per post; posts need 'title' and 'text' (and ideally 'id')."""
+        jobs = []
+        for index, post in enumerate(posts):
+            job_id = str(post.get('id') or f'post{index + 1}')
+            jobs.append(StoryJob(
+                job_id=job_id,
+                title=post.get('title', ''),
+                body=post.get('text', ''),
+                output_path=Path(output_dir) / f'{job_id}.mp4',
+                **self.job_options
+            ))
+        return jobs
+
+    def run_jobs(self, jobs: Iterable[StoryJob]) -> List[Dict]:
+        """
+        Renders jobs through the stage pools, reporting each one as it finishes.
+
+        Args:
+            jobs: StoryJobs to render; may be a lazy iterable, which is only
+                advanced as the first stage has room
+
+        Returns:
+            One result per job in completion order: {'id', 'output_path'} or {'id', 'error'}
+        """
+        return [result for _, result in self._run_jobs(jobs)]
+
+    def _relay_render_progress(self, progress_queue: queue.Queue, flushed: Dict[int, threading.Event]):
+        """
+        Reports render progress from the worker processes until a None arrives.
+        A (None, token) entry sets flushed[token] once everything queued before it is reported.
+        """
+        for job_id, progress in iter(progress_queue.get, None):
+            if job_id is None:
+                flushed.pop(progress).set()
+                continue
+            # Rendering is the last 20% of a job
+            self.report('PROGRESS', job_id, int(80 + progress * 0.2))
+
+    def _run_jobs(self, jobs: Iterable[StoryJob]) -> List[Tuple[StoryJob, Dict]]:
+        """run_jobs, returning each result with the job it belongs to."""
+        results = []
+        flushed: Dict[int, threading.Event] = {}
+        tokens = itertools.count()
+
+        def flush_progress():
+            # A worker's progress is on the queue before its result comes back, so
+            # waiting for the relay keeps PROGRESS lines ahead of DONE and ERROR
+            token = next(tokens)
+            flushed[token] = threading.Event()
+            event = flushed[token]
+            progress_queue.put((None, token))
+            event.wait()
+
+        def on_result(job: StoryJob, output_path: str):
+            flush_progress()
+            self.report('PROGRESS', job.job_id, 100)
+            self.report('DONE', job.job_id, output_path)
+            results.append((job, {'id': job.job_id, 'output_path': output_path}))
+            self.pipeline.cleanup(job)
+
+        def on_error(job: StoryJob, stage: str, error: Exception):
+            flush_progress()
+            self.logger.error(f"Error in {stage} stage for job {job.job_id}: {error}")
+            self.report('ERROR', job.job_id, error)
+            results.append((job, {'id': job.job_id, 'error': str(error)}))
+            self.pipeline.cleanup(job)
+
+        # Started before any stage thread, like the render pool (see pipeline_scheduler)
+        with multiprocessing.get_context('spawn').Manager() as manager:
+            progress_queue = manager.Queue()
+            relay = threading.Thread(
+                target=self._relay_render_progress, args=(progress_queue, flushed), daemon=True
+            )
+            relay.start()
+            scheduler = PipelineScheduler(
+                stages=[
+                    Stage('io', self._prepare, kind='async', workers=self.io_workers),
+                    Stage('transcribe', self._transcribe, kind='thread', workers=self.transcribe_workers),
+                    Stage('render', functools.partial(_render_job, progress_queue=progress_queue), kind='process',
+                          workers=self.render_workers, initializer=_init_render_worker),
+                ],
+                on_result=on_result,
+                on_error=on_error,
+                logger=self.logger
+            )
+            try:
+                scheduler.run(jobs)
+            finally:
+                progress_queue.put(None)
+                relay.join()
+        return results
+
+    def run(self, posts: List[Dict], output_dir: Path) -> List[Dict]:
+        """
+        Renders one video per post.
+
+        Args:
+            posts: Post dictionaries (as returned by RedditScraper)
+            output_dir: Directory to write <post id>.mp4 files to
+
+        Returns:
+            One result per post: {'id', 'output_path'} or {'id', 'error'}
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        jobs = self.build_jobs(posts, output_dir)
+        self.logger.info(
+            f"Rendering {len(jobs)} videos ({self.io_workers} I/O, {self.transcribe_workers} caption, "
+            f"{self.render_workers} render workers)"
+        )
+        # By job object rather than ID: posts can share an ID
+        results = {id(job): result for job, result in self._run_jobs(jobs)}
+        return [results[id(job)] for job in jobs]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of per-frame overlay compositing.
+
+Blends the intro card and a caption onto a 1080x1920 frame and compares the
+float blend MoviePy-style compositing does (convert, blend into new arrays,
+copy the frame) with the in-place premultiplied uint8 kernel in compositing.py.
+
+    python benchmark_compositing.py --frames 300
+"""
+
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+from caption_renderer import CaptionRenderer, rasterize_intro
+from compositing import Sprite
+
+INTRO_IMAGE_PATH = Path(__file__).parent / 'assets' / 'IntroPicture.png'
+CAPTION_STYLE = {'fontsize': 80, 'color': 'white', 'font': 'Impact', 'stroke_color': 'black', 'stroke_width': 6}
+
+
+def float_blend(frame: np.ndarray, sprite: np.ndarray, position) -> np.ndarray:
+    """Reference: copies the frame and blends the whole sprite in float32."""
+    frame = np.array(frame, dtype=np.uint8)
+    x, y = position
+    h, w = sprite.shape[:2]
+    alpha = sprite[..., 3:4].astype(np.float32) / 255.0
+    target = frame[y:y + h, x:x + w].astype(np.float32)
+    frame[y:y + h, x:x + w] = (sprite[..., :3] * alpha + target * (1.0 - alpha)).astype(np.uint8)
+    return frame
+
+
+def _time_per_frame(draw, frames: int) -> float:
+    draw()  # Warm up
+    started = time.perf_counter()
+    for _ in range(frames):
+        draw()
+    return (time.perf_counter() - started) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-frame overlay compositing.')
+    parser.add_argument('--frames', type=int, default=300, help='Frames to composite per measurement')
+    parser.add_argument('--width', type=int, default=1080)
+    parser.add_argument('--height', type=int, default=1920)
+    args = parser.parse_args()
+
+    frame_size = (args.width, args.height)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    frame.flags.writeable = False  # Like a decoded frame
+
+    if INTRO_IMAGE_PATH.is_file():
+        intro_rgba = rasterize_intro(INTRO_IMAGE_PATH, 'A long example title for the intro card', int(args.width * 0.9))
+    else:
+        intro_rgba = np.full((int(args.height * 0.3), int(args.width * 0.9), 4), 255, dtype=np.uint8)
+    caption_rgba = CaptionRenderer(CAPTION_STYLE, args.width - 100).render('THIS IS A CAPTION')
+
+    intro, caption = Sprite(intro_rgba), Sprite(caption_rgba)
+    intro_position, caption_position = intro.centered(frame_size), caption.centered(frame_size)
+    buffer = np.array(frame)
+
+    def float_both():
+        out = float_blend(frame, intro_rgba, intro_position)
+        float_blend(out, caption_rgba, caption_position)
+
+    def float_caption():
+        float_blend(frame, caption_rgba, caption_position)
+
+    def inplace_both():
+        intro.blend_into(buffer, intro_position)
+        caption.blend_into(buffer, caption_position)
+
+    def inplace_caption():
+        caption.blend_into(buffer, caption_position)
+
+    # Both kernels must agree to within rounding
+    expected = float_blend(frame, caption_rgba, caption_position)
+    actual = caption.blend_into(np.array(frame), caption_position)
+    max_error = int(np.abs(expected.astype(np.int16) - actual.astype(np.int16)).max())
+
+    print(f"{args.width}x{args.height}, intro {intro_rgba.shape[1]}x{intro_rgba.shape[0]}, "
+          f"caption {caption_rgba.shape[1]}x{caption_rgba.shape[0]}, max difference {max_error}/255")
+    print(f"{'overlays':<18}{'float ms/frame':>16}{'in-place ms/frame':>19}")
+    for name, reference, kernel in [
+        ('intro + caption', float_both, inplace_both),
+        ('caption only', float_caption, inplace_caption),
+    ]:
+        print(f"{name:<18}{_time_per_frame(reference, args.frames):>16.3f}{_time_per_frame(kernel, args.frames):>19.3f}")
+    print(f"{'none':<18}{'copy ' + format(_time_per_frame(lambda: np.array(frame), args.frames), '.3f'):>16}{'0 (skipped)':>19}")
+
+
+if __name__ == '__main__':
+    main()
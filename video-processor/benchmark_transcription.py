@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Compares transcription backends on a fixed audio corpus.
+
+Every file in the corpus is transcribed by each backend. Speed is reported as
+the real-time factor (seconds of compute per second of audio), and word
+timings are compared with the first backend listed: words are matched by
+text and the start/end drift of the matched words is summarized.
+
+The default corpus is benchmarks/transcription_corpus.json, a fixed set of
+stories that is synthesized with edge-tts on first use. The TTS cache keeps
+the audio identical between runs. A directory of audio files can be passed
+instead.
+
+    python benchmark_transcription.py --backends whisper faster-whisper
+    python benchmark_transcription.py --corpus path/to/audio --backends whisper faster-whisper
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import difflib
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from media_probe import probe_duration
+from text_to_speech import TextToSpeechGenerator
+from transcription_backends import TRANSCRIPTION_BACKENDS, create_backend
+from word_timeline import WordTimeline
+from utils.logger import setup_logger
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.flac', '.ogg'}
+DEFAULT_CORPUS = Path(__file__).parent / 'benchmarks' / 'transcription_corpus.json'
+CORPUS_AUDIO_DIR = Path(__file__).parent / 'temp' / 'benchmark_corpus'
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r'[\W_]+', '', word.lower())
+
+
+def timing_drift(reference: WordTimeline, candidate: WordTimeline) -> Dict:
+    """
+    Matches the words of two transcriptions by text and measures how far the
+    candidate's word times are from the reference's.
+
+    Returns:
+        {'matched': fraction of reference words matched, 'mean', 'p95', 'max'}
+        with drift in seconds (the larger of the start and end differences)
+    """
+    matcher = difflib.SequenceMatcher(
+        None, [_normalize(w) for w in reference.words], [_normalize(w) for w in candidate.words], autojunk=False
+    )
+    ref_index, cand_index = [], []
+    for block in matcher.get_matching_blocks():
+        ref_index.extend(range(block.a, block.a + block.size))
+        cand_index.extend(range(block.b, block.b + block.size))
+
+    if not ref_index:
+        return {'matched': 0.0, 'mean': None, 'p95': None, 'max': None}
+    drift = np.maximum(
+        np.abs(reference.start[ref_index] - candidate.start[cand_index]),
+        np.abs(reference.end[ref_index] - candidate.end[cand_index])
+    )
+    return {
+        'matched': len(ref_index) / len(reference),
+        'mean': float(drift.mean()),
+        'p95': float(np.percentile(drift, 95)),
+        'max': float(drift.max())
+    }
+
+
+def synthesize_corpus(corpus_path: Path, voice_type: str = 'female') -> List[Path]:
+    """
+    Turns a JSON corpus of {'id', 'text'} entries into mp3 files.
+
+    Returns:
+        The audio paths, in corpus order
+    """
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    CORPUS_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+    tts = TextToSpeechGenerator(voice_type)
+    files = []
+    for entry in entries:
+        path = CORPUS_AUDIO_DIR / f"{entry['id']}.mp3"
+        tts.generate_speech(entry['text'], path)
+        files.append(path)
+    return files
+
+
+def run_benchmark(files: List[Path], backend_names: List[str], model_name: str, threads: int) -> List[Dict]:
+    """
+    Transcribes every file with every backend.
+
+    Returns:
+        One row per (file, backend) with duration, elapsed seconds, rtf, word count and drift
+    """
+    logger = setup_logger('benchmark_transcription')
+    backends = [create_backend(name, model_name, threads) for name in backend_names]
+    for backend in backends:
+        # Model loading is not part of the measured time
+        backend.load()
+
+    rows = []
+    for path in files:
+        duration = probe_duration(path)
+        reference = None
+        for backend in backends:
+            started = time.perf_counter()
+            timeline = backend.transcribe(path)
+            elapsed = time.perf_counter() - started
+            if reference is None:
+                reference = timeline
+            drift = timing_drift(reference, timeline)
+            logger.info(f"{path.name} [{backend.name}] {elapsed:.2f}s for {duration:.1f}s of audio, {len(timeline)} words")
+            rows.append({
+                'file': path.name,
+                'backend': backend.name,
+                'duration': duration,
+                'elapsed': elapsed,
+                'rtf': elapsed / duration if duration else None,
+                'words': len(timeline),
+                'drift': drift
+            })
+    return rows
+
+
+def _format(value, spec: str) -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def print_summary(rows: List[Dict], backend_names: List[str]):
+    print(f"{'backend':<16}{'audio s':>10}{'compute s':>11}{'rtf':>8}{'matched':>9}{'mean ms':>9}{'p95 ms':>8}{'max ms':>8}")
+    for name in backend_names:
+        selected = [row for row in rows if row['backend'] == name]
+        audio = sum(row['duration'] for row in selected)
+        compute = sum(row['elapsed'] for row in selected)
+        drifts = [row['drift'] for row in selected if row['drift']['mean'] is not None]
+        matched = np.mean([row['drift']['matched'] for row in selected]) if selected else None
+        mean = np.mean([d['mean'] for d in drifts]) * 1000 if drifts else None
+        p95 = max(d['p95'] for d in drifts) * 1000 if drifts else None
+        worst = max(d['max'] for d in drifts) * 1000 if drifts else None
+        print(f"{name:<16}{audio:>10.1f}{compute:>11.2f}{_format(compute / audio if audio else None, '.3f'):>8}"
+              f"{_format(matched, '.1%'):>9}{_format(mean, '.0f'):>9}{_format(p95, '.0f'):>8}{_format(worst, '.0f'):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transcription backends for speed and word-timing drift.')
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS),
+                        help='JSON text corpus to synthesize, or a directory of audio files (or a single file)')
+    parser.add_argument('--backends', nargs='+', default=list(TRANSCRIPTION_BACKENDS), choices=TRANSCRIPTION_BACKENDS,
+                        help='Backends to compare; drift is measured against the first')
+    parser.add_argument('--model', default='base.en', help='Whisper model size')
+    parser.add_argument('--threads', type=int, default=0, help='CPU threads per backend (0 = backend default)')
+    parser.add_argument('--json', help='Also write the per-file results to this JSON file')
+    args = parser.parse_args()
+
+    corpus = Path(args.corpus)
+    try:
+        if corpus.suffix.lower() == '.json':
+            files = synthesize_corpus(corpus)
+        elif corpus.is_file():
+            files = [corpus]
+        else:
+            files = sorted(p for p in corpus.iterdir() if p.suffix.lower() in AUDIO_EXTENSIONS)
+        if not files:
+            raise ValueError(f"No audio files found in {corpus}")
+        rows = run_benchmark(files, args.backends, args.model, args.threads)
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print_summary(rows, args.backends)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,57 +1,166 @@
 """
 Caption generator using OpenAI's Whisper for word-level timestamps
 """
-import whisper
 import os
+import io
+import re
+import bisect
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Union
+from utils.disk_cache import DiskCache
 from utils.logger import setup_logger
+from word_timeline import WordTimeline
+from transcription_backends import TranscriptionBackend, create_backend
+
+CAPTION_MODES = ('tts', 'whisper')
+
+# Transcriptions are cached by (audio SHA-256, backend options)
+TRANSCRIPTION_CACHE_DIR = Path(__file__).parent / 'temp' / 'transcription_cache'
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv('TRANSCRIPTION_CACHE_MAX_MB', '64')) * 1024 * 1024
+
+def _alnum_length(text: str) -> int:
+    return len(re.sub(r'[\W_]+', '', text))
+
+def align_script_words(word_timings: List[Dict], script: str) -> List[Dict]:
+    """
+    Maps timed words onto the tokens of the known script.
+
+    TTS word boundaries omit punctuation and may tokenize differently from the
+    script, so both are laid out on a shared stream of letters/digits and each
+    script token takes its timing from the boundaries that cover its characters.
+
+    Returns:
+        One {'word', 'start', 'end'} entry per script token, keeping its punctuation.
+    """
+    if not word_timings:
+        return []
+
+    # Cumulative character end position of each timed word
+    ends = []
+    position = 0
+    for word in word_timings:
+        position += _alnum_length(word['word'])
+        ends.append(position)
+
+    aligned = []
+    position = 0
+    last = len(word_timings) - 1
+    for token in script.split():
+        length = _alnum_length(token)
+        if length == 0:
+            continue
+        first_index = min(bisect.bisect_right(ends, position), last)
+        last_index = min(bisect.bisect_right(ends, position + length - 1), last)
+        aligned.append({
+            'word': token,
+            'start': word_timings[first_index]['start'],
+            'end': word_timings[last_index]['end']
+        })
+        position += length
+    return aligned
 
 class CaptionGenerator:
-    def __init__(self, model_name: str = "base.en"):
+    def __init__(
+        self,
+        model_name: str = "base.en",
+        backend: Optional[str] = None,
+        threads: Optional[int] = None,
+        use_cache: bool = True
+    ):
+        """
+        Args:
+            model_name: Whisper model size, e.g. 'base.en'
+            backend: Transcription backend ('whisper' or 'faster-whisper'); defaults to $TRANSCRIPTION_BACKEND
+            threads: CPU threads for transcription; defaults to $TRANSCRIPTION_THREADS
+            use_cache: Reuse earlier transcriptions of identical audio
+        """
         self.logger = setup_logger('caption_generator')
         self.model_name = model_name
-        self.model = None
+        self.backend: TranscriptionBackend = create_backend(backend, model_name, threads)
+        self.cache = DiskCache(TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_MAX_BYTES) if use_cache else None
 
     def _load_model(self):
-        """Loads the Whisper model, downloading it if necessary."""
-        if self.model is None:
-            self.logger.info(f"Loading Whisper model: {self.model_name}...")
-            # Specify a directory within the project to store downloaded models
-            model_path = Path("temp/whisper_models")
-            model_path.mkdir(parents=True, exist_ok=True)
-            self.model = whisper.load_model(self.model_name, download_root=str(model_path))
-            self.logger.info("Whisper model loaded successfully.")
+        """Loads the transcription model, downloading it if necessary."""
+        self.backend.load()
+
+    def generate_captions_from_timing(
+        self,
+        word_timings: List[Dict],
+        script: Optional[str] = None,
+        offset_time: float = 0.0,
+        skip_before: float = 0.0
+    ) -> WordTimeline:
+        """
+        Builds captions from known word timings (e.g. TTS word boundaries) instead of transcribing.
+
+        Args:
+            word_timings: [{'word', 'start', 'end'}] timings in seconds.
+            script: The text that was synthesized; when given, caption words keep its punctuation.
+            offset_time: A duration in seconds to add to all word timestamps.
+            skip_before: Drop words centered before this time (e.g. the spoken title).
 
-    def generate_captions(self, audio_path: Union[str, Path], offset_time: float = 0.0) -> Dict:
+        Returns:
+            The caption WordTimeline.
         """
-        Generates segment and word-level captions from an audio file.
+        words = align_script_words(word_timings, script) if script else word_timings
+        timeline = WordTimeline.from_words(words).skip_before(skip_before).shift(offset_time)
+
+        self.logger.info(f"Built captions for {len(timeline)} words from TTS word timings.")
+        return timeline
+
+    def generate_captions(self, audio_path: Union[str, Path], offset_time: float = 0.0, skip_before: float = 0.0) -> WordTimeline:
+        """
+        Generates word-level captions from an audio file.
 
         Args:
             audio_path: Path to the audio file.
             offset_time: A duration in seconds to add to all word timestamps.
+            skip_before: Drop words centered before this time (e.g. the spoken title).
 
         Returns:
-            The raw result dictionary from Whisper, with timestamps potentially offset.
+            The caption WordTimeline, with timestamps potentially offset.
         """
-        self._load_model()
-        
-        self.logger.info(f"Transcribing audio file: {audio_path}")
         try:
-            # Use fp16=False for better CPU compatibility
-            result = self.model.transcribe(str(audio_path), word_timestamps=True, fp16=False)
-            
+            timeline = self.transcribe(audio_path).skip_before(skip_before)
+
             # If an offset is provided, add it to all word timings
             if offset_time > 0:
                 self.logger.info(f"Offsetting all caption timestamps by {offset_time:.2f} seconds.")
-                for segment in result.get('segments', []):
-                    for word in segment.get('words', []):
-                        word['start'] += offset_time
-                        word['end'] += offset_time
+                timeline = timeline.shift(offset_time)
             
             self.logger.info(f"Successfully transcribed audio and generated captions.")
-            return result
+            return timeline
 
         except Exception as e:
             self.logger.error(f"Error during transcription: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+    def transcribe(self, audio_path: Union[str, Path]) -> WordTimeline:
+        """
+        Transcribes an audio file, reusing the cached result for identical audio.
+
+        The cache holds the untrimmed, unshifted timeline, so callers apply
+        skip_before/offset after the lookup and every caller can share an entry.
+        """
+        cache_key = None
+        if self.cache:
+            options = sorted(self.backend.options().items())
+            cache_key = self.cache.make_key(DiskCache.hash_file(audio_path), *(f"{k}={v}" for k, v in options))
+            cached = self.cache.get(cache_key, '.npz')
+            if cached:
+                try:
+                    timeline = WordTimeline.load(cached)
+                    self.logger.info(f"Using cached transcription for {audio_path}")
+                    return timeline
+                except Exception as e:
+                    self.logger.warning(f"Ignoring unreadable cached transcription {cached}: {e}")
+
+        self.logger.info(f"Transcribing audio file: {audio_path} ({self.backend.name})")
+        timeline = self.backend.transcribe(audio_path)
+
+        if self.cache:
+            buffer = io.BytesIO()
+            timeline.save(buffer)
+            self.cache.put_bytes(cache_key, '.npz', buffer.getvalue())
+            self.cache.evict()
+        return timeline
@@ -0,0 +1,157 @@
+"""
+Caption layout: packs timed words into on-screen caption chunks.
+
+Chunks are limited by the rendered width of their text (from the caption
+font's glyph advances), by how long they stay on screen and by a word count,
+and a chunk never spans a silence. Packing works on NumPy arrays of word
+widths and times: each chunk's end is found with a binary search over
+cumulative sums, so a layout costs O(chunks * log words) array operations
+and is cheap to recompute for another caption style.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Sequence
+import numpy as np
+from caption_renderer import load_font
+from word_timeline import WordTimeline
+
+# Default packing budgets
+MAX_WORDS = 4
+MAX_DURATION = 3.0  # seconds a chunk may stay on screen
+SPLIT_GAP = 0.5  # a pause at least this long always starts a new chunk
+
+
+@lru_cache(maxsize=8192)
+def word_width(word: str, font: str, size: int) -> float:
+    """Advance width of a word in pixels, cached per font and size."""
+    return load_font(font, size).getlength(word)
+
+
+class CaptionLayout:
+    """
+    Array-backed caption timeline.
+
+    Chunk i shows words[first_word[i]:first_word[i + 1]] from start[i] to
+    end[i]. Chunks are sorted by start time.
+    """
+
+    def __init__(self, words: Sequence[str], first_word: np.ndarray, start: np.ndarray, end: np.ndarray):
+        self.words = words
+        self.first_word = first_word
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def text(self, index: int) -> str:
+        return ' '.join(self.words[self.first_word[index]:self.first_word[index + 1]])
+
+    def texts(self) -> List[str]:
+        return [self.text(i) for i in range(len(self))]
+
+    def chunk_at(self, t: float) -> int:
+        """Index of the chunk on screen at time t, or -1 if none is."""
+        index = int(np.searchsorted(self.start, t, side='right')) - 1
+        if index < 0 or t >= self.end[index]:
+            return -1
+        return index
+
+
+def layout_words(
+    words: Sequence[str],
+    starts: np.ndarray,
+    ends: np.ndarray,
+    widths: np.ndarray,
+    space_width: float,
+    max_width: float,
+    max_words: int = MAX_WORDS,
+    max_duration: float = MAX_DURATION,
+    split_gap: float = SPLIT_GAP
+) -> CaptionLayout:
+    """
+    Greedily packs words into chunks within the width, duration and word budgets.
+
+    Building the cumulative arrays is O(words); each chunk then costs three
+    binary searches, so packing is O(chunks * log words), not a linear pass.
+
+    Args:
+        words: Caption words, in spoken order
+        starts, ends: Word times in seconds
+        widths: Rendered width of every word in pixels
+        space_width: Width of the space between two words
+        max_width: Widest a chunk's text may be
+        max_words: Most words in a chunk
+        max_duration: Longest a chunk may stay on screen
+        split_gap: Pause between two words that always separates their chunks
+
+    Returns:
+        The CaptionLayout. A single word that breaks a budget gets a chunk of its own.
+    """
+    count = len(words)
+    if count == 0:
+        return CaptionLayout(words, np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32))
+    starts = np.asarray(starts, dtype=np.float64)
+    # Running maximum, so the end times can be binary searched
+    ends = np.maximum.accumulate(np.asarray(ends, dtype=np.float64))
+
+    # cumulative[k] is the width of words[:k] with a trailing space after each,
+    # so words[i:j] measures cumulative[j] - cumulative[i] - space_width
+    cumulative = np.concatenate(([0.0], np.cumsum(np.asarray(widths, dtype=np.float64) + space_width)))
+
+    # Indices of the words that must start a new chunk because of a pause before them
+    forced = np.flatnonzero(starts[1:] - ends[:-1] >= split_gap) + 1
+
+    boundaries = [0]
+    i = 0
+    while i < count:
+        j = min(count, i + max_words)
+        j = min(j, int(np.searchsorted(cumulative, cumulative[i] + space_width + max_width, side='right')) - 1)
+        j = min(j, int(np.searchsorted(ends, starts[i] + max_duration, side='right')))
+        next_forced = int(np.searchsorted(forced, i, side='right'))
+        if next_forced < len(forced):
+            j = min(j, int(forced[next_forced]))
+        i = max(j, i + 1)
+        boundaries.append(i)
+
+    first_word = np.asarray(boundaries, dtype=np.int32)
+    chunk_start = starts[first_word[:-1]].astype(np.float32)
+    chunk_end = ends[first_word[1:] - 1].astype(np.float32)
+    return CaptionLayout(words, first_word, chunk_start, chunk_end)
+
+
+class CaptionLayoutEngine:
+    """Lays out captions for one caption style."""
+
+    def __init__(
+        self,
+        caption_style: Dict,
+        max_width: float,
+        max_words: int = MAX_WORDS,
+        max_duration: float = MAX_DURATION,
+        split_gap: float = SPLIT_GAP
+    ):
+        self.font = caption_style['font']
+        self.fontsize = caption_style['fontsize']
+        # The stroke outline widens the rendered text on both sides
+        self.max_width = max_width - 2 * caption_style.get('stroke_width', 0)
+        self.max_words = max_words
+        self.max_duration = max_duration
+        self.split_gap = split_gap
+
+    def layout(self, words: Sequence[str], starts: np.ndarray, ends: np.ndarray) -> CaptionLayout:
+        """Packs words (as displayed, e.g. upper-cased) with their times into chunks."""
+        widths = np.fromiter((word_width(word, self.font, self.fontsize) for word in words), dtype=np.float64, count=len(words))
+        return layout_words(
+            words, starts, ends, widths,
+            space_width=word_width(' ', self.font, self.fontsize),
+            max_width=self.max_width,
+            max_words=self.max_words,
+            max_duration=self.max_duration,
+            split_gap=self.split_gap
+        )
+
+    def layout_timeline(self, timeline: WordTimeline, uppercase: bool = False) -> CaptionLayout:
+        """Packs the words of a WordTimeline, optionally displayed upper-cased."""
+        words = [word.upper() for word in timeline.words] if uppercase else timeline.words
+        return self.layout(words, timeline.start, timeline.end)
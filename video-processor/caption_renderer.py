@@ -0,0 +1,186 @@
+"""
+In-process caption rasterizer using Pillow/FreeType.
+
+Caption chunks are rendered once into RGBA NumPy arrays (text plus stroke
+outline) and cached in an LRU, so the editor can blit them straight onto
+frames instead of shelling out to ImageMagick for every chunk.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from compositing import Sprite
+from utils.logger import setup_logger
+
+# Font file candidates tried for each font family, in order
+FONT_CANDIDATES = {
+    'Impact': [
+        'impact.ttf',
+        'Impact.ttf',
+        '/usr/share/fonts/truetype/msttcorefonts/Impact.ttf',
+        '/Library/Fonts/Impact.ttf',
+        '/System/Library/Fonts/Supplemental/Impact.ttf',
+    ],
+}
+FALLBACK_FONTS = [
+    'DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    'arialbd.ttf',
+]
+
+CACHE_SIZE = 2048
+
+
+@lru_cache(maxsize=64)
+def load_font(font: str, size: int) -> ImageFont.FreeTypeFont:
+    """Loads a TrueType font by family name or file path, with fallbacks."""
+    for candidate in [font, *FONT_CANDIDATES.get(font, []), *FALLBACK_FONTS]:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        # Scalable since Pillow 10.1
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        setup_logger('caption_renderer').warning(
+            f"No TrueType font found for '{font}' and this Pillow has no scalable default font; "
+            f"captions use the small bitmap font (install fonts-dejavu-core or Pillow>=10.1)"
+        )
+        return ImageFont.load_default()
+
+
+def font_metrics(font: ImageFont.FreeTypeFont) -> Tuple[int, int]:
+    """(ascent, descent) of a font; the bitmap default font of older Pillow has no getmetrics."""
+    if hasattr(font, 'getmetrics'):
+        return font.getmetrics()
+    return font.getbbox('Ag')[3], 0
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int, stroke_width: int = 0) -> List[str]:
+    """Greedily wraps text into lines no wider than max_width pixels."""
+    lines = []
+    current = ''
+    for word in text.split():
+        candidate = f'{current} {word}' if current else word
+        if current and font.getlength(candidate) + 2 * stroke_width > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def rasterize_text(
+    text: str,
+    font: str,
+    size: int,
+    color: str,
+    stroke_color: str,
+    stroke_width: int,
+    max_width: int
+) -> np.ndarray:
+    """
+    Renders centered, word-wrapped text with a stroke outline.
+
+    Results are cached by all of their arguments, so repeated chunks (and
+    re-renders with the same style) are only rasterized once.
+
+    Returns:
+        A read-only (height, width, 4) uint8 RGBA array
+    """
+    pil_font = load_font(font, size)
+    lines = wrap_text(text, pil_font, max_width, stroke_width) or ['']
+
+    ascent, descent = font_metrics(pil_font)
+    line_height = ascent + descent + 2 * stroke_width
+    line_widths = [int(pil_font.getlength(line)) + 2 * stroke_width for line in lines]
+    width = max(1, min(max_width, max(line_widths)))
+    height = line_height * len(lines)
+
+    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for i, (line, line_width) in enumerate(zip(lines, line_widths)):
+        x = (width - line_width) // 2 + stroke_width
+        y = i * line_height + stroke_width
+        draw.text(
+            (x, y),
+            line,
+            font=pil_font,
+            fill=color,
+            stroke_width=stroke_width,
+            stroke_fill=stroke_color
+        )
+
+    sprite = np.asarray(image, dtype=np.uint8)
+    sprite.flags.writeable = False
+    return sprite
+
+
+def rasterize_intro(image_path, title: str, target_width: int, font: str = 'Impact', fontsize: int = 32) -> np.ndarray:
+    """
+    Renders the intro card: the intro image with the title drawn over it,
+    scaled to target_width.
+
+    Returns:
+        A (height, width, 4) uint8 RGBA array
+    """
+    image = Image.open(image_path).convert('RGBA')
+    pil_font = load_font(font, fontsize)
+
+    # Title box: 85% of the width, 60% of the height, left-aligned and
+    # vertically centered, with its top-left corner at (60, 32% of the height)
+    box_width = int(image.width * 0.85)
+    box_height = int(image.height * 0.6)
+    lines = wrap_text(title.upper(), pil_font, box_width)
+    ascent, descent = font_metrics(pil_font)
+    line_height = ascent + descent
+    y = int(image.height * 0.32) + max(0, (box_height - line_height * len(lines)) // 2)
+
+    draw = ImageDraw.Draw(image)
+    for line in lines:
+        draw.text((60, y), line, font=pil_font, fill='black')
+        y += line_height
+
+    target_height = round(image.height * target_width / image.width)
+    image = image.resize((int(target_width), int(target_height)), Image.LANCZOS)
+    return np.asarray(image, dtype=np.uint8)
+
+
+class CaptionRenderer:
+    def __init__(self, caption_style: dict, max_width: int, cached: bool = True):
+        self.logger = setup_logger('caption_renderer')
+        self.caption_style = caption_style
+        self.max_width = max_width
+        # Uncached rendering keeps sprites out of the LRU, for memory-bounded renders
+        self._rasterize = rasterize_text if cached else rasterize_text.__wrapped__
+
+    def render(self, text: str) -> np.ndarray:
+        """Returns the RGBA sprite for a caption chunk."""
+        return self._rasterize(
+            text,
+            self.caption_style['font'],
+            self.caption_style['fontsize'],
+            self.caption_style['color'],
+            self.caption_style['stroke_color'],
+            self.caption_style['stroke_width'],
+            self.max_width
+        )
+
+    @staticmethod
+    def blit(frame: np.ndarray, sprite: np.ndarray, position: Tuple[int, int]) -> np.ndarray:
+        """
+        Alpha-blends an RGBA sprite onto a writable RGB frame at (x, y), in place.
+
+        For a sprite drawn on many frames, build a compositing.Sprite once instead.
+        """
+        return Sprite(sprite).blend_into(frame, position)
+
+    @staticmethod
+    def cache_info():
+        """Returns the LRU statistics of the sprite cache."""
+        return rasterize_text.cache_info()
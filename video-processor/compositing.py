@@ -0,0 +1,83 @@
+"""
+In-place uint8 compositing of RGBA sprites onto RGB frames.
+
+A sprite is prepared once: cropped to the bounding box of its visible
+pixels and split into premultiplied RGB and inverse alpha. Blending a frame
+then only touches that box and stays in integer arithmetic:
+
+    frame = premultiplied_rgb + round(frame * (255 - alpha) / 255)
+
+using two uint16 scratch buffers owned by the sprite, so no frame-sized
+arrays are allocated per frame.
+"""
+
+from typing import Tuple
+import numpy as np
+
+
+def _div255(values: np.ndarray, scratch: np.ndarray):
+    """Rounded division by 255 of uint16 values in place (exact for values <= 255 * 255)."""
+    values += 128
+    np.right_shift(values, 8, out=scratch)
+    values += scratch
+    values >>= 8
+
+
+class Sprite:
+    """
+    A premultiplied RGBA overlay, ready to blend into frames.
+
+    Instances keep scratch buffers for blending, so one sprite must not be
+    blended from several threads at the same time.
+    """
+
+    def __init__(self, rgba: np.ndarray):
+        alpha = rgba[..., 3]
+        rows = np.flatnonzero(alpha.any(axis=1))
+        cols = np.flatnonzero(alpha.any(axis=0))
+        # Full sprite size, for positioning; the stored pixels are the visible box
+        self.height, self.width = rgba.shape[:2]
+        if len(rows) == 0:
+            self.offset = (0, 0)
+            self.premultiplied = np.zeros((0, 0, 3), dtype=np.uint16)
+            self.inverse_alpha = np.zeros((0, 0, 1), dtype=np.uint16)
+        else:
+            top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            self.offset = (int(left), int(top))
+            box = rgba[top:bottom, left:right]
+            box_alpha = box[..., 3:4].astype(np.uint16)
+            self.premultiplied = box[..., :3].astype(np.uint16) * box_alpha
+            _div255(self.premultiplied, np.empty_like(self.premultiplied))
+            self.inverse_alpha = 255 - box_alpha
+        self._scratch = np.empty(self.premultiplied.shape, dtype=np.uint16)
+        self._carry = np.empty(self.premultiplied.shape, dtype=np.uint16)
+
+    def centered(self, frame_size: Tuple[int, int]) -> Tuple[int, int]:
+        """Position that centers the sprite on a (width, height) frame."""
+        return (frame_size[0] - self.width) // 2, (frame_size[1] - self.height) // 2
+
+    def blend_into(self, frame: np.ndarray, position: Tuple[int, int]) -> np.ndarray:
+        """
+        Blends the sprite into a writable uint8 RGB frame in place.
+
+        The sprite is clipped to the frame bounds; only the covered part of
+        its visible box is touched.
+        """
+        x = position[0] + self.offset[0]
+        y = position[1] + self.offset[1]
+        box_h, box_w = self.premultiplied.shape[:2]
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + box_w, frame_w), min(y + box_h, frame_h)
+        if x0 >= x1 or y0 >= y1:
+            return frame
+
+        sy, sx = slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)
+        region = frame[y0:y1, x0:x1]
+        scratch = self._scratch[sy, sx]
+        np.multiply(region, self.inverse_alpha[sy, sx], out=scratch)
+        _div255(scratch, self._carry[sy, sx])
+        scratch += self.premultiplied[sy, sx]
+        np.copyto(region, scratch, casting='unsafe')
+        return frame
+
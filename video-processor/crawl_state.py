@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Persistent crawl state for incremental subreddit scraping.
+
+Stores every submission id a --since-last-run scrape has returned, plus a
+high-water mark per (subreddit, sort): the newest post down to which every
+post in the listing was handled. Scheduled runs stop paging once the listing
+reaches the mark, and skip seen posts in the window above it.
+
+The mark only moves when a run scanned the whole window from the top of the
+listing down to the old mark (or the end of the listing). A run that stops at
+--num-posts first leaves unreturned posts below it, so it keeps the old mark
+and the next run picks those posts up through the seen set.
+"""
+
+import sys
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Iterable, Optional, Set
+from utils.logger import setup_logger
+
+
+class CrawlState:
+    def __init__(self, db_path: Optional[Path] = None):
+        self.logger = setup_logger('crawl_state')
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / 'temp' / 'crawl_state.sqlite'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_posts (
+                    post_id TEXT PRIMARY KEY,
+                    subreddit TEXT NOT NULL,
+                    seen_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS listing_marks (
+                    subreddit TEXT NOT NULL,
+                    sort TEXT NOT NULL,
+                    post_id TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (subreddit, sort)
+                )
+            """)
+
+    def seen_ids(self, post_ids: Iterable[str]) -> Set[str]:
+        """Returns the subset of post_ids that earlier runs have already returned."""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return set()
+        placeholders = ','.join('?' * len(post_ids))
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT post_id FROM seen_posts WHERE post_id IN ({placeholders})", post_ids).fetchall()
+        return {row['post_id'] for row in rows}
+
+    def mark_seen(self, post_ids: Iterable[str], subreddit: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_posts (post_id, subreddit, seen_at) VALUES (?, ?, ?)",
+                [(post_id, subreddit.lower(), now) for post_id in post_ids]
+            )
+
+    def get_mark(self, subreddit: str, sort: str) -> Optional[str]:
+        """Returns the listing's high-water mark post id, or None before the first complete run."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT post_id FROM listing_marks WHERE subreddit = ? AND sort = ?",
+                (subreddit.lower(), sort)
+            ).fetchone()
+        return row['post_id'] if row else None
+
+    def set_mark(self, subreddit: str, sort: str, post_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO listing_marks (subreddit, sort, post_id, updated_at) VALUES (?, ?, ?, ?)",
+                (subreddit.lower(), sort, post_id, time.time())
+            )
+
+    def reset(self, subreddit: Optional[str] = None) -> int:
+        """
+        Forgets seen posts and marks, for one subreddit or all of them.
+
+        Returns:
+            Number of seen posts forgotten
+        """
+        with self._connect() as conn:
+            if subreddit:
+                count = conn.execute("DELETE FROM seen_posts WHERE subreddit = ?", (subreddit.lower(),)).rowcount
+                conn.execute("DELETE FROM listing_marks WHERE subreddit = ?", (subreddit.lower(),))
+            else:
+                count = conn.execute("DELETE FROM seen_posts").rowcount
+                conn.execute("DELETE FROM listing_marks")
+        return count
+
+
+def reached_mark(post_id: str, mark: Optional[str], sort: str) -> bool:
+    """
+    True once a listing has paged down to its high-water mark.
+
+    'new' is ordered by creation and ids are base-36 creation counters, so
+    any post at or older than the mark counts, even if the mark was deleted.
+    Ranked listings only stop at the mark post itself.
+    """
+    if mark is None:
+        return False
+    if sort == 'new':
+        return int(post_id, 36) <= int(mark, 36)
+    return post_id == mark
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or reset the incremental crawl state.')
+    parser.add_argument('--subreddit', help='Limit to one subreddit')
+    parser.add_argument('--reset', action='store_true', help='Forget seen posts and marks')
+    args = parser.parse_args()
+
+    state = CrawlState()
+    try:
+        if args.reset:
+            count = state.reset(args.subreddit)
+            state.logger.info(f"Forgot {count} seen posts")
+            return
+
+        with state._connect() as conn:
+            query = "SELECT subreddit, COUNT(*) AS seen, MAX(seen_at) AS last_seen FROM seen_posts"
+            params = ()
+            if args.subreddit:
+                query += " WHERE subreddit = ?"
+                params = (args.subreddit.lower(),)
+            for row in conn.execute(query + " GROUP BY subreddit", params):
+                print(f"r/{row['subreddit']}: {row['seen']} posts seen, last "
+                      f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(row['last_seen']))}")
+            query = "SELECT subreddit, sort, post_id FROM listing_marks"
+            if args.subreddit:
+                query += " WHERE subreddit = ?"
+            for row in conn.execute(query, params):
+                print(f"r/{row['subreddit']} {row['sort']}: mark={row['post_id']}")
+    except Exception as e:
+        state.logger.error(f"Error reading crawl state: {e}", exc_info=True)
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import re
 from pathlib import Path
 import yt_dlp
 from youtube_downloader import YouTubeDownloader
+from background_index import BackgroundIndex
 
 def sanitize_filename(filename):
     """Removes illegal characters from a filename."""
@@ -38,6 +39,10 @@ def main():
         print(f"--- Starting download for URL: {args.url} ---", file=sys.stderr)
         
         downloader._download_video(args.url, output_path, duration=None)
+
+        # Add the new clip to the background index so selection sees it right away
+        print("--- Indexing downloaded video ---", file=sys.stderr)
+        BackgroundIndex(downloads_dir=output_dir.parent).add(output_path, category=output_dir.name)
         
         print("--- Download finished, providing path to backend ---", file=sys.stderr)
         # Output the full, clean path of the created file
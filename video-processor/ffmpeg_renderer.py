@@ -0,0 +1,207 @@
+"""
+Single-pass ffmpeg render backend.
+
+Does the same work as VideoEditor's MoviePy path (background subclip or loop,
+9:16 crop, scale to 1080x1920, intro overlay, timed captions) in one ffmpeg
+invocation, so frames never pass through Python.
+"""
+
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from render_profiles import encoder_args
+from utils.logger import setup_logger
+
+
+def background_filter(width: int, height: int, fps: int) -> str:
+    """Center crop to 9:16, then scale to the output size and frame rate."""
+    return (
+        f"crop=w='trunc(min(iw,ih*9/16)/2)*2':h='trunc(min(ih,iw*16/9)/2)*2',"
+        f"scale={width}:{height},setsar=1,fps={fps}"
+    )
+
+
+class FFmpegRenderer:
+    def __init__(self, video_config: dict):
+        self.logger = setup_logger('ffmpeg_renderer')
+        self.video_config = video_config
+
+    def _write_caption_track(
+        self,
+        caption_sprites: List[Tuple[float, float, np.ndarray]],
+        work_dir: Path
+    ) -> Tuple[Path, Tuple[int, int]]:
+        """
+        Writes captions as a single RGBA image track for ffmpeg's concat demuxer.
+
+        Every sprite is centered on a shared transparent canvas, and gaps between
+        captions are filled with a blank canvas, so one overlay filter places all
+        captions exactly where the MoviePy path would.
+
+        Returns:
+            Path to the ffconcat file and the (width, height) of the canvas
+        """
+        canvas_w = max([sprite.shape[1] for _, _, sprite in caption_sprites] + [2])
+        canvas_h = max([sprite.shape[0] for _, _, sprite in caption_sprites] + [2])
+        # Even dimensions keep the overlay position identical to the frame center
+        canvas_w += canvas_w % 2
+        canvas_h += canvas_h % 2
+
+        blank_path = work_dir / 'blank.png'
+        Image.new('RGBA', (canvas_w, canvas_h), (0, 0, 0, 0)).save(blank_path)
+
+        entries = []
+        cursor = 0.0
+        sprite_paths = {}
+        for i, (start, end, sprite) in enumerate(caption_sprites):
+            # A caption is replaced as soon as the next one starts
+            if i + 1 < len(caption_sprites):
+                end = min(end, caption_sprites[i + 1][0])
+            if end <= start:
+                continue
+            if start > cursor:
+                entries.append((blank_path, start - cursor))
+
+            key = id(sprite)
+            if key not in sprite_paths:
+                canvas = np.zeros((canvas_h, canvas_w, 4), dtype=np.uint8)
+                x = (canvas_w - sprite.shape[1]) // 2
+                y = (canvas_h - sprite.shape[0]) // 2
+                canvas[y:y + sprite.shape[0], x:x + sprite.shape[1]] = sprite
+                sprite_paths[key] = work_dir / f'caption_{len(sprite_paths):05d}.png'
+                Image.fromarray(canvas, 'RGBA').save(sprite_paths[key], compress_level=1)
+
+            entries.append((sprite_paths[key], end - max(start, cursor)))
+            cursor = end
+
+        entries.append((blank_path, 0.001))
+
+        concat_path = work_dir / 'captions.ffconcat'
+        with open(concat_path, 'w', encoding='utf-8') as f:
+            f.write('ffconcat version 1.0\n')
+            for path, duration in entries:
+                f.write(f"file '{path.as_posix()}'\nduration {duration:.6f}\n")
+            # The concat demuxer ignores the duration of the last entry
+            f.write(f"file '{blank_path.as_posix()}'\n")
+
+        return concat_path, (canvas_w, canvas_h)
+
+    def render(
+        self,
+        background_video_path: Path,
+        background_start: Optional[float],
+        audio_clip_path: Path,
+        duration: float,
+        caption_sprites: List[Tuple[float, float, np.ndarray]],
+        intro_sprite: np.ndarray,
+        title_duration: float,
+        output_path: Path,
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> Path:
+        """
+        Renders the story video with a single ffmpeg command.
+
+        Args:
+            background_video_path: Path to the background video file.
+            background_start: Offset into the background, or None to loop it.
+            audio_clip_path: Path to the narration audio.
+            duration: Output duration in seconds.
+            caption_sprites: (start_time, end_time, sprite) tuples sorted by start time.
+            intro_sprite: RGBA intro card, already scaled to its on-screen size.
+            title_duration: How long the intro card is shown.
+            output_path: Path to save the final video.
+            progress_callback: Optional callback receiving progress from 0 to 100.
+
+        Returns:
+            Path to the created video file.
+        """
+        width = self.video_config['width']
+        height = self.video_config['height']
+        fps = self.video_config['fps']
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            work_dir = Path(temp_dir)
+            intro_path = work_dir / 'intro.png'
+            Image.fromarray(intro_sprite, 'RGBA').save(intro_path)
+            captions_path, _ = self._write_caption_track(caption_sprites, work_dir)
+
+            if background_start is None:
+                background_input = ['-stream_loop', '-1', '-i', str(background_video_path)]
+            else:
+                background_input = ['-ss', f'{background_start:.3f}', '-i', str(background_video_path)]
+
+            filter_graph = ';'.join([
+                f"[0:v]{background_filter(width, height, fps)}[bg]",
+                f"[bg][2:v]overlay=(W-w)/2:(H-h)/2:enable='between(t,0,{title_duration:.3f})'[intro]",
+                f"[intro][3:v]overlay=(W-w)/2:(H-h)/2:eof_action=pass,format=yuv420p[v]",
+            ])
+
+            command = [
+                'ffmpeg', '-y', '-nostdin', '-loglevel', 'error',
+                *background_input,
+                '-i', str(audio_clip_path),
+                '-loop', '1', '-i', str(intro_path),
+                '-f', 'concat', '-safe', '0', '-i', str(captions_path),
+                '-filter_complex', filter_graph,
+                '-map', '[v]', '-map', '1:a',
+                '-t', f'{duration:.3f}',
+                '-r', str(fps),
+                *encoder_args(self.video_config),
+                '-c:a', self.video_config['audio_codec'],
+                '-progress', 'pipe:1',
+                str(output_path)
+            ]
+
+            self.logger.info("Rendering with ffmpeg filtergraph... (single pass)")
+            self._run(command, duration, progress_callback)
+
+        self.logger.info(f"Successfully created video: {output_path}")
+        return Path(output_path)
+
+    def concat_segments(self, segment_paths: List[Path], audio_clip_path: Path, output_path: Path) -> Path:
+        """
+        Joins separately encoded video segments and adds the narration.
+
+        The segments share codec settings, so the concat demuxer copies their
+        streams without re-encoding; only the audio is encoded, once.
+
+        Returns:
+            Path to the joined video file.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            list_path = Path(temp_dir) / 'segments.ffconcat'
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write('ffconcat version 1.0\n')
+                for path in segment_paths:
+                    f.write(f"file '{Path(path).resolve().as_posix()}'\n")
+
+            command = [
+                'ffmpeg', '-y', '-nostdin', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0', '-i', str(list_path),
+                '-i', str(audio_clip_path),
+                '-map', '0:v', '-map', '1:a',
+                '-c:v', 'copy',
+                '-c:a', self.video_config['audio_codec'],
+                str(output_path)
+            ]
+            self.logger.info(f"Joining {len(segment_paths)} segments (stream copy)...")
+            self._run(command, 0, None)
+
+        return Path(output_path)
+
+    def _run(self, command: List[str], duration: float, progress_callback: Optional[Callable[[float], None]]):
+        """Runs ffmpeg, forwarding -progress output to the callback."""
+        # stderr goes to a file: a full stderr pipe would block ffmpeg while stdout is read
+        with tempfile.TemporaryFile() as stderr_log:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_log, text=True)
+            for line in process.stdout:
+                key, _, value = line.strip().partition('=')
+                if key == 'out_time_us' and progress_callback and duration > 0 and value.isdigit():
+                    progress_callback(min(100.0, int(value) / 1e6 / duration * 100))
+
+            if process.wait() != 0:
+                stderr_log.seek(0)
+                raise RuntimeError(f"ffmpeg render failed: {stderr_log.read().decode('utf-8', 'replace').strip()}")
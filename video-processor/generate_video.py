@@ -4,29 +4,98 @@ Main video generation script that orchestrates the entire process
 """
 
 import sys
+import json
 import argparse
 import os
 import tempfile
 from pathlib import Path
 
 from reddit_scraper import RedditScraper
+from async_reddit_scraper import AsyncRedditScraper
 from youtube_downloader import YouTubeDownloader
 from text_to_speech import TextToSpeechGenerator
-from video_editor import VideoEditor
-from caption_generator import CaptionGenerator
+from video_editor import VideoEditor, RENDER_BACKENDS
+from caption_generator import CaptionGenerator, CAPTION_MODES
+from transcription_backends import TRANSCRIPTION_BACKENDS
+from render_profiles import DEFAULT_RENDER_PROFILE, RENDER_PROFILES
+from batch_generator import BatchGenerator
 from utils.logger import setup_logger
 from moviepy.editor import AudioFileClip, concatenate_audioclips
 
+def run_batch(args):
+    """Renders one video per post, sharing setup across the whole batch."""
+    logger = setup_logger(f'video_gen_{args.job_id}')
+    try:
+        if args.posts_file:
+            with open(args.posts_file, 'r', encoding='utf-8') as f:
+                posts = json.load(f)
+        else:
+            logger.info('Scraping Reddit posts...')
+            scraper = AsyncRedditScraper() if args.async_scrape else RedditScraper()
+            posts = scraper.scrape_posts(args.reddit_url, args.num_posts, args.sort_by, since_last_run=args.since_last_run)
+        if not posts and args.since_last_run:
+            logger.info('No new posts since the last run.')
+            return
+        if not posts:
+            raise Exception("No posts were scraped.")
+
+        generator = BatchGenerator(
+            io_workers=args.io_workers,
+            render_workers=args.render_workers,
+            transcribe_workers=args.transcribe_workers,
+            voice_type=args.voice_type,
+            background_type=args.background_type,
+            render_backend=args.render_backend,
+            caption_mode=args.caption_mode,
+            transcription_backend=args.transcription_backend,
+            transcription_threads=args.transcription_threads,
+            render_profile=args.render_profile
+        )
+        results = generator.run(posts, Path(args.output_dir))
+
+        failed = [result for result in results if 'error' in result]
+        logger.info(f'Batch complete: {len(results) - len(failed)} succeeded, {len(failed)} failed')
+        if failed:
+            sys.exit(1)
+
+    except Exception as e:
+        logger.error(f'Error generating batch: {str(e)}')
+        print(f'ERROR:{str(e)}')
+        sys.exit(1)
+
 def main():
     parser = argparse.ArgumentParser(description='Generate Reddit story videos')
     parser.add_argument('--job-id', required=True, help='Job ID for tracking')
-    parser.add_argument('--reddit-url', required=True, help='Reddit URL to scrape')
+    parser.add_argument('--reddit-url', help='Reddit URL to scrape')
     parser.add_argument('--num-posts', type=int, default=1, help='Number of posts to include')
     parser.add_argument('--voice-type', default='female', help='Voice type for TTS')
     parser.add_argument('--background-type', default='minecraft', help='Background video type')
-    parser.add_argument('--output-path', required=True, help='Output video path')
+    parser.add_argument('--output-path', help='Output video path')
+    parser.add_argument('--batch', action='store_true', help='Render one video per post into --output-dir')
+    parser.add_argument('--posts-file', help='JSON file of posts to render in batch mode (instead of --reddit-url)')
+    parser.add_argument('--output-dir', help='Output directory for batch mode')
+    parser.add_argument('--sort-by', default='hot', choices=['hot', 'new', 'top', 'rising', 'controversial'], help='Sort method for subreddit posts')
+    parser.add_argument('--since-last-run', action='store_true', help='In batch mode, only render posts that earlier --since-last-run batches have not scraped')
+    parser.add_argument('--async-scrape', action='store_true', help='Scrape posts and comments concurrently over the Reddit JSON API in batch mode')
+    parser.add_argument('--io-workers', type=int, default=4, help='Concurrent text/TTS/background jobs in batch mode')
+    parser.add_argument('--transcribe-workers', type=int, default=1, help='Concurrent caption jobs in batch mode')
+    parser.add_argument('--render-workers', type=int, default=2, help='Concurrent render processes in batch mode')
+    parser.add_argument('--render-backend', default='moviepy', choices=RENDER_BACKENDS, help='Video render backend')
+    parser.add_argument('--render-profile', default=DEFAULT_RENDER_PROFILE, choices=RENDER_PROFILES, help='Output size and encoder settings (draft renders a fast half-resolution preview)')
+    parser.add_argument('--caption-mode', default='tts', choices=CAPTION_MODES, help='Caption timing source')
+    parser.add_argument('--transcription-backend', choices=TRANSCRIPTION_BACKENDS, help='Speech-to-text backend for Whisper captions (default: $TRANSCRIPTION_BACKEND or whisper)')
+    parser.add_argument('--transcription-threads', type=int, help='CPU threads for speech-to-text (default: $TRANSCRIPTION_THREADS)')
     
     args = parser.parse_args()
+
+    if args.batch:
+        if not args.output_dir or not (args.reddit_url or args.posts_file):
+            parser.error('--batch requires --output-dir and either --reddit-url or --posts-file')
+        run_batch(args)
+        return
+
+    if not args.reddit_url or not args.output_path:
+        parser.error('--reddit-url and --output-path are required')
     
     # Setup logging
     logger = setup_logger(f'video_gen_{args.job_id}')
@@ -77,13 +146,13 @@ def main():
 
             # Step 5: Generate captions using Whisper
             logger.info('Generating synchronized captions with Whisper...')
-            caption_gen = CaptionGenerator()
+            caption_gen = CaptionGenerator(backend=args.transcription_backend, threads=args.transcription_threads)
             captions = caption_gen.generate_captions(audio_file)
             update_progress(80)
             
             # Step 6: Create final video
             logger.info('Creating final video...')
-            video_editor = VideoEditor()
+            video_editor = VideoEditor(args.render_profile)
             video_editor.create_story_video(
                 background_video=background_video,
                 audio_clip_path=audio_file,
@@ -3,203 +3,231 @@
 Video generation script for custom text input
 """
 
-import os
 import sys
 import logging
 import argparse
-import tempfile
 from pathlib import Path
-import subprocess
-import asyncio
-import re
-
-# from alt_profanity_check import predict
+from typing import Callable, Optional
 
+from artifact_store import ArtifactStore
 from background_provider import BackgroundProvider
 from text_to_speech import TextToSpeechGenerator
-from caption_generator import CaptionGenerator
-from video_editor import VideoEditor
+from caption_generator import CaptionGenerator, CAPTION_MODES
+from video_editor import VideoEditor, RENDER_BACKENDS
+from render_profiles import DEFAULT_RENDER_PROFILE, RENDER_PROFILES
+from story_pipeline import StoryJob, StoryPipeline
 from utils.logger import setup_logger
-from moviepy.editor import AudioFileClip
-
-# --- Text Cleaning Function ---
-def clean_text(text: str) -> str:
-    """Removes markdown, URLs, and extra whitespace from text."""
-    # Remove Reddit markdown
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)  # Links
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)      # Bold
-    text = re.sub(r'\*([^*]+)\*', r'\1', text)          # Italics
-    text = re.sub(r'~~([^~]+)~~', r'\1', text)          # Strikethrough
-    text = re.sub(r'^&gt;\s*', '', text, flags=re.MULTILINE)  # Quotes
-    text = re.sub(r'&lt;', '<', text)                   # HTML entities
-    text = re.sub(r'&gt;', '>', text)
-    text = re.sub(r'&amp;', '&', text)
-    
-    # Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    
-    # Clean up whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-# ---
-
-def get_audio_duration(audio_file_path):
+
+# Preview renders default to the ffmpeg backend, which skips MoviePy's per-frame Python work
+PREVIEW_RENDER_PROFILE = 'preview'
+PREVIEW_RENDER_BACKEND = 'ffmpeg'
+
+def manifest_path_for(output_path) -> Path:
+    """Where the render manifest of a preview is written: next to the video."""
+    return Path(output_path).with_suffix('.manifest.json')
+
+def split_title_body(full_text: str):
+    """Splits the raw text file contents into (title, body): the first line is the title."""
+    lines = full_text.split('\\n')
+    return lines[0], '\\n'.join(lines[1:]).strip()
+
+def generate_from_text(
+    job_id: str,
+    full_text: str,
+    output_path,
+    voice_type: str = 'female',
+    background_type: str = 'minecraft',
+    progress_callback: Optional[Callable[[float], None]] = None,
+    logger: Optional[logging.Logger] = None,
+    tts_generator: Optional[TextToSpeechGenerator] = None,
+    caption_gen: Optional[CaptionGenerator] = None,
+    video_editor: Optional[VideoEditor] = None,
+    provider: Optional[BackgroundProvider] = None,
+    render_backend: str = 'moviepy',
+    normalize_background: bool = True,
+    caption_mode: str = 'tts',
+    render_profile: str = DEFAULT_RENDER_PROFILE,
+    manifest_path: Optional[Path] = None,
+    artifact_store: Optional[ArtifactStore] = None,
+    resume: bool = False
+) -> Path:
     """
-    Get the duration of an audio file in seconds.
+    Run the full text-to-video pipeline for a single job.
+
+    Components can be passed in pre-built so a long-lived worker can keep the
+    Whisper model, TTS generator and editor warm between jobs. Any component
+    left as None is created for this job only.
+
+    Args:
+        job_id: Job ID for tracking
+        full_text: Raw story text; the first line is used as the title
+        output_path: Path to save the final video
+        voice_type: Voice type for TTS
+        background_type: Background video category
+        progress_callback: Optional callback receiving progress from 0 to 100
+        logger: Optional logger, defaults to a per-job logger
+        tts_generator: Optional pre-built TextToSpeechGenerator
+        caption_gen: Optional pre-built CaptionGenerator
+        video_editor: Optional pre-built VideoEditor
+        provider: Optional pre-built BackgroundProvider
+        render_backend: Render backend passed to VideoEditor (see video_editor.RENDER_BACKENDS)
+        normalize_background: Render from the cached 1080x1920 mezzanine of the background
+        caption_mode: 'tts' to time captions from the TTS word boundaries, or 'whisper' to transcribe the audio
+        render_profile: Output size and encoder settings ('preview', 'draft', 'standard' or 'archive')
+        manifest_path: Optional path to save a render manifest, so promote_preview can
+            render the same job again without redoing TTS, captions or background selection
+        artifact_store: Optional pre-built ArtifactStore for the stage outputs
+        resume: Keep stage outputs under the job ID, so rerunning a failed job skips the
+            stages that already finished (uses the default ArtifactStore if none is given)
+
+    Returns:
+        Path to the created video file
     """
-    try:
-        # Convert the Path object to a string for moviepy
-        with AudioFileClip(str(audio_file_path)) as audio:
-            return audio.duration
-    except Exception as e:
-        logging.error(f"Error getting audio duration: {e}", exc_info=True)
-        return 0.0
-
-def main(args):
-    parser = argparse.ArgumentParser(description='Generate videos from custom text')
+    if logger is None:
+        logger = setup_logger(f'video_gen_text_{job_id}')
+
+    if progress_callback:
+        progress_callback(5)
+
+    pipeline = StoryPipeline(
+        logger=logger,
+        caption_gen=caption_gen,
+        video_editor=video_editor,
+        provider=provider,
+        artifact_store=(artifact_store or ArtifactStore()) if resume else None
+    )
+    if tts_generator is not None:
+        pipeline.tts_generators[voice_type] = tts_generator
+
+    # --- Separate Title and Body ---
+    title, body = split_title_body(full_text)
+    job = StoryJob(
+        job_id=job_id,
+        title=title,
+        body=body,
+        output_path=output_path,
+        voice_type=voice_type,
+        background_type=background_type,
+        render_backend=render_backend,
+        caption_mode=caption_mode,
+        normalize_background=normalize_background,
+        render_profile=render_profile
+    )
+    return pipeline.run(job, progress_callback=progress_callback, manifest_path=manifest_path)
+
+def promote_preview(
+    manifest_path,
+    output_path,
+    render_profile: str = DEFAULT_RENDER_PROFILE,
+    render_backend: Optional[str] = None,
+    progress_callback: Optional[Callable[[float], None]] = None,
+    logger: Optional[logging.Logger] = None,
+    video_editor: Optional[VideoEditor] = None
+) -> Path:
+    """
+    Renders an approved preview again at full quality.
+
+    The narration, captions, background and background offset all come from
+    the preview's manifest, so only the render stage runs and the result
+    matches the preview apart from size and encoding.
+
+    Args:
+        manifest_path: Manifest written by generate_from_text for the preview
+        output_path: Path to save the final video
+        render_profile: Output size and encoder settings of the final render
+        render_backend: Render backend, defaults to the preview's
+        progress_callback: Optional callback receiving progress from 0 to 100
+        logger: Optional logger, defaults to a per-job logger
+        video_editor: Optional pre-built VideoEditor
+
+    Returns:
+        Path to the created video file
+    """
+    job = StoryPipeline.load_manifest(manifest_path)
+    if logger is None:
+        logger = setup_logger(f'video_gen_text_{job.job_id}')
+    logger.info(f"Promoting preview {manifest_path} to a '{render_profile}' render")
+
+    job.output_path = Path(output_path)
+    job.render_profile = render_profile
+    if render_backend:
+        job.render_backend = render_backend
+
+    # No cleanup: the manifest's artifacts stay valid for further renders
+    pipeline = StoryPipeline(logger=logger, video_editor=video_editor)
+    pipeline.render(job, progress_callback=progress_callback)
+    if progress_callback:
+        progress_callback(100)
+    return job.output_path
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a video from text.')
     parser.add_argument('--job-id', required=True, help='Job ID for tracking')
-    parser.add_argument('--text-file', required=True, help='Path to text file')
+    parser.add_argument('--text-file', help='Path to text file')
     parser.add_argument('--voice-type', default='female', help='Voice type for TTS')
     parser.add_argument('--background-type', default='minecraft', help='Background video type')
     parser.add_argument('--output-path', required=True, help='Output video path')
-    
+    parser.add_argument('--render-backend', choices=RENDER_BACKENDS, help=f"Video render backend (default: moviepy, or {PREVIEW_RENDER_BACKEND} with --preview)")
+    parser.add_argument('--caption-mode', default='tts', choices=CAPTION_MODES, help='Caption timing source')
+    parser.add_argument('--render-profile', default=DEFAULT_RENDER_PROFILE, choices=RENDER_PROFILES, help='Output size and encoder settings (draft renders a fast half-resolution preview)')
+    parser.add_argument('--no-background-cache', action='store_true', help='Render from the original background instead of the normalized cache')
+    parser.add_argument('--resume', action='store_true', help='Keep stage outputs under the job ID and reuse those of earlier attempts, so a retry skips finished stages')
+    parser.add_argument('--preview', action='store_true', help='Render a fast 360x640 preview and save a manifest for promoting it')
+    parser.add_argument('--promote', metavar='MANIFEST', help="Render a preview's manifest with --render-profile, reusing its narration, captions and background")
     args = parser.parse_args()
-    
+
+    if args.promote and args.preview:
+        parser.error('--preview and --promote cannot be combined')
+    if not args.promote and not args.text_file:
+        parser.error('--text-file is required unless --promote is given')
+
     # Setup logging
-    setup_logger(f'video_gen_text_{args.job_id}')
-    logger = logging.getLogger(f'video_gen_text_{args.job_id}')
+    logger = setup_logger(f'video_gen_text_{args.job_id}')
 
     def update_progress(progress):
         print(f'PROGRESS:{progress}')
         sys.stdout.flush()
 
-    logger.info(f'Starting video generation for job {args.job_id}')
-    update_progress(5)
-
-    audio_file_path = None
-    title_audio_path = None
-    body_audio_path = None
     try:
-        update_progress(10)
-        
-        # --- Step 1: Read and filter text ---
-        logger.info("Reading and filtering text file...")
+        if args.promote:
+            promote_preview(
+                args.promote,
+                args.output_path,
+                render_profile=args.render_profile,
+                render_backend=args.render_backend,
+                progress_callback=update_progress,
+                logger=logger
+            )
+            return
+
+        # --- Step 1: Read text ---
+        logger.info("Reading text file...")
         with open(args.text_file, 'r', encoding='utf-8') as f:
             full_text = f.read()
 
-        # --- Separate and Clean Title and Body ---
-        lines = full_text.split('\\n')
-        
-        original_title = lines[0]
-        original_body = '\\n'.join(lines[1:]).strip()
-        
-        title = clean_text(original_title)
-        body = clean_text(original_body)
-
-        # If cleaning makes the title empty, fall back to the original.
-        if not title:
-            title = original_title
-
-        if not body: # If there's no body after the first line, use the whole text as the body
-            body = title
-            title = "Reddit Story" # Default title
-        # ---
-
-        # Filter profanity from the body (commented out)
-        # body_sentences = body.split('. ')
-        # profanity_results = predict(body_sentences)
-        # clean_sentences = [sentence for sentence, profane in zip(body_sentences, profanity_results) if not profane]
-        # body = '. '.join(clean_sentences)
-
-        # The full, cleaned text for the main audio track.
-        cleaned_full_text = f"{title}. {body}"
-
-        logger.info("Starting video generation process...")
-        update_progress(15)
-
-        # --- Step 2: Generate all audio clips ---
-        logger.info('Generating text-to-speech for full text...')
-        tts_generator = TextToSpeechGenerator(voice_type=args.voice_type)
-        
-        # Create temporary files for all audio clips
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_full_audio, \
-             tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_title_audio, \
-             tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_body_audio:
-            audio_file_path = Path(temp_full_audio.name)
-            title_audio_path = Path(temp_title_audio.name)
-            body_audio_path = Path(temp_body_audio.name)
-
-        # Generate all three audio versions
-        tts_generator.generate_speech(cleaned_full_text, audio_file_path)
-        tts_generator.generate_speech(title, title_audio_path)
-        tts_generator.generate_speech(body, body_audio_path)
-
-        # Get durations
-        title_duration = get_audio_duration(title_audio_path)
-        logger.info(f"Title duration: {title_duration:.2f}s")
-        update_progress(30)
-
-        # --- Step 2.5: Verify intro image exists ---
-        intro_image_path = Path(__file__).parent / 'assets' / 'IntroPicture.png'
-        if not intro_image_path.is_file():
-            logger.error(f"Intro image not found at path: {intro_image_path}")
-            raise FileNotFoundError(f"Intro image not found at path: {intro_image_path}")
-        logger.info("Intro image found successfully.")
-        
-        # --- Step 3: Get background video ---
-        logger.info('Getting background video...')
-        provider = BackgroundProvider()
-        background_video_path = provider.get_background_video(args.background_type)
-        update_progress(50)
-
-        # --- Step 4: Generate captions ---
-        logger.info('Generating synchronized captions with Whisper...')
-        caption_gen = CaptionGenerator()
-        # Generate captions from the body audio and offset them
-        captions = caption_gen.generate_captions(body_audio_path, offset_time=title_duration)
-        update_progress(80)
-        
-        # --- Step 5: Create final video ---
-        logger.info('Creating final video...')
-        video_editor = VideoEditor()
-
-        video_editor.create_story_video(
-            background_video_path=background_video_path,
-            audio_clip_path=audio_file_path,
-            captions=captions,
+        manifest_path = manifest_path_for(args.output_path) if args.preview else None
+        generate_from_text(
+            job_id=args.job_id,
+            full_text=full_text,
             output_path=args.output_path,
-            intro_image_path=intro_image_path,
-            title=title,
-            title_duration=title_duration,
-            progress_callback=lambda p: update_progress(80 + p * 0.2)
+            voice_type=args.voice_type,
+            background_type=args.background_type,
+            progress_callback=update_progress,
+            logger=logger,
+            normalize_background=not args.no_background_cache,
+            caption_mode=args.caption_mode,
+            render_profile=PREVIEW_RENDER_PROFILE if args.preview else args.render_profile,
+            render_backend=args.render_backend or (PREVIEW_RENDER_BACKEND if args.preview else 'moviepy'),
+            manifest_path=manifest_path,
+            resume=args.resume
         )
-
-        update_progress(100)
-        logger.info("Video generation complete.")
+        if manifest_path:
+            print(f'MANIFEST:{manifest_path}')
 
     except Exception as e:
         logger.error(f"Error generating video: {e}", exc_info=True)
         print(f'ERROR:{str(e)}')
         sys.exit(1)
-        
-    finally:
-        # --- Cleanup ---
-        if audio_file_path and os.path.exists(audio_file_path):
-            logger.info(f"Cleaning up temporary audio file: {audio_file_path}")
-            os.remove(audio_file_path)
-        if title_audio_path and os.path.exists(title_audio_path):
-            logger.info(f"Cleaning up temporary title audio file: {title_audio_path}")
-            os.remove(title_audio_path)
-        if body_audio_path and os.path.exists(body_audio_path):
-            logger.info(f"Cleaning up temporary body audio file: {body_audio_path}")
-            os.remove(body_audio_path)
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Generate a video from text.')
-    parser.add_argument('--job-id', required=True, help='Job ID for tracking')
-    parser.add_argument('--text-file', required=True, help='Path to text file')
-    parser.add_argument('--voice-type', default='female', help='Voice type for TTS')
-    parser.add_argument('--background-type', default='minecraft', help='Background video type')
-    parser.add_argument('--output-path', required=True, help='Output video path')
-    args = parser.parse_args()
-    main(args) 
\ No newline at end of file
+    main()
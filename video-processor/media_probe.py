@@ -0,0 +1,75 @@
+"""
+Lightweight media metadata helpers built on ffprobe.
+"""
+
+import json
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Union
+
+
+def _run_ffprobe(args: List[str]) -> Dict:
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', *args],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+    return json.loads(result.stdout or '{}')
+
+
+def _parse_rate(rate: str) -> float:
+    """Parses an ffprobe frame rate such as '30000/1001'."""
+    try:
+        num, _, den = rate.partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def probe_media(path: Union[str, Path]) -> Dict:
+    """
+    Reads duration and video stream properties of a media file.
+
+    Args:
+        path: Path to the media file
+
+    Returns:
+        Dictionary with duration, width, height, codec and fps
+        (video fields are None for audio-only files)
+    """
+    info = _run_ffprobe(['-show_format', '-show_streams', str(path)])
+    video = next((s for s in info.get('streams', []) if s.get('codec_type') == 'video'), None)
+
+    return {
+        'duration': float(info.get('format', {}).get('duration', 0.0)),
+        'width': int(video['width']) if video else None,
+        'height': int(video['height']) if video else None,
+        'codec': video.get('codec_name') if video else None,
+        'fps': _parse_rate(video.get('avg_frame_rate', '0/1')) if video else None,
+    }
+
+
+def probe_duration(path: Union[str, Path]) -> float:
+    """Returns the duration of a media file in seconds."""
+    info = _run_ffprobe(['-show_entries', 'format=duration', str(path)])
+    return float(info.get('format', {}).get('duration', 0.0))
+
+
+def probe_keyframes(path: Union[str, Path]) -> List[float]:
+    """
+    Returns the timestamps (seconds) of the video keyframes in a file.
+
+    Reads packet flags only, so nothing is decoded.
+    """
+    info = _run_ffprobe([
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        str(path)
+    ])
+    keyframes = []
+    for packet in info.get('packets', []):
+        if 'K' in packet.get('flags', '') and packet.get('pts_time') not in (None, 'N/A'):
+            keyframes.append(round(float(packet['pts_time']), 3))
+    return sorted(keyframes)
@@ -0,0 +1,232 @@
+"""
+Stage-pool scheduler for running many jobs through a multi-stage pipeline.
+
+Every stage has its own worker pool and a bounded input queue. A stage blocks
+while the next stage's queue is full, so fast stages (network-bound TTS) run
+ahead of slow ones (CPU-bound rendering) by at most a queue's worth of jobs
+instead of piling up finished work, and the slow stage never waits idle.
+
+Stage kinds:
+    'async'   - coroutine functions on one event loop, up to `workers` at once
+    'thread'  - plain functions in `workers` threads
+    'process' - picklable functions in a pool of `workers` processes
+
+Process pools use the 'spawn' start method: the scheduler's threads and event
+loop are already running when a pool starts its workers, and forking then
+could copy locks (logging handlers, sqlite) held by another thread.
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+import logging
+
+from utils.logger import setup_logger
+
+STAGE_KINDS = ('async', 'thread', 'process')
+
+# Marks the end of the input on a stage queue
+_STOP = object()
+
+
+class Stage:
+    """
+    One pipeline stage.
+
+    Args:
+        name: Stage name used in logs and error callbacks
+        func: Callable taking the previous stage's output; a coroutine
+            function for 'async' stages, picklable for 'process' stages
+        kind: One of STAGE_KINDS
+        workers: Number of items the stage works on at once
+        queue_size: Items allowed to wait for this stage (defaults to workers)
+        initializer: Per-process initializer for 'process' stages
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        kind: str = 'thread',
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+        initializer: Optional[Callable] = None
+    ):
+        if kind not in STAGE_KINDS:
+            raise ValueError(f"Unknown stage kind '{kind}'. Available: {', '.join(STAGE_KINDS)}")
+        self.name = name
+        self.func = func
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size if queue_size is not None else self.workers)
+        self.initializer = initializer
+
+
+class PipelineScheduler:
+    """
+    Runs items through a list of stages, each stage's output feeding the next.
+
+    Results and failures are reported through callbacks as they happen:
+    on_result(item, result) receives the last stage's input and output, and
+    on_error(item, stage_name, exception) receives the input of the stage that
+    failed. A failed item is dropped from the rest of the pipeline.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        on_result: Optional[Callable[[Any, Any], None]] = None,
+        on_error: Optional[Callable[[Any, str, Exception], None]] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.on_result = on_result
+        self.on_error = on_error
+        self.logger = logger or setup_logger('pipeline_scheduler')
+
+    def run(self, items: Iterable):
+        """
+        Feeds items into the pipeline and blocks until every item has left it.
+
+        items may be a lazy iterable (e.g. lines read from stdin); it is only
+        advanced when the first stage has room, so a slow pipeline also slows
+        down whatever produces the items.
+        """
+        inputs = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        outputs = inputs[1:] + [None]
+        threads: List[threading.Thread] = []
+        # Create every pool before the first stage thread starts
+        executors = {
+            stage.name: ProcessPoolExecutor(
+                max_workers=stage.workers,
+                initializer=stage.initializer,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            for stage in self.stages if stage.kind == 'process'
+        }
+
+        for stage, in_queue, out_queue in zip(self.stages, inputs, outputs):
+            threads.extend(self._start_stage(stage, in_queue, out_queue, executors.get(stage.name)))
+
+        try:
+            for item in items:
+                inputs[0].put(item)
+        finally:
+            inputs[0].put(_STOP)
+            for thread in threads:
+                thread.join()
+            for executor in executors.values():
+                executor.shutdown()
+
+    def _start_stage(
+        self,
+        stage: Stage,
+        in_queue: queue.Queue,
+        out_queue: Optional[queue.Queue],
+        executor: Optional[ProcessPoolExecutor] = None
+    ) -> List[threading.Thread]:
+        """Starts the threads that drive one stage."""
+        def emit(item, result):
+            if out_queue is not None:
+                out_queue.put(result)
+            elif self.on_result:
+                self._callback(self.on_result, item, result)
+
+        # An async stage is driven by one thread; the others by one per worker
+        count = 1 if stage.kind == 'async' else stage.workers
+
+        # The last worker to see _STOP passes it on to the next stage
+        remaining = [count]
+        remaining_lock = threading.Lock()
+
+        def finished():
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0] == 0 and out_queue is not None:
+                    out_queue.put(_STOP)
+
+        if stage.kind == 'async':
+            target = lambda: self._run_async_stage(stage, in_queue, emit, finished)
+        else:
+            call = stage.func
+            if stage.kind == 'process':
+                call = lambda item: executor.submit(stage.func, item).result()
+            target = lambda: self._run_worker(stage, call, in_queue, emit, finished)
+
+        threads = []
+        for index in range(count):
+            thread = threading.Thread(target=target, name=f'{stage.name}-{index}', daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _run_worker(self, stage: Stage, call: Callable, in_queue: queue.Queue, emit: Callable, finished: Callable):
+        """Worker loop for 'thread' and 'process' stages."""
+        try:
+            while True:
+                item = in_queue.get()
+                if item is _STOP:
+                    # Put it back for the other workers of this stage
+                    in_queue.put(_STOP)
+                    break
+                try:
+                    result = call(item)
+                except Exception as e:
+                    self._fail(stage, item, e)
+                    continue
+                emit(item, result)
+        finally:
+            finished()
+
+    def _run_async_stage(self, stage: Stage, in_queue: queue.Queue, emit: Callable, finished: Callable):
+        """Runs an 'async' stage's event loop until its input ends."""
+        try:
+            asyncio.run(self._async_stage_loop(stage, in_queue, emit))
+        finally:
+            finished()
+
+    async def _async_stage_loop(self, stage: Stage, in_queue: queue.Queue, emit: Callable):
+        semaphore = asyncio.Semaphore(stage.workers)
+        tasks = set()
+
+        async def handle(item):
+            try:
+                try:
+                    result = await stage.func(item)
+                except Exception as e:
+                    self._fail(stage, item, e)
+                    return
+                # Blocks (off the loop) while the next stage's queue is full
+                await asyncio.to_thread(emit, item, result)
+            finally:
+                semaphore.release()
+
+        while True:
+            # Only take an item once there is a free slot to work on it
+            await semaphore.acquire()
+            item = await asyncio.to_thread(in_queue.get)
+            if item is _STOP:
+                semaphore.release()
+                break
+            task = asyncio.create_task(handle(item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def _fail(self, stage: Stage, item, error: Exception):
+        self.logger.error(f"Stage '{stage.name}' failed: {error}", exc_info=error)
+        if self.on_error:
+            self._callback(self.on_error, item, stage.name, error)
+
+    def _callback(self, callback: Callable, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            self.logger.error(f"Pipeline callback failed: {e}", exc_info=True)
@@ -0,0 +1,126 @@
+"""
+Local cache of scraped Reddit posts.
+
+Scrape results are stored per (subreddit or post id, sort, limit) as
+compressed JSON rows in SQLite: zstd when the zstandard package is installed,
+zlib otherwise. Entries younger than the TTL are fresh; older ones can still
+be served while a background refresh replaces them.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+from utils.logger import setup_logger
+
+# Seconds an entry is fresh, and how long past that it may be served stale
+REDDIT_CACHE_TTL = int(os.getenv('REDDIT_CACHE_TTL', '600'))
+REDDIT_CACHE_MAX_STALE = int(os.getenv('REDDIT_CACHE_MAX_STALE', '86400'))
+
+# A refresh that hasn't finished after this long is assumed to have died
+REFRESH_TIMEOUT = 120
+
+
+def _compress(data: bytes):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+
+def _decompress(codec: str, payload: bytes) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("Cache entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+class PostCache:
+    def __init__(self, db_path: Optional[Path] = None, ttl: int = REDDIT_CACHE_TTL, max_stale: int = REDDIT_CACHE_MAX_STALE):
+        self.logger = setup_logger('post_cache')
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / 'temp' / 'post_cache.sqlite'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scraped_posts (
+                    cache_key TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    refreshing_at REAL,
+                    codec TEXT NOT NULL,
+                    payload BLOB NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def make_key(target: str, sort_method: str, num_posts: int) -> str:
+        """Builds the key for a subreddit name or post id, sort and limit."""
+        return f"{target.lower()}|{sort_method}|{num_posts}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Looks up a cached scrape.
+
+        Returns:
+            None on a miss (or when the entry is too stale to serve), else
+            {'posts': [...], 'fresh': bool, 'refreshing': bool}
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fetched_at, refreshing_at, codec, payload FROM scraped_posts WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        age = time.time() - row['fetched_at']
+        if age > self.ttl + self.max_stale:
+            return None
+        try:
+            posts = json.loads(_decompress(row['codec'], row['payload']))
+        except Exception as e:
+            self.logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+            return None
+
+        refreshing = row['refreshing_at'] is not None and time.time() - row['refreshing_at'] < REFRESH_TIMEOUT
+        return {'posts': posts, 'fresh': age <= self.ttl, 'refreshing': refreshing}
+
+    def put(self, key: str, posts: List[Dict]):
+        codec, payload = _compress(json.dumps(posts, separators=(',', ':')).encode('utf-8'))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scraped_posts (cache_key, fetched_at, refreshing_at, codec, payload) VALUES (?, ?, NULL, ?, ?)",
+                (key, time.time(), codec, sqlite3.Binary(payload))
+            )
+
+    def claim_refresh(self, key: str) -> bool:
+        """
+        Marks an entry as being refreshed.
+
+        Returns:
+            False if another refresh of the entry is already running
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE scraped_posts SET refreshing_at = ? WHERE cache_key = ? AND (refreshing_at IS NULL OR refreshing_at < ?)",
+                (now, key, now - REFRESH_TIMEOUT)
+            )
+        return cursor.rowcount > 0
@@ -7,29 +7,43 @@ import re
 import os
 import json
 import argparse
+import subprocess
 import sys
-from typing import List, Dict
+import time
+import itertools
+from typing import Dict, Iterator, List
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from pathlib import Path
+from crawl_state import CrawlState, reached_mark
+from post_cache import PostCache
 from utils.logger import setup_logger
 
 # Load environment variables from a .env file at the project root
 dotenv_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=dotenv_path)
 
+# Submissions looked up in the crawl state per query (PRAW's listing page size)
+SEEN_BATCH_SIZE = 100
+
 class RedditScraper:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         self.logger = setup_logger('reddit_scraper')
-        
-        # Initialize Reddit API client
-        self.reddit = praw.Reddit(
-            client_id=os.getenv('REDDIT_CLIENT_ID'),
-            client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-            user_agent=os.getenv('REDDIT_USER_AGENT', 'RedditStoryGenerator/1.0')
-        )
+        self.cache = PostCache() if use_cache else None
+        self._reddit = None
+
+    @property
+    def reddit(self) -> praw.Reddit:
+        """Reddit API client, only created once a scrape misses the cache."""
+        if self._reddit is None:
+            self._reddit = praw.Reddit(
+                client_id=os.getenv('REDDIT_CLIENT_ID'),
+                client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
+                user_agent=os.getenv('REDDIT_USER_AGENT', 'RedditStoryGenerator/1.0')
+            )
+        return self._reddit
     
-    def scrape_posts(self, reddit_url: str, num_posts: int = 5, sort_method: str = 'hot') -> List[Dict]:
+    def scrape_posts(self, reddit_url: str, num_posts: int = 5, sort_method: str = 'hot', since_last_run: bool = False) -> List[Dict]:
         """
         Scrape Reddit posts from a given URL
         
@@ -37,28 +51,97 @@ class RedditScraper:
             reddit_url: Reddit URL (post or subreddit)
             num_posts: Number of posts to scrape
             sort_method: Sort method for subreddit posts ('hot', 'new', 'top')
+            since_last_run: Only return subreddit posts that earlier
+                since_last_run scrapes haven't returned (see CrawlState)
             
         Returns:
             List of post dictionaries with text content
         """
         try:
-            posts = []
-            
-            if '/comments/' in reddit_url:
-                # Single post URL
-                submission = self.reddit.submission(url=reddit_url)
-                post = self._scrape_single_post(submission)
-                if post:
-                    posts.append(post)
-            else:
-                # Subreddit URL
-                posts = self._scrape_subreddit_posts(reddit_url, num_posts, sort_method)
-            
-            return posts[:num_posts]
-            
+            return list(self.iter_posts(reddit_url, num_posts, sort_method, since_last_run))
         except Exception as e:
             self.logger.error(f'Error scraping Reddit: {str(e)}')
             raise
+
+    def iter_posts(self, reddit_url: str, num_posts: int = 5, sort_method: str = 'hot', since_last_run: bool = False) -> Iterator[Dict]:
+        """
+        Yields posts one at a time as they are scraped (or read from the cache).
+
+        Takes the same arguments as scrape_posts.
+        """
+        if since_last_run or not self.cache:
+            yield from self._iter_scrape(reddit_url, num_posts, sort_method, since_last_run)
+            return
+
+        key = self._cache_key(reddit_url, num_posts, sort_method)
+        cached = self.cache.get(key)
+        if cached and cached['fresh']:
+            self.logger.info(f'Using cached posts for {reddit_url}')
+            yield from cached['posts']
+            return
+        if cached:
+            # Serve the stale posts now and let a detached process refresh them
+            self.logger.info(f'Using stale cached posts for {reddit_url}')
+            if self.cache.claim_refresh(key):
+                self._spawn_refresh(reddit_url, num_posts, sort_method)
+            yield from cached['posts']
+            return
+
+        posts = []
+        for post in self._iter_scrape(reddit_url, num_posts, sort_method):
+            posts.append(post)
+            yield post
+        if posts:
+            self.cache.put(key, posts)
+
+    def refresh_cache(self, reddit_url: str, num_posts: int = 5, sort_method: str = 'hot') -> List[Dict]:
+        """Scrapes a URL and replaces its cache entry, regardless of the entry's age."""
+        posts = list(self._iter_scrape(reddit_url, num_posts, sort_method))
+        if posts and self.cache:
+            self.cache.put(self._cache_key(reddit_url, num_posts, sort_method), posts)
+        return posts
+
+    @staticmethod
+    def _cache_key(reddit_url: str, num_posts: int, sort_method: str) -> str:
+        post_match = re.search(r'/comments/([^/?#]+)', reddit_url)
+        if post_match:
+            return PostCache.make_key(post_match.group(1), 'post', 1)
+        subreddit_match = re.search(r'/r/([^/?#]+)', reddit_url)
+        return PostCache.make_key(subreddit_match.group(1) if subreddit_match else reddit_url, sort_method, num_posts)
+
+    def _spawn_refresh(self, reddit_url: str, num_posts: int, sort_method: str):
+        """Starts a detached scraper process that refreshes a stale cache entry."""
+        command = [
+            sys.executable, str(Path(__file__).resolve()),
+            '--url', reddit_url,
+            '--num-posts', str(num_posts),
+            '--sort-by', sort_method,
+            '--refresh-cache'
+        ]
+        if os.name == 'nt':
+            detach = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            detach = {'start_new_session': True}
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=str(Path(__file__).parent),
+            **detach
+        )
+
+    def _iter_scrape(self, reddit_url: str, num_posts: int, sort_method: str, since_last_run: bool = False) -> Iterator[Dict]:
+        """Scrapes a URL from Reddit, bypassing the cache."""
+        if '/comments/' in reddit_url:
+            # Single post URL
+            submission = self.reddit.submission(url=reddit_url)
+            post = self._scrape_single_post(submission)
+            if post:
+                yield post
+        else:
+            # Subreddit URL
+            yield from self._iter_subreddit_posts(reddit_url, num_posts, sort_method, since_last_run)
     
     def _scrape_single_post(self, submission) -> Dict:
         """Scrape a single Reddit post"""
@@ -88,8 +171,8 @@ class RedditScraper:
             self.logger.error(f'Error scraping single post: {str(e)}')
             return None
     
-    def _scrape_subreddit_posts(self, subreddit_url: str, num_posts: int, sort_method: str) -> List[Dict]:
-        """Scrape posts from a subreddit"""
+    def _iter_subreddit_posts(self, subreddit_url: str, num_posts: int, sort_method: str, since_last_run: bool = False) -> Iterator[Dict]:
+        """Scrape posts from a subreddit, yielding each one as soon as it is read"""
         try:
             # --- Robust subreddit name extraction ---
             match = re.search(r'/r/([^/]+)', subreddit_url)
@@ -100,7 +183,8 @@ class RedditScraper:
             
             self.logger.info(f"Scraping subreddit: {subreddit_name} (sorting by {sort_method})")
             subreddit = self.reddit.subreddit(subreddit_name)
-            posts = []
+            count = 0
+            seen_ids = []
             
             # Get posts by specified sort method
             if sort_method == 'hot':
@@ -116,27 +200,84 @@ class RedditScraper:
             else:
                 submissions_generator = subreddit.hot()
             
-            for submission in submissions_generator:
-                if len(posts) >= num_posts:
-                    break
-
-                # Take any post that has text content, ignoring images/links
-                if submission.selftext:
-                    posts.append({
-                        'id': submission.id,
-                        'title': submission.title,
-                        'text': submission.selftext,
-                        'score': submission.score,
-                        'created_utc': submission.created_utc,
-                        'url': submission.permalink,
-                        'subreddit': str(submission.subreddit)
-                    })
-            
-            return posts
+            state = CrawlState() if since_last_run else None
+            mark = state.get_mark(subreddit_name, sort_method) if state else None
+            top_id = None
+            # Set when the scan covered everything from the top of the listing down to the mark
+            complete = False
+            try:
+                # Look submissions up in the crawl state a listing page at a time
+                for batch in iter(lambda: list(itertools.islice(submissions_generator, SEEN_BATCH_SIZE)), []):
+                    seen = state.seen_ids(submission.id for submission in batch) if state else set()
+                    for submission in batch:
+                        if count >= num_posts:
+                            break
+                        if state:
+                            top_id = top_id or submission.id
+                            if reached_mark(submission.id, mark, sort_method):
+                                complete = True
+                                break
+                        # Above the mark, seen posts are skipped rather than ending the scan:
+                        # posts that an earlier run scanned but didn't return can sit below them
+                        if submission.id in seen:
+                            continue
+
+                        # Take any post that has text content, ignoring images/links
+                        if submission.selftext:
+                            count += 1
+                            if state:
+                                seen_ids.append(submission.id)
+                            yield {
+                                'id': submission.id,
+                                'title': submission.title,
+                                'text': submission.selftext,
+                                'score': submission.score,
+                                'created_utc': submission.created_utc,
+                                'url': submission.permalink,
+                                'subreddit': str(submission.subreddit)
+                            }
+                    if complete or count >= num_posts:
+                        break
+                else:
+                    # The listing ran out before num_posts
+                    complete = True
+            finally:
+                # Also runs when the caller stops consuming early, so returned posts stay seen
+                if state:
+                    state.mark_seen(seen_ids, subreddit_name)
+                    if complete and top_id:
+                        state.set_mark(subreddit_name, sort_method, top_id)
+                    self.logger.info(f"Found {count} posts not seen in earlier runs")
             
         except Exception as e:
             self.logger.error(f'Error scraping subreddit: {str(e)}')
-            return []
+            raise
+
+def _emit(record: Dict):
+    """Writes one compact JSON-lines record to stdout."""
+    print(json.dumps(record, separators=(',', ':')))
+    sys.stdout.flush()
+
+def stream_posts(scraper: RedditScraper, args) -> int:
+    """
+    Prints one {"type": "post"} record per post as soon as it is scraped, then
+    a {"type": "summary"} record, or a {"type": "error"} record on failure.
+
+    Returns:
+        The process exit code.
+    """
+    started = time.time()
+    count = 0
+    try:
+        for post in scraper.iter_posts(args.url, args.num_posts, args.sort_by, since_last_run=args.since_last_run):
+            _emit({'type': 'post', 'post': post})
+            count += 1
+    except Exception as e:
+        scraper.logger.error(f"A critical error occurred: {e}", exc_info=True)
+        _emit({'type': 'error', 'message': str(e), 'count': count})
+        return 1
+    _emit({'type': 'summary', 'count': count, 'elapsed': round(time.time() - started, 3)})
+    return 0
 
 def main():
     """Main function to run the scraper from the command line."""
@@ -144,11 +285,21 @@ def main():
     parser.add_argument("--url", required=True, help="The Reddit URL to scrape (subreddit or post).")
     parser.add_argument("--num-posts", type=int, default=10, help="Number of posts to scrape.")
     parser.add_argument("--sort-by", type=str, default='hot', choices=['hot', 'new', 'top', 'rising', 'controversial'], help="The sort method for subreddit posts.")
+    parser.add_argument("--since-last-run", action='store_true', help="Only return posts that earlier --since-last-run scrapes haven't returned.")
+    parser.add_argument("--no-cache", action='store_true', help="Always scrape Reddit instead of using the post cache.")
+    parser.add_argument("--refresh-cache", action='store_true', help="Scrape Reddit and replace the cached posts for this URL.")
+    parser.add_argument("--stream", action='store_true', help="Print one JSON object per line as posts are scraped, then a summary record. Bypasses the post cache, which stores whole post lists, so memory stays constant.")
     args = parser.parse_args()
 
-    scraper = RedditScraper()
+    scraper = RedditScraper(use_cache=not (args.no_cache or (args.stream and not args.refresh_cache)))
+    if args.stream and not args.refresh_cache:
+        sys.exit(stream_posts(scraper, args))
+
     try:
-        posts = scraper.scrape_posts(args.url, args.num_posts, args.sort_by)
+        if args.refresh_cache:
+            posts = scraper.refresh_cache(args.url, args.num_posts, args.sort_by)
+        else:
+            posts = scraper.scrape_posts(args.url, args.num_posts, args.sort_by, since_last_run=args.since_last_run)
         # Print the result to stdout as a JSON string
         print(json.dumps(posts, indent=2))
     except Exception as e:
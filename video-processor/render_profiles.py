@@ -0,0 +1,86 @@
+"""
+Named render profiles: output size, frame rate and x264 encoder settings.
+
+- preview: 360x640 at 15 fps, for iterating on title, voice and background in seconds
+- draft: half resolution, ultrafast preset, for reviewing a story before the final encode
+- standard: full 1080x1920 with x264's default preset and quality
+- archive: full resolution, slower preset and lower CRF for masters worth keeping
+
+Profiles only use libx264 options, so they behave the same on any machine.
+"""
+
+from typing import Dict, List, Optional
+
+RENDER_PROFILES: Dict[str, Dict] = {
+    'preview': {
+        'width': 360,
+        'height': 640,
+        'fps': 15,
+        'preset': 'ultrafast',
+        'crf': 32,
+        'tune': 'fastdecode',
+        'threads': 0,
+        'gop': 15
+    },
+    'draft': {
+        'width': 540,
+        'height': 960,
+        'fps': 30,
+        'preset': 'ultrafast',
+        'crf': 30,
+        'tune': 'fastdecode',  # Cheap to scrub through while reviewing
+        'threads': 0,  # 0 lets x264 pick
+        'gop': 30  # A keyframe every second for seeking
+    },
+    'standard': {
+        'width': 1080,
+        'height': 1920,
+        'fps': 30,
+        'preset': 'medium',
+        'crf': 23,
+        'tune': None,
+        'threads': 0,
+        'gop': 60
+    },
+    'archive': {
+        'width': 1080,
+        'height': 1920,
+        'fps': 30,
+        'preset': 'slow',
+        'crf': 18,
+        'tune': 'film',
+        'threads': 0,
+        'gop': 120
+    },
+}
+
+DEFAULT_RENDER_PROFILE = 'standard'
+
+
+def get_render_profile(name: str) -> Dict:
+    """Returns a copy of a named profile."""
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}', expected one of {tuple(RENDER_PROFILES)}")
+    return dict(RENDER_PROFILES[name])
+
+
+def x264_params(video_config: Dict) -> List[str]:
+    """
+    Rate control, tune and GOP options of a video config as ffmpeg arguments
+    (the preset and thread count have their own arguments in MoviePy).
+    """
+    params = ['-crf', str(video_config['crf']), '-g', str(video_config['gop'])]
+    if video_config.get('tune'):
+        params += ['-tune', video_config['tune']]
+    return params
+
+
+def encoder_args(video_config: Dict, threads: Optional[int] = None) -> List[str]:
+    """Complete ffmpeg video encoder arguments for a video config."""
+    threads = video_config['threads'] if threads is None else threads
+    return [
+        '-c:v', video_config['codec'],
+        '-preset', video_config['preset'],
+        *x264_params(video_config),
+        '-threads', str(threads)
+    ]
@@ -0,0 +1,441 @@
+"""
+Stage-by-stage story video pipeline.
+
+A StoryJob carries one story through the stages (text cleanup, TTS,
+background selection, captions, render). StoryPipeline owns the components,
+so the stages can run back to back for a single job or be spread over
+executors when rendering many stories.
+
+With an ArtifactStore, each stage's output is kept under a hash of its
+inputs and a rerun of the same job skips the stages that already finished.
+"""
+
+import io
+import os
+import re
+import json
+import random
+import shutil
+import asyncio
+import tempfile
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from artifact_store import ArtifactStore
+from background_provider import BackgroundProvider
+from background_cache import BackgroundCache
+from text_to_speech import TextToSpeechGenerator
+from caption_generator import CaptionGenerator
+from word_timeline import WordTimeline
+from video_editor import VideoEditor
+from render_profiles import DEFAULT_RENDER_PROFILE
+from utils.logger import setup_logger
+
+INTRO_IMAGE_PATH = Path(__file__).parent / 'assets' / 'IntroPicture.png'
+
+MANIFEST_VERSION = 1
+
+# --- Text Cleaning Function ---
+def clean_text(text: str) -> str:
+    """Removes markdown, URLs, and extra whitespace from text."""
+    # Remove Reddit markdown
+    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)  # Links
+    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)      # Bold
+    text = re.sub(r'\*([^*]+)\*', r'\1', text)          # Italics
+    text = re.sub(r'~~([^~]+)~~', r'\1', text)          # Strikethrough
+    text = re.sub(r'^&gt;\s*', '', text, flags=re.MULTILINE)  # Quotes
+    text = re.sub(r'&lt;', '<', text)                   # HTML entities
+    text = re.sub(r'&gt;', '>', text)
+    text = re.sub(r'&amp;', '&', text)
+
+    # Remove URLs
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+
+    # Clean up whitespace
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+# ---
+
+def find_title_duration(words: List[Dict], title: str, audio_duration: float) -> float:
+    """
+    Finds where the spoken title ends in the narration's word timings.
+
+    Word boundaries are matched against the title by their letters and digits,
+    so punctuation and tokenization differences don't shift the split.
+
+    Returns:
+        Start time of the first body word, or the audio duration if the
+        narration is only the title.
+    """
+    remaining = len(re.sub(r'[\W_]+', '', title))
+    for word in words:
+        if remaining <= 0:
+            return word['start']
+        remaining -= len(re.sub(r'[\W_]+', '', word['word']))
+    return audio_duration
+
+
+class StoryJob:
+    """One story to render, plus the intermediate results of each stage."""
+
+    def __init__(
+        self,
+        job_id: str,
+        title: str,
+        body: str,
+        output_path,
+        voice_type: str = 'female',
+        background_type: str = 'minecraft',
+        render_backend: str = 'moviepy',
+        caption_mode: str = 'tts',
+        normalize_background: bool = True,
+        render_profile: str = DEFAULT_RENDER_PROFILE,
+        background_seed: Optional[int] = None
+    ):
+        self.job_id = job_id
+        self.title = title
+        self.body = body
+        self.output_path = Path(output_path)
+        self.voice_type = voice_type
+        self.background_type = background_type
+        self.render_backend = render_backend
+        self.caption_mode = caption_mode
+        self.normalize_background = normalize_background
+        self.render_profile = render_profile
+        # Fixes the background offset, so a preview and its full render show the same footage
+        self.background_seed = background_seed if background_seed is not None else random.randrange(2 ** 31)
+
+        # Filled in by the pipeline stages
+        self.text: Optional[str] = None
+        self.audio_path: Optional[Path] = None
+        self.speech_timing: Optional[Dict] = None
+        self.title_duration: Optional[float] = None
+        self.background_video_path: Optional[Path] = None
+        self.captions: Optional[WordTimeline] = None
+        # Artifact keys of the finished stages, which downstream keys build on
+        self.artifact_keys: Dict[str, str] = {}
+
+
+class StoryPipeline:
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        caption_gen: Optional[CaptionGenerator] = None,
+        video_editor: Optional[VideoEditor] = None,
+        provider: Optional[BackgroundProvider] = None,
+        artifact_store: Optional[ArtifactStore] = None
+    ):
+        self.logger = logger or setup_logger('story_pipeline')
+        self.caption_gen = caption_gen
+        self.video_editor = video_editor
+        self.provider = provider
+        self.artifact_store = artifact_store
+        self.tts_generators: Dict[str, TextToSpeechGenerator] = {}
+
+    def tts(self, voice_type: str) -> TextToSpeechGenerator:
+        """Returns a cached TTS generator for the given voice type."""
+        if voice_type not in self.tts_generators:
+            self.tts_generators[voice_type] = TextToSpeechGenerator(voice_type=voice_type)
+        return self.tts_generators[voice_type]
+
+    def prepare_text(self, job: StoryJob):
+        """Cleans the title and body and builds the narration text."""
+        if self.artifact_store:
+            key = self.artifact_store.make_key('text', job.title, job.body)
+            job.artifact_keys['text'] = key
+            cached = self.artifact_store.get_json(job.job_id, key)
+            if cached:
+                self.logger.info(f'[{job.job_id}] Reusing cleaned text')
+                job.title, job.body, job.text = cached['title'], cached['body'], cached['text']
+                return
+
+        original_title = job.title
+        title = clean_text(job.title)
+        body = clean_text(job.body)
+
+        # If cleaning makes the title empty, fall back to the original.
+        if not title:
+            title = original_title
+
+        if not body: # If there's no body, use the title as the body
+            body = title
+            title = "Reddit Story" # Default title
+
+        # Filter profanity from the body (commented out)
+        # body_sentences = body.split('. ')
+        # profanity_results = predict(body_sentences)
+        # clean_sentences = [sentence for sentence, profane in zip(body_sentences, profanity_results) if not profane]
+        # body = '. '.join(clean_sentences)
+
+        job.title = title
+        job.body = body
+        # The full, cleaned text for the main audio track.
+        job.text = f"{title}. {body}"
+        if self.artifact_store:
+            self.artifact_store.put_json(job.job_id, key, {'title': job.title, 'body': job.body, 'text': job.text})
+
+    def synthesize(self, job: StoryJob):
+        """
+        Synthesizes the narration once and finds the title/body split from
+        the word boundaries reported by edge-tts.
+        """
+        asyncio.run(self.synthesize_async(job))
+
+    async def synthesize_async(self, job: StoryJob):
+        """Coroutine version of synthesize, so many jobs can share one event loop."""
+        reused = False
+        if self.artifact_store:
+            key = self.artifact_store.make_key('audio', job.artifact_keys.get('text'), job.text, job.voice_type)
+            job.artifact_keys['audio'] = key
+            artifacts = self.artifact_store.job(job.job_id)
+            cached_audio = artifacts.get(key, '.mp3')
+            cached_timing = self.artifact_store.get_json(job.job_id, key)
+            if cached_audio and cached_timing:
+                self.logger.info(f'[{job.job_id}] Reusing synthesized narration')
+                job.audio_path = cached_audio
+                job.speech_timing = cached_timing
+                reused = True
+
+        if not reused:
+            self.logger.info(f'[{job.job_id}] Generating text-to-speech for full text...')
+            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_full_audio:
+                job.audio_path = Path(temp_full_audio.name)
+            job.speech_timing = await self.tts(job.voice_type).generate_speech_with_timing_async(job.text, job.audio_path)
+            if self.artifact_store:
+                # Keep the narration in the store instead of a temporary file
+                temp_audio, job.audio_path = job.audio_path, artifacts.put_file(key, '.mp3', job.audio_path)
+                os.remove(temp_audio)
+                self.artifact_store.put_json(job.job_id, key, job.speech_timing)
+
+        job.title_duration = find_title_duration(
+            job.speech_timing['words'], job.title, job.speech_timing['duration']
+        )
+        self.logger.info(f"[{job.job_id}] Title duration: {job.title_duration:.2f}s")
+
+    def select_background(self, job: StoryJob):
+        """Picks a background at least as long as the narration, normalized if requested."""
+        if self.artifact_store:
+            key = self.artifact_store.make_key(
+                'background', job.artifact_keys.get('audio'), job.background_type, job.normalize_background
+            )
+            job.artifact_keys['background'] = key
+            cached = self.artifact_store.get_json(job.job_id, key)
+            if cached and os.path.isfile(cached['path']):
+                self.logger.info(f"[{job.job_id}] Reusing background {cached['path']}")
+                job.background_video_path = Path(cached['path'])
+                # Same offset as the first attempt, so its rendered segments stay valid
+                job.background_seed = cached['seed']
+                return
+
+        self.logger.info(f'[{job.job_id}] Getting background video...')
+        if self.provider is None:
+            self.provider = BackgroundProvider()
+        # Prefer a clip at least as long as the narration so it can be trimmed instead of looped
+        job.background_video_path = self.provider.get_background_video(
+            job.background_type, min_duration=job.speech_timing['duration']
+        )
+        if job.normalize_background:
+            job.background_video_path = BackgroundCache().get_normalized(job.background_video_path)
+        if self.artifact_store:
+            artifact_path = self.artifact_store.put_json(
+                job.job_id, key, {'path': str(job.background_video_path), 'seed': job.background_seed}
+            )
+            # The mezzanine can't be evicted while the artifact refers to it
+            BackgroundCache().pin(job.background_video_path, artifact_path)
+
+    def generate_captions(self, job: StoryJob):
+        """Builds captions for the body, skipping the spoken title."""
+        if self.caption_gen is None:
+            self.caption_gen = CaptionGenerator()
+        if self.artifact_store:
+            options = sorted(self.caption_gen.backend.options().items()) if job.caption_mode == 'whisper' else []
+            key = self.artifact_store.make_key(
+                'captions', job.artifact_keys.get('audio'), job.caption_mode, job.title_duration,
+                *(f"{k}={v}" for k, v in options)
+            )
+            job.artifact_keys['captions'] = key
+            cached = self.artifact_store.job(job.job_id).get(key, '.npz')
+            if cached:
+                try:
+                    job.captions = WordTimeline.load(cached)
+                    self.logger.info(f'[{job.job_id}] Reusing captions')
+                    return
+                except Exception as e:
+                    self.logger.warning(f'[{job.job_id}] Ignoring unreadable captions artifact {cached}: {e}')
+
+        if job.caption_mode == 'whisper':
+            self.logger.info(f'[{job.job_id}] Generating synchronized captions with Whisper...')
+            job.captions = self.caption_gen.generate_captions(job.audio_path, skip_before=job.title_duration)
+        else:
+            self.logger.info(f'[{job.job_id}] Generating synchronized captions from TTS word boundaries...')
+            job.captions = self.caption_gen.generate_captions_from_timing(
+                job.speech_timing['words'],
+                script=job.text,
+                skip_before=job.title_duration
+            )
+        if self.artifact_store:
+            buffer = io.BytesIO()
+            job.captions.save(buffer)
+            self.artifact_store.job(job.job_id).put_bytes(key, '.npz', buffer.getvalue())
+
+    def render(self, job: StoryJob, progress_callback: Optional[Callable[[float], None]] = None) -> Path:
+        """Renders the final video."""
+        if not INTRO_IMAGE_PATH.is_file():
+            self.logger.error(f"Intro image not found at path: {INTRO_IMAGE_PATH}")
+            raise FileNotFoundError(f"Intro image not found at path: {INTRO_IMAGE_PATH}")
+
+        self.logger.info(f'[{job.job_id}] Creating final video...')
+        if self.video_editor is None:
+            self.video_editor = VideoEditor()
+
+        segment_dir = None
+        if self.artifact_store and job.render_backend == 'parallel':
+            # Segments are named by their own input hash inside the folder (see VideoEditor)
+            segment_dir = self.artifact_store.job(job.job_id).cache_dir / 'segments'
+
+        output_path = self.video_editor.create_story_video(
+            background_video_path=job.background_video_path,
+            audio_clip_path=job.audio_path,
+            captions=job.captions,
+            output_path=job.output_path,
+            intro_image_path=INTRO_IMAGE_PATH,
+            title=job.title,
+            title_duration=job.title_duration,
+            progress_callback=progress_callback,
+            render_backend=job.render_backend,
+            render_profile=job.render_profile,
+            background_seed=job.background_seed,
+            segment_dir=segment_dir
+        )
+        if segment_dir:
+            # The segments only matter until the final video exists
+            shutil.rmtree(segment_dir, ignore_errors=True)
+        return output_path
+
+    def save_manifest(self, job: StoryJob, manifest_path: Path) -> Path:
+        """
+        Saves everything upstream of the render (narration, captions, chosen
+        background and its offset) next to the manifest, so the job can be
+        rendered again with another profile without redoing TTS, captions or
+        background selection.
+        """
+        manifest_path = Path(manifest_path)
+        artifact_dir = manifest_path.with_suffix('.artifacts')
+        artifact_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(job.audio_path, artifact_dir / 'narration.mp3')
+        job.captions.save(artifact_dir / 'captions.npz')
+
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'job_id': job.job_id,
+            'title': job.title,
+            'body': job.body,
+            'text': job.text,
+            'voice_type': job.voice_type,
+            'background_type': job.background_type,
+            'caption_mode': job.caption_mode,
+            'normalize_background': job.normalize_background,
+            'background_video_path': str(Path(job.background_video_path).resolve()),
+            'background_seed': job.background_seed,
+            'title_duration': job.title_duration,
+            'duration': job.speech_timing['duration'] if job.speech_timing else None,
+            'audio_path': f'{artifact_dir.name}/narration.mp3',
+            'captions_path': f'{artifact_dir.name}/captions.npz',
+            'render_profile': job.render_profile,
+            'render_backend': job.render_backend,
+            'output_path': str(job.output_path)
+        }
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        # Keep a normalized background alive for as long as the manifest exists
+        BackgroundCache().pin(job.background_video_path, manifest_path)
+        self.logger.info(f"[{job.job_id}] Saved render manifest: {manifest_path}")
+        return manifest_path
+
+    @staticmethod
+    def load_manifest(manifest_path: Path) -> StoryJob:
+        """
+        Rebuilds a job from save_manifest's output with every stage up to the
+        render already done. The caller sets output_path and the render options.
+        """
+        manifest_path = Path(manifest_path)
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version {manifest.get('version')} in {manifest_path}")
+
+        base = manifest_path.parent
+        for key in ('audio_path', 'captions_path', 'background_video_path'):
+            if not (base / manifest[key]).is_file():
+                raise FileNotFoundError(f"Manifest artifact is missing: {base / manifest[key]}")
+
+        job = StoryJob(
+            job_id=manifest['job_id'],
+            title=manifest['title'],
+            body=manifest['body'],
+            output_path=manifest['output_path'],
+            voice_type=manifest['voice_type'],
+            background_type=manifest['background_type'],
+            render_backend=manifest['render_backend'],
+            caption_mode=manifest['caption_mode'],
+            normalize_background=manifest['normalize_background'],
+            render_profile=manifest['render_profile'],
+            background_seed=manifest['background_seed']
+        )
+        job.text = manifest['text']
+        job.audio_path = base / manifest['audio_path']
+        job.captions = WordTimeline.load(base / manifest['captions_path'])
+        job.background_video_path = Path(manifest['background_video_path'])
+        job.title_duration = manifest['title_duration']
+        return job
+
+    def cleanup(self, job: StoryJob):
+        """Removes the job's temporary files (stored artifacts are left to ArtifactStore.gc)."""
+        if self.artifact_store:
+            self.artifact_store.gc()
+            if job.audio_path and self.artifact_store.contains(job.audio_path):
+                return
+        if job.audio_path and os.path.exists(job.audio_path):
+            self.logger.info(f"Cleaning up temporary audio file: {job.audio_path}")
+            os.remove(job.audio_path)
+
+    def run(
+        self,
+        job: StoryJob,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        manifest_path: Optional[Path] = None
+    ) -> Path:
+        """
+        Runs every stage for one job, reporting progress from 0 to 100.
+
+        With manifest_path, the upstream artifacts are kept for a later
+        render of the same job (see save_manifest).
+        """
+        def update_progress(progress):
+            if progress_callback:
+                progress_callback(progress)
+
+        self.logger.info(f'Starting video generation for job {job.job_id}')
+        if self.artifact_store:
+            self.artifact_store.begin(job.job_id)
+        try:
+            update_progress(10)
+            self.prepare_text(job)
+            update_progress(15)
+            self.synthesize(job)
+            update_progress(30)
+            self.select_background(job)
+            update_progress(50)
+            self.generate_captions(job)
+            update_progress(80)
+            self.render(job, progress_callback=lambda p: update_progress(80 + p * 0.2))
+            if manifest_path:
+                self.save_manifest(job, manifest_path)
+            if self.artifact_store:
+                self.artifact_store.finish(job.job_id)
+            update_progress(100)
+            self.logger.info("Video generation complete.")
+            return job.output_path
+        finally:
+            self.cleanup(job)
@@ -0,0 +1,246 @@
+"""
+Memory-bounded streaming render backend.
+
+Frames flow through a fixed ring of preallocated uint8 buffers: an ffmpeg
+decoder writes the cropped and scaled background straight into a free
+buffer, the intro card and the active caption are blended into it in place,
+and the buffer is piped to an ffmpeg encoder as raw RGB before it is reused.
+Only the caption on screen is rasterized, so the footprint of the render
+process depends on the frame size and ring size, not the story length.
+"""
+
+import os
+import queue
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Callable, List, Optional
+import numpy as np
+from caption_layout import CaptionLayout
+from caption_renderer import CaptionRenderer
+from compositing import Sprite
+from ffmpeg_renderer import background_filter
+from render_profiles import encoder_args
+from utils.logger import setup_logger
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Resident memory ceiling of the render process in MB (0 disables the check)
+RENDER_RSS_LIMIT_MB = int(os.getenv('RENDER_RSS_LIMIT_MB', '0'))
+
+# Frames in flight between the decoder, the compositor and the encoder
+RING_SIZE = 4
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB, or None if it can't be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Peak rather than current RSS; ru_maxrss is in KB on Linux but bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+    return None
+
+
+class StreamingRenderer:
+    def __init__(self, video_config: dict, ring_size: int = RING_SIZE, rss_limit_mb: int = RENDER_RSS_LIMIT_MB):
+        self.logger = setup_logger('streaming_renderer')
+        self.video_config = video_config
+        self.ring_size = max(2, ring_size)
+        self.rss_limit_mb = rss_limit_mb
+        self.peak_rss_mb = 0.0
+
+    def _check_memory(self):
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        if self.rss_limit_mb and rss > self.rss_limit_mb:
+            raise RuntimeError(f"Render memory {rss:.0f} MB exceeded the RSS ceiling of {self.rss_limit_mb} MB")
+
+    def render(
+        self,
+        background_video_path: Path,
+        background_start: Optional[float],
+        audio_clip_path: Path,
+        duration: float,
+        layout: CaptionLayout,
+        caption_renderer: CaptionRenderer,
+        intro_sprite: np.ndarray,
+        title_duration: float,
+        output_path: Path,
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> Path:
+        """
+        Renders the story video by streaming frames between two ffmpeg processes.
+
+        Args:
+            background_video_path: Path to the background video file.
+            background_start: Offset into the background, or None to loop it.
+            audio_clip_path: Path to the narration audio.
+            duration: Output duration in seconds.
+            layout: Caption chunks; each sprite is rasterized when its chunk comes on screen.
+            caption_renderer: Rasterizer for the caption chunks.
+            intro_sprite: RGBA intro card, already scaled to its on-screen size.
+            title_duration: How long the intro card is shown.
+            output_path: Path to save the final video.
+            progress_callback: Optional callback receiving progress from 0 to 100.
+
+        Returns:
+            Path to the created video file.
+
+        Raises:
+            RuntimeError: If ffmpeg fails or the process exceeds the RSS ceiling.
+        """
+        width = self.video_config['width']
+        height = self.video_config['height']
+        fps = self.video_config['fps']
+        total_frames = int(duration * fps)
+
+        if background_start is None:
+            background_input = ['-stream_loop', '-1', '-i', str(background_video_path)]
+        else:
+            background_input = ['-ss', f'{background_start:.3f}', '-i', str(background_video_path)]
+        decode_command = [
+            'ffmpeg', '-nostdin', '-loglevel', 'error',
+            *background_input,
+            '-vf', background_filter(width, height, fps),
+            '-frames:v', str(total_frames),
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+        ]
+        encode_command = [
+            'ffmpeg', '-y', '-nostdin', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', 'pipe:0',
+            '-i', str(audio_clip_path),
+            '-map', '0:v', '-map', '1:a',
+            '-t', f'{duration:.3f}',
+            *encoder_args(self.video_config), '-pix_fmt', 'yuv420p',
+            '-c:a', self.video_config['audio_codec'],
+            str(output_path)
+        ]
+
+        ring = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.ring_size)]
+        free_slots = queue.Queue()
+        for slot in range(self.ring_size):
+            free_slots.put(slot)
+        decoded = queue.Queue()
+        composited = queue.Queue()
+        errors: List[BaseException] = []
+        stop = threading.Event()
+
+        intro = Sprite(intro_sprite)
+        intro_position = intro.centered((width, height))
+        intro_frames = int(np.ceil(title_duration * fps))
+
+        self.logger.info(f"Streaming {total_frames} frames through a ring of {self.ring_size} buffers...")
+        with tempfile.TemporaryFile() as decode_log, tempfile.TemporaryFile() as encode_log:
+            decoder = subprocess.Popen(decode_command, stdout=subprocess.PIPE, stderr=decode_log)
+            encoder = subprocess.Popen(encode_command, stdin=subprocess.PIPE, stderr=encode_log)
+
+            def decode():
+                try:
+                    for _ in range(total_frames):
+                        slot = free_slots.get()
+                        if stop.is_set():
+                            break
+                        view = memoryview(ring[slot]).cast('B')
+                        filled = 0
+                        while filled < len(view):
+                            count = decoder.stdout.readinto(view[filled:])
+                            if not count:
+                                raise RuntimeError("Background decoder ended early")
+                            filled += count
+                        decoded.put(slot)
+                except BaseException as e:
+                    errors.append(e)
+                finally:
+                    decoded.put(None)
+
+            def encode():
+                try:
+                    while True:
+                        slot = composited.get()
+                        if slot is None:
+                            break
+                        encoder.stdin.write(memoryview(ring[slot]).cast('B'))
+                        free_slots.put(slot)
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+                    # Unblock the decoder if it is waiting for a buffer
+                    free_slots.put(0)
+
+            threads = [threading.Thread(target=decode, daemon=True), threading.Thread(target=encode, daemon=True)]
+            for thread in threads:
+                thread.start()
+
+            chunk_index, chunk_sprite, chunk_position = -1, None, (0, 0)
+            frame_index = 0
+            try:
+                while not stop.is_set():
+                    slot = decoded.get()
+                    if slot is None:
+                        break
+                    frame = ring[slot]
+                    t = frame_index / fps
+
+                    if frame_index < intro_frames:
+                        intro.blend_into(frame, intro_position)
+
+                    index = layout.chunk_at(t)
+                    if index != chunk_index:
+                        # Rasterize only the caption on screen and drop the previous one
+                        chunk_index = index
+                        chunk_sprite = Sprite(caption_renderer.render(layout.text(index))) if index >= 0 else None
+                        if chunk_sprite is not None:
+                            chunk_position = chunk_sprite.centered((width, height))
+                    if chunk_sprite is not None:
+                        chunk_sprite.blend_into(frame, chunk_position)
+
+                    composited.put(slot)
+                    frame_index += 1
+                    if frame_index % fps == 0:
+                        self._check_memory()
+                        if progress_callback:
+                            progress_callback(min(99.0, frame_index / total_frames * 100))
+                self._check_memory()
+            except BaseException:
+                stop.set()
+                free_slots.put(0)
+                raise
+            finally:
+                composited.put(None)
+                for thread in threads:
+                    thread.join()
+                if encoder.stdin:
+                    try:
+                        encoder.stdin.close()
+                    except OSError:
+                        pass
+                if stop.is_set() or errors:
+                    decoder.kill()
+                    encoder.kill()
+                decoder.wait()
+                encoder_status = encoder.wait()
+
+            if errors:
+                decode_log.seek(0)
+                encode_log.seek(0)
+                details = (decode_log.read() + encode_log.read()).decode('utf-8', 'replace').strip()
+                raise RuntimeError(f"Streaming render failed: {errors[0]}{': ' + details if details else ''}")
+            if encoder_status != 0:
+                encode_log.seek(0)
+                raise RuntimeError(f"ffmpeg encode failed: {encode_log.read().decode('utf-8', 'replace').strip()}")
+
+        if progress_callback:
+            progress_callback(100)
+        self.logger.info(f"Successfully created video: {output_path} (peak RSS {self.peak_rss_mb:.0f} MB)")
+        return Path(output_path)
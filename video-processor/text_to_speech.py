@@ -2,15 +2,91 @@
 Text-to-speech generator for narration using Microsoft Edge's TTS service.
 """
 
+import os
+import re
+import json
+import shutil
 import asyncio
+import tempfile
+import unicodedata
 from pathlib import Path
-from typing import Union
+from typing import Dict, List, Optional, Tuple, Union
 import edge_tts
+from media_probe import probe_duration
+from utils.disk_cache import DiskCache
 from utils.logger import setup_logger
 
+# Synthesized audio is cached by (normalized text, voice, rate)
+TTS_CACHE_DIR = Path(__file__).parent / 'temp' / 'tts_cache'
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_MB', '512')) * 1024 * 1024
+
+# edge-tts reports boundaries in 100ns ticks and currently streams constant-bitrate MP3
+TICKS_PER_SECOND = 10_000_000
+MP3_BITRATE = 48_000  # audio-24khz-48kbitrate-mono-mp3
+
+def mp3_duration(path: Union[str, Path]) -> float:
+    """Estimates the duration of an edge-tts MP3 from its size, assuming the CBR format above."""
+    return os.path.getsize(path) * 8 / MP3_BITRATE
+
+def audio_duration(path: Union[str, Path], words: Optional[List[Dict]] = None) -> float:
+    """
+    Returns the duration of synthesized speech in seconds.
+
+    ffprobe reads it from the stream itself, so it holds if edge-tts changes
+    its output format; the CBR size estimate is only a fallback. The result is
+    never shorter than the end of the last word.
+    """
+    try:
+        duration = probe_duration(path)
+    except Exception:
+        duration = 0.0
+    if duration <= 0:
+        duration = mp3_duration(path)
+    return max(duration, words[-1]['end'] if words else 0.0)
+
+# Long texts are split into sentence-aligned chunks synthesized concurrently
+LONG_TEXT_THRESHOLD = 1500
+CHUNK_MAX_CHARS = 1000
+CHUNK_MAX_RETRIES = 3
+TTS_MAX_CONCURRENCY = int(os.getenv('TTS_MAX_CONCURRENCY', '4'))
+
+def split_into_chunks(text: str, max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+    """
+    Splits text on sentence boundaries into chunks of at most max_chars.
+
+    Sentences longer than max_chars are split on whitespace.
+    """
+    pieces = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f'{current} {piece}' if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def normalize_tts_text(text: str) -> str:
+    """Normalizes text so trivially different inputs share a cache entry."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
 class TextToSpeechGenerator:
-    def __init__(self, voice_type: str = 'female'):
+    def __init__(self, voice_type: str = 'female', use_cache: bool = True, max_concurrency: int = TTS_MAX_CONCURRENCY):
         self.logger = setup_logger('text_to_speech')
+        self.cache = DiskCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES) if use_cache else None
+        self.max_concurrency = max(1, max_concurrency)
         
         # Voice and rate configuration using edge-tts voices
         self.voice_config = {
@@ -37,11 +113,88 @@ class TextToSpeechGenerator:
         self.voice = config['voice']
         self.rate = config['rate']
 
-    async def _generate_speech_async(self, text: str, output_path: Union[str, Path]):
-        """Asynchronous method to generate and save speech."""
-        self.logger.info(f"Generating speech with voice '{self.voice}' at rate '{self.rate}'")
+    async def _synthesize_chunk(self, text: str) -> Tuple[bytes, List[Dict]]:
+        """Synthesizes one chunk in memory, returning its MP3 bytes and word timings."""
         communicate = edge_tts.Communicate(text, self.voice, rate=self.rate)
-        await communicate.save(str(output_path))
+        audio = bytearray()
+        words = []
+        async for chunk in communicate.stream():
+            if chunk['type'] == 'audio':
+                audio.extend(chunk['data'])
+            elif chunk['type'] == 'WordBoundary':
+                # Offsets and durations are in 100-nanosecond ticks
+                start = chunk['offset'] / TICKS_PER_SECOND
+                words.append({
+                    'word': chunk['text'],
+                    'start': start,
+                    'end': start + chunk['duration'] / TICKS_PER_SECOND
+                })
+        if not audio:
+            raise RuntimeError("edge-tts returned no audio")
+        return bytes(audio), words
+
+    async def _generate_speech_async(self, text: str, output_path: Union[str, Path]) -> List[Dict]:
+        """
+        Asynchronous method to generate and save speech.
+
+        Returns:
+            Word timings from edge-tts WordBoundary events, as
+            [{'word': str, 'start': float, 'end': float}] in seconds.
+        """
+        self.logger.info(f"Generating speech with voice '{self.voice}' at rate '{self.rate}'")
+        audio, words = await self._synthesize_chunk(text)
+        with open(output_path, 'wb') as audio_file:
+            audio_file.write(audio)
+        return words
+
+    async def _generate_long_speech_async(self, chunks: List[str], output_path: Union[str, Path]) -> List[Dict]:
+        """
+        Synthesizes chunks concurrently and joins them into one MP3.
+
+        At most max_concurrency requests run at once, failed chunks are retried
+        individually, and word timings are shifted by the duration of the audio
+        before them.
+        """
+        self.logger.info(
+            f"Generating speech in {len(chunks)} chunks with voice '{self.voice}' "
+            f"at rate '{self.rate}' (concurrency {self.max_concurrency})"
+        )
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def synthesize_with_retry(index: int, chunk: str):
+            async with semaphore:
+                for attempt in range(1, CHUNK_MAX_RETRIES + 1):
+                    try:
+                        return await self._synthesize_chunk(chunk)
+                    except Exception as e:
+                        if attempt == CHUNK_MAX_RETRIES:
+                            raise
+                        self.logger.warning(f"Chunk {index + 1}/{len(chunks)} failed (attempt {attempt}): {e}; retrying")
+                        await asyncio.sleep(2 ** (attempt - 1))
+
+        results = await asyncio.gather(*(synthesize_with_retry(i, chunk) for i, chunk in enumerate(chunks)))
+
+        # MP3 frames concatenate cleanly; each chunk starts where the previous audio ends
+        words = []
+        elapsed = 0.0
+        with open(output_path, 'wb') as audio_file:
+            for audio, chunk_words in results:
+                audio_file.write(audio)
+                for word in chunk_words:
+                    words.append({'word': word['word'], 'start': word['start'] + elapsed, 'end': word['end'] + elapsed})
+                elapsed += await asyncio.to_thread(self._chunk_duration, audio, chunk_words, Path(output_path).parent)
+        return words
+
+    @staticmethod
+    def _chunk_duration(audio: bytes, words: List[Dict], work_dir: Path) -> float:
+        """Duration of one chunk's MP3 bytes (see audio_duration)."""
+        fd, chunk_path = tempfile.mkstemp(dir=work_dir, suffix='.mp3')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            return audio_duration(chunk_path, words)
+        finally:
+            os.remove(chunk_path)
 
     def generate_speech(self, text: str, output_path: Union[str, Path]) -> Path:
         """
@@ -54,12 +207,58 @@ class TextToSpeechGenerator:
         Returns:
             Path to generated audio file
         """
+        self.generate_speech_with_timing(text, output_path)
+        return Path(output_path)
+
+    def generate_speech_with_timing(self, text: str, output_path: Union[str, Path]) -> Dict:
+        """
+        Generate speech from text and return its timing metadata.
+
+        Args:
+            text: Text to convert to speech
+            output_path: Path to save the audio file (should be .mp3)
+
+        Returns:
+            Dictionary with 'words' (word timings in seconds, see
+            _generate_speech_async) and 'duration' (audio length in seconds)
+        """
+        # edge-tts is async, so we run it in an event loop
+        return asyncio.run(self.generate_speech_with_timing_async(text, output_path))
+
+    async def generate_speech_with_timing_async(self, text: str, output_path: Union[str, Path]) -> Dict:
+        """
+        Coroutine version of generate_speech_with_timing, for callers that
+        synthesize several stories concurrently on one event loop.
+        """
         try:
-            # edge-tts is async, so we run it in an event loop
-            asyncio.run(self._generate_speech_async(text, output_path))
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.make_key(normalize_tts_text(text), self.voice, self.rate)
+                cached_audio = self.cache.get(cache_key, '.mp3')
+                cached_timing = self.cache.get(cache_key, '.json')
+                if cached_audio and cached_timing:
+                    shutil.copyfile(cached_audio, output_path)
+                    with open(cached_timing, 'r', encoding='utf-8') as f:
+                        timing = json.load(f)
+                    self.logger.info(f'Using cached speech for {output_path}')
+                    return timing
+
+            if len(text) > LONG_TEXT_THRESHOLD:
+                words = await self._generate_long_speech_async(split_into_chunks(text), output_path)
+            else:
+                words = await self._generate_speech_async(text, output_path)
+            timing = {
+                'words': words,
+                'duration': audio_duration(output_path, words)
+            }
+
+            if self.cache:
+                self.cache.put_file(cache_key, '.mp3', output_path)
+                self.cache.put_bytes(cache_key, '.json', json.dumps(timing).encode('utf-8'))
+                self.cache.evict()
             
-            self.logger.info(f'Generated speech: {output_path}')
-            return Path(output_path)
+            self.logger.info(f'Generated speech: {output_path} ({len(words)} words, {timing["duration"]:.2f}s)')
+            return timing
             
         except Exception as e:
             self.logger.error(f'Error generating speech: {str(e)}')
@@ -0,0 +1,130 @@
+"""
+Speech-to-text backends for word-level captions.
+
+Every backend loads its model lazily and returns a WordTimeline, so
+CaptionGenerator can switch between them without changing what the editor
+receives:
+
+- 'whisper': openai-whisper on PyTorch, fp32 on CPU
+- 'faster-whisper': the same models converted for CTranslate2, int8 on CPU
+"""
+
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Union
+from utils.logger import setup_logger
+from word_timeline import WordTimeline
+
+TRANSCRIPTION_BACKENDS = ('whisper', 'faster-whisper')
+
+# Defaults for CaptionGenerator; 0 threads lets the backend pick
+TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'whisper')
+TRANSCRIPTION_THREADS = int(os.getenv('TRANSCRIPTION_THREADS', '0'))
+
+MODEL_DIR = Path("temp/whisper_models")
+
+
+class TranscriptionBackend(ABC):
+    """Base class: subclasses implement _load and _transcribe."""
+
+    name = ''
+
+    def __init__(self, model_name: str = 'base.en', threads: int = 0):
+        self.logger = setup_logger('transcription')
+        self.model_name = model_name
+        self.threads = threads
+        self.model = None
+
+    def load(self):
+        """Loads the model, downloading it if necessary."""
+        if self.model is None:
+            self.logger.info(f"Loading {self.name} model: {self.model_name}...")
+            # Specify a directory within the project to store downloaded models
+            MODEL_DIR.mkdir(parents=True, exist_ok=True)
+            self.model = self._load()
+            self.logger.info(f"{self.name} model loaded successfully.")
+
+    def transcribe(self, audio_path: Union[str, Path]) -> WordTimeline:
+        """Transcribes an audio file into timed words."""
+        self.load()
+        return self._transcribe(str(audio_path))
+
+    def options(self) -> Dict:
+        """Settings that change the transcription result, e.g. for cache keys."""
+        return {'backend': self.name, 'model': self.model_name}
+
+    @abstractmethod
+    def _load(self):
+        """Returns the loaded model."""
+
+    @abstractmethod
+    def _transcribe(self, audio_path: str) -> WordTimeline:
+        """Transcribes with the loaded model (self.model)."""
+
+
+class WhisperBackend(TranscriptionBackend):
+    name = 'whisper'
+
+    def _load(self):
+        import whisper
+        import torch
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        return whisper.load_model(self.model_name, download_root=str(MODEL_DIR))
+
+    def _transcribe(self, audio_path: str) -> WordTimeline:
+        # Use fp16=False for better CPU compatibility
+        result = self.model.transcribe(audio_path, word_timestamps=True, fp16=False)
+        # Keep only the word timings; tokens, logprobs and segment text are not needed
+        return WordTimeline.from_whisper(result)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    name = 'faster-whisper'
+
+    def __init__(self, model_name: str = 'base.en', threads: int = 0, compute_type: str = 'int8', beam_size: int = 5):
+        super().__init__(model_name, threads)
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+
+    def options(self) -> Dict:
+        return {**super().options(), 'compute_type': self.compute_type, 'beam_size': self.beam_size}
+
+    def _load(self):
+        from faster_whisper import WhisperModel
+        return WhisperModel(
+            self.model_name,
+            device='cpu',
+            compute_type=self.compute_type,
+            cpu_threads=self.threads,
+            download_root=str(MODEL_DIR)
+        )
+
+    def _transcribe(self, audio_path: str) -> WordTimeline:
+        segments, _ = self.model.transcribe(audio_path, word_timestamps=True, beam_size=self.beam_size)
+        # segments is a generator; decoding happens while it is consumed
+        words = [word for segment in segments for word in (segment.words or [])]
+        return WordTimeline.from_arrays(
+            [word.word.strip() for word in words],
+            [word.start for word in words],
+            [word.end for word in words]
+        )
+
+
+def create_backend(name: Optional[str] = None, model_name: str = 'base.en', threads: Optional[int] = None) -> TranscriptionBackend:
+    """
+    Builds a transcription backend.
+
+    Args:
+        name: One of TRANSCRIPTION_BACKENDS; defaults to $TRANSCRIPTION_BACKEND
+        model_name: Whisper model size, e.g. 'base.en'
+        threads: CPU threads for inference; defaults to $TRANSCRIPTION_THREADS (0 = backend default)
+    """
+    name = name or TRANSCRIPTION_BACKEND
+    threads = TRANSCRIPTION_THREADS if threads is None else threads
+    if name == 'whisper':
+        return WhisperBackend(model_name, threads)
+    if name == 'faster-whisper':
+        return FasterWhisperBackend(model_name, threads)
+    raise ValueError(f"Unknown transcription backend '{name}'; expected one of {', '.join(TRANSCRIPTION_BACKENDS)}")
@@ -0,0 +1,114 @@
+"""
+Size-bounded, content-addressed on-disk cache
+"""
+
+import os
+import hashlib
+import tempfile
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+
+class DiskCache:
+    """
+    Stores files under hashed keys with atomic writes and LRU eviction.
+
+    An entry is every file named <key><suffix> in the cache directory, so one
+    key can hold several related files (e.g. audio plus its timing metadata).
+    Reads refresh an entry's mtime, which is what eviction orders by.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Builds a stable key from any number of string-convertible parts."""
+        sha = hashlib.sha256()
+        for part in parts:
+            sha.update(str(part).encode('utf-8'))
+            sha.update(b'\0')
+        return sha.hexdigest()
+
+    @staticmethod
+    def hash_file(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 of a file's contents, for keys that depend on file data."""
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def path(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str) -> Optional[Path]:
+        """Returns the cached file for key/suffix, or None on a miss."""
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put_bytes(self, key: str, suffix: str, data: bytes) -> Path:
+        """Atomically writes data into the cache."""
+        fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_name, self.path(key, suffix))
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+        return self.path(key, suffix)
+
+    def put_file(self, key: str, suffix: str, source: Union[str, Path]) -> Path:
+        """Atomically copies a file into the cache."""
+        fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(source, temp_name)
+            os.replace(temp_name, self.path(key, suffix))
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+        return self.path(key, suffix)
+
+    def evict(self) -> int:
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            Number of bytes freed.
+        """
+        entries: Dict[str, List[os.DirEntry]] = {}
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for item in it:
+                if not item.is_file() or item.name.endswith('.tmp'):
+                    continue
+                key = item.name.split('.', 1)[0]
+                entries.setdefault(key, []).append(item)
+                total += item.stat().st_size
+
+        freed = 0
+        if total <= self.max_bytes:
+            return freed
+
+        # Oldest entries first, by the most recent access to any of their files
+        ordered = sorted(entries.values(), key=lambda files: max(f.stat().st_mtime for f in files))
+        for files in ordered:
+            if total - freed <= self.max_bytes:
+                break
+            for item in files:
+                try:
+                    size = item.stat().st_size
+                    os.remove(item.path)
+                    freed += size
+                except FileNotFoundError:
+                    continue
+        return freed
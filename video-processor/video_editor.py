@@ -3,82 +3,125 @@ Video editor for combining background video, audio, and captions
 """
 
 import os
+import bisect
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Callable, Optional
-from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, TextClip, vfx, ImageClip
+from typing import List, Dict, Callable, Optional, Tuple
+import numpy as np
+from moviepy.editor import VideoFileClip, AudioFileClip, vfx
 import moviepy.config as mpy_config
 import random
+from caption_renderer import CaptionRenderer, rasterize_intro
+from compositing import Sprite
+from caption_layout import CaptionLayout, CaptionLayoutEngine
+from word_timeline import WordTimeline
+from ffmpeg_renderer import FFmpegRenderer
+from render_profiles import DEFAULT_RENDER_PROFILE, get_render_profile, x264_params
+from streaming_renderer import StreamingRenderer
+from media_probe import probe_duration
+from utils.disk_cache import DiskCache
 from utils.logger import setup_logger
 
+RENDER_BACKENDS = ('moviepy', 'ffmpeg', 'parallel', 'stream')
+
+# The parallel backend doesn't split the video into segments shorter than this
+MIN_SEGMENT_SECONDS = 5.0
+
+# A segment boundary only moves to a cut point this close to its even-split
+# position (capped at a quarter segment), so segments stay within
+# MAX_SEGMENT_RATIO of each other and every worker gets a similar share
+SNAP_TOLERANCE_SECONDS = 1.0
+MAX_SEGMENT_RATIO = 3.0
+
 # Set the path to the ImageMagick binary using moviepy's config
 mpy_config.change_settings({"IMAGEMAGICK_BINARY": r"C:\\Program Files\\ImageMagick-7.1.1-Q16-HDRI\\magick.exe"})
 
+def split_timeline(cut_points: List[float], duration: float, fps: int, segments: int) -> List[Tuple[int, int]]:
+    """
+    Splits a video into up to `segments` frame ranges of similar length.
+
+    Each boundary moves to the nearest cut point (a caption chunk start) if
+    one lies within the snap tolerance, and otherwise stays at its even-split
+    frame, so no frame is rendered twice or skipped.
+
+    Returns:
+        (first_frame, end_frame) pairs covering all int(duration * fps) frames
+    """
+    total_frames = int(duration * fps)
+    segments = max(1, min(segments, int(duration // MIN_SEGMENT_SECONDS)))
+    cut_frames = sorted({round(t * fps) for t in cut_points if 0 < t < duration})
+    tolerance = min(SNAP_TOLERANCE_SECONDS * fps, total_frames / segments / 4)
+
+    boundaries = [0]
+    for k in range(1, segments):
+        target = k * total_frames / segments
+        boundary = round(target)
+        if cut_frames:
+            i = bisect.bisect_left(cut_frames, target)
+            nearest = min(cut_frames[max(0, i - 1):i + 1], key=lambda frame: abs(frame - target))
+            if abs(nearest - target) <= tolerance:
+                boundary = nearest
+        if boundaries[-1] < boundary < total_frames:
+            boundaries.append(boundary)
+    boundaries.append(total_frames)
+
+    lengths = [end - start for start, end in zip(boundaries[:-1], boundaries[1:])]
+    if len(lengths) > 1 and max(lengths) > MAX_SEGMENT_RATIO * min(lengths):
+        # Unbalanced segments leave one worker rendering most of the video; split evenly instead
+        boundaries = sorted({round(k * total_frames / segments) for k in range(segments)} | {total_frames})
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def _render_segment(task: Dict) -> str:
+    """Process pool entry point: renders one segment of the parallel backend."""
+    return str(VideoEditor(task.pop('render_profile'))._write_segment(**task))
+
 class VideoEditor:
-    def __init__(self):
+    def __init__(self, render_profile: str = DEFAULT_RENDER_PROFILE):
         self.logger = setup_logger('video_editor')
-        
-        # Video configuration
+        self.render_profile = render_profile
+
+        # Video configuration: size, frame rate and x264 settings come from the render profile
+        # (1080x1920 vertical format for social media unless the profile is a draft)
         self.video_config = {
-            'width': 1080,
-            'height': 1920,  # Vertical format for social media
-            'fps': 30,
             'codec': 'libx264',
-            'audio_codec': 'aac'
+            'audio_codec': 'aac',
+            **get_render_profile(render_profile)
         }
         
-        # Caption styling
+        # Caption styling, scaled with the output width
+        scale = self.video_config['width'] / 1080
         self.caption_style = {
-            'fontsize': 80,
+            'fontsize': round(80 * scale),
             'color': 'white',
             'font': 'Impact',
             'stroke_color': 'black',
-            'stroke_width': 6, # Increased for a thicker outline
+            'stroke_width': max(1, round(6 * scale)), # Increased for a thicker outline
             'method': 'caption'
         }
-    
-    def _create_intro_clip(self, intro_image_path: Path, title: str, title_duration: float, background_clip_size: tuple) -> CompositeVideoClip:
-        """Creates the intro clip with a title overlay."""
-        self.logger.info("Creating intro image with title overlay...")
-
-        # 1. Create the base image clip
-        intro_image = ImageClip(str(intro_image_path)).set_duration(title_duration)
-        
-        # 2. Create the title text clip
-        title_clip = TextClip(
-            title.upper(),
-            fontsize=32,  # smaller font
-            color='black',
-            font='Impact',
-            method='caption',
-            size=(int(intro_image.w * 0.85), int(intro_image.h * 0.6)),  # taller box
-            align='West' # Set text to be left-aligned
-        ).set_duration(title_duration)
-
-        # 3. Composite the title text onto the image
-        intro_overlay = CompositeVideoClip([
-            intro_image,
-            # Position the top-left of the text clip
-            title_clip.set_position((60, int(intro_image.h * 0.32)))  # very slight move up and left
-        ]).set_duration(title_duration)
-
-        # 4. Resize and position the final intro overlay
-        background_width = background_clip_size[0]
-        intro_overlay = intro_overlay.resize(width=background_width * 0.9)
-        intro_overlay = intro_overlay.set_position(('center', 'center'))
-
-        self.logger.info(f"Intro will be displayed for {title_duration:.2f} seconds.")
-        return intro_overlay
 
+        # Caption chunk budgets (see caption_layout.py)
+        self.caption_layout = {
+            'max_words': 4,
+            'max_duration': 3.0,  # seconds
+            'split_gap': 0.5  # pause in seconds that always starts a new chunk
+        }
+    
     def create_story_video(
         self,
         background_video_path: Path,
         audio_clip_path: Path,
-        captions: Dict,
+        captions: WordTimeline,
         output_path: Path,
         intro_image_path: Path,
         title: str,
         title_duration: float,
-        progress_callback: Optional[Callable[[float], None]] = None
+        progress_callback: Optional[Callable[[float], None]] = None,
+        render_backend: str = 'moviepy',
+        segments: Optional[int] = None,
+        render_profile: Optional[str] = None,
+        background_seed: Optional[int] = None,
+        segment_dir: Optional[Path] = None
     ) -> Path:
         """
         Create the final story video with background, audio, and synchronized captions.
@@ -86,17 +129,57 @@ class VideoEditor:
         Args:
             background_video: Path to background video file.
             audio_clip_path: Path to the single audio file.
-            captions: The result dictionary from Whisper containing segment and word timings.
+            captions: The caption WordTimeline.
             output_path: Path to save the final video.
             intro_image_path: Path to the intro image to overlay.
             title: The text of the title to render on the intro image.
             title_duration: The duration to display the intro image.
             progress_callback: Optional callback for progress updates.
+            render_backend: 'moviepy' (default), 'ffmpeg' for a single-pass filtergraph render,
+                'parallel' to render time ranges in separate processes, or 'stream'
+                for a constant-memory render through a ring of frame buffers.
+            segments: Number of segments for the parallel backend (defaults to the CPU count).
+            render_profile: Named output size and encoder settings ('draft', 'standard' or 'archive');
+                defaults to the editor's profile.
+            background_seed: Seed for the random background offset, so a render can be
+                repeated with the same background section (e.g. when promoting a preview).
+            segment_dir: Directory to keep the parallel backend's segments in. Segments are
+                named by a hash of their inputs, so a rerun only renders the missing ones.
             
         Returns:
             Path to the created video file.
         """
-        self.logger.info("Starting video creation with synchronized captions...")
+        if render_backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend '{render_backend}', expected one of {RENDER_BACKENDS}")
+
+        if render_profile and render_profile != self.render_profile:
+            # A shared editor renders other profiles through a configured copy
+            return VideoEditor(render_profile).create_story_video(
+                background_video_path, audio_clip_path, captions, output_path, intro_image_path,
+                title, title_duration, progress_callback, render_backend, segments,
+                background_seed=background_seed, segment_dir=segment_dir
+            )
+
+        self.logger.info(f"Starting video creation with synchronized captions ({render_backend} backend, {self.render_profile} profile)...")
+
+        if render_backend == 'ffmpeg':
+            return self._create_story_video_ffmpeg(
+                background_video_path, audio_clip_path, captions, output_path,
+                intro_image_path, title, title_duration, progress_callback, background_seed
+            )
+        
+        if render_backend == 'parallel':
+            return self._create_story_video_parallel(
+                background_video_path, audio_clip_path, captions, output_path,
+                intro_image_path, title, title_duration, progress_callback, segments, background_seed,
+                segment_dir
+            )
+
+        if render_backend == 'stream':
+            return self._create_story_video_stream(
+                background_video_path, audio_clip_path, captions, output_path,
+                intro_image_path, title, title_duration, progress_callback, background_seed
+            )
         
         try:
             # Load the background video and audio clips
@@ -105,27 +188,85 @@ class VideoEditor:
             audio_clip = AudioFileClip(str(audio_clip_path))
             self.logger.info("Clips loaded successfully.")
 
-            # --- Video Duration Adjustment ---
-            self.logger.info("Adjusting background video duration...")
-            if background_clip.duration > audio_clip.duration:
-                # If background is longer, trim a random segment
-                self.logger.info("Background is longer than audio. Trimming a random segment.")
-                start_time = random.uniform(0, background_clip.duration - audio_clip.duration)
-                background_clip = background_clip.subclip(start_time, start_time + audio_clip.duration)
-            else:
-                # If background is shorter, loop it
-                self.logger.info("Background is shorter than audio. Looping to match duration.")
-                background_clip = background_clip.fx(vfx.loop, duration=audio_clip.duration)
+            final_video = self._build_timeline(
+                background_clip=background_clip,
+                duration=audio_clip.duration,
+                background_start=self._choose_background_start(background_clip.duration, audio_clip.duration, background_seed),
+                captions=captions,
+                intro_image_path=intro_image_path,
+                title=title,
+                title_duration=title_duration
+            ).set_audio(audio_clip)
             
-            # Ensure background clip is exactly the audio duration
-            background_clip = background_clip.set_duration(audio_clip.duration)
-            self.logger.info("Background video duration adjusted.")
+            # Write the final video file
+            self.logger.info("Writing final video file... (This may take a while)")
+            final_video.write_videofile(
+                str(output_path), 
+                codec=self.video_config['codec'],
+                audio_codec=self.video_config['audio_codec'],
+                temp_audiofile='temp-audio.m4a', 
+                remove_temp=True,
+                logger='bar',  # This will print a progress bar to the console
+                preset=self.video_config['preset'],
+                threads=self.video_config['threads'] or None,
+                ffmpeg_params=[*x264_params(self.video_config), '-nostdin'], # -nostdin prevents hanging
+                fps=self.video_config['fps']
+            )
+            
+            self.logger.info(f"Successfully created video: {output_path}")
+            return Path(output_path)
+
+        except Exception as e:
+            self.logger.error(f"Error creating video: {e}")
+            raise e
+
+    def _build_timeline(
+        self,
+        background_clip: VideoFileClip,
+        duration: float,
+        background_start: Optional[float],
+        captions: WordTimeline,
+        intro_image_path: Path,
+        title: str,
+        title_duration: float
+    ):
+        """
+        Builds the composited video (background, intro and captions) without audio.
+
+        Args:
+            background_clip: The loaded background video.
+            duration: Duration of the narration.
+            background_start: Offset into the background, or None to loop it.
+            (the remaining arguments are as for create_story_video)
+
+        Returns:
+            A MoviePy clip of the given duration.
+        """
+        # --- Video Duration Adjustment ---
+        self.logger.info("Adjusting background video duration...")
+        if background_start is not None:
+            # If background is longer, trim a random segment
+            self.logger.info("Background is longer than audio. Trimming a random segment.")
+            background_clip = background_clip.subclip(background_start, background_start + duration)
+        else:
+            # If background is shorter, loop it
+            self.logger.info("Background is shorter than audio. Looping to match duration.")
+            background_clip = background_clip.fx(vfx.loop, duration=duration)
+        
+        # Ensure background clip is exactly the audio duration
+        background_clip = background_clip.set_duration(duration)
+        self.logger.info("Background video duration adjusted.")
 
-            # --- Video Resizing and Cropping ---
+        # --- Video Resizing and Cropping ---
+        target_size = (self.video_config['width'], self.video_config['height'])
+        if tuple(background_clip.size) == target_size:
+            # Pre-normalized mezzanine backgrounds are already 1080x1920
+            self.logger.info("Background video is already at the target size. Skipping crop and resize.")
+        else:
             self.logger.info("Resizing and cropping background video...")
             target_aspect_ratio = 9 / 16
             current_aspect_ratio = background_clip.w / background_clip.h
-            
+        
             if current_aspect_ratio > target_aspect_ratio:
                 # Wider than target: crop width
                 new_width = int(background_clip.h * target_aspect_ratio)
@@ -134,89 +275,308 @@ class VideoEditor:
                 # Taller than target: crop height
                 new_height = int(background_clip.w / target_aspect_ratio)
                 background_clip = background_clip.crop(y_center=background_clip.h/2, height=new_height)
-            
-            # Final resize to 1080x1920
-            background_clip = background_clip.resize(width=1080, height=1920)
+        
+            # Final resize to the output size
+            background_clip = background_clip.resize(newsize=target_size)
             self.logger.info("Background video resized and cropped.")
 
-            # --- Create Intro with Title ---
-            intro_overlay = self._create_intro_clip(
-                intro_image_path=intro_image_path,
-                title=title,
+        # --- Create Intro with Title ---
+        self.logger.info("Creating intro image with title overlay...")
+        intro_sprite = rasterize_intro(intro_image_path, title, int(background_clip.w * 0.9))
+        self.logger.info(f"Intro will be displayed for {title_duration:.2f} seconds.")
+
+        # --- Caption Generation ---
+        self.logger.info("Creating synchronized captions from the word timeline...")
+        caption_sprites = self.create_caption_sprites(captions, background_clip.size)
+        self.logger.info(f"Generated {len(caption_sprites)} caption sprites.")
+
+        return self._burn_overlays(background_clip, intro_sprite, title_duration, caption_sprites)
+
+    def _create_story_video_parallel(
+        self,
+        background_video_path: Path,
+        audio_clip_path: Path,
+        captions: WordTimeline,
+        output_path: Path,
+        intro_image_path: Path,
+        title: str,
+        title_duration: float,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        segments: Optional[int] = None,
+        background_seed: Optional[int] = None,
+        segment_dir: Optional[Path] = None
+    ) -> Path:
+        """
+        Renders the MoviePy timeline as segments in separate processes.
+
+        The timeline is split at caption chunk boundaries; every segment uses
+        the same background offset, so the segments are encoded independently
+        and joined with stream copy before the audio is muxed once. With
+        segment_dir, segments that an earlier attempt finished are reused.
+        """
+        try:
+            fps = self.video_config['fps']
+            audio_duration = probe_duration(audio_clip_path)
+            background_start = self._choose_background_start(probe_duration(background_video_path), audio_duration, background_seed)
+
+            screensize = (self.video_config['width'], self.video_config['height'])
+            cut_points = self.layout_captions(captions, screensize).start
+            ranges = split_timeline(cut_points, audio_duration, fps, segments or os.cpu_count() or 1)
+            # Share the cores between the encoders instead of each one using all of them
+            threads = max(1, (os.cpu_count() or 1) // len(ranges))
+            self.logger.info(f"Rendering {len(ranges)} segments in parallel ({threads} encoder threads each)...")
+
+            # Everything that changes the pixels of a segment, besides its frame range
+            inputs_key = DiskCache.make_key(
+                self.render_profile, background_video_path, background_start, audio_duration,
+                captions.digest(), intro_image_path, title, title_duration
+            )
+
+            with tempfile.TemporaryDirectory() as temp_dir:
+                work_dir = Path(segment_dir or temp_dir)
+                work_dir.mkdir(parents=True, exist_ok=True)
+                tasks = [{
+                    'background_video_path': background_video_path,
+                    'duration': audio_duration,
+                    'background_start': background_start,
+                    'captions': captions,
+                    'intro_image_path': intro_image_path,
+                    'title': title,
+                    'title_duration': title_duration,
+                    'first_frame': first_frame,
+                    'end_frame': end_frame,
+                    'output_path': work_dir / f'segment_{i:03d}_{DiskCache.make_key(inputs_key, first_frame, end_frame)[:16]}.mp4',
+                    'threads': threads,
+                    'render_profile': self.render_profile
+                } for i, (first_frame, end_frame) in enumerate(ranges)]
+
+                segment_paths = [task['output_path'] for task in tasks]
+                pending = [task for task in tasks if not task['output_path'].is_file()]
+                if len(pending) < len(tasks):
+                    self.logger.info(f"Reusing {len(tasks) - len(pending)} of {len(tasks)} segments from {work_dir}")
+
+                if pending:
+                    with ProcessPoolExecutor(max_workers=len(pending)) as pool:
+                        futures = {}
+                        for task in pending:
+                            # Encode under a temporary name, so a crash never leaves a truncated segment to reuse
+                            final_path = task['output_path']
+                            task['output_path'] = final_path.with_suffix('.partial.mp4')
+                            futures[pool.submit(_render_segment, task)] = (task['output_path'], final_path)
+                        error = None
+                        for done, future in enumerate(as_completed(futures), len(tasks) - len(pending) + 1):
+                            try:
+                                future.result()
+                            except Exception as e:
+                                # Let the other segments finish, so a rerun can reuse them
+                                error = error or e
+                                continue
+                            os.replace(*futures[future])
+                            if progress_callback:
+                                progress_callback(done / len(tasks) * 95)
+                        if error:
+                            raise error
+
+                FFmpegRenderer(self.video_config).concat_segments(segment_paths, audio_clip_path, output_path)
+
+            if progress_callback:
+                progress_callback(100)
+            self.logger.info(f"Successfully created video: {output_path}")
+            return Path(output_path)
+
+        except Exception as e:
+            self.logger.error(f"Error creating video: {e}")
+            raise e
+
+    def _write_segment(
+        self,
+        background_video_path: Path,
+        duration: float,
+        background_start: Optional[float],
+        captions: WordTimeline,
+        intro_image_path: Path,
+        title: str,
+        title_duration: float,
+        first_frame: int,
+        end_frame: int,
+        output_path: Path,
+        threads: int = 1
+    ) -> Path:
+        """Encodes frames [first_frame, end_frame) of the story timeline, without audio."""
+        fps = self.video_config['fps']
+        background_clip = VideoFileClip(str(background_video_path), audio=False)
+        try:
+            timeline = self._build_timeline(
+                background_clip, duration, background_start, captions,
+                intro_image_path, title, title_duration
+            )
+            # MoviePy writes int(duration * fps) frames; the extra half frame
+            # keeps float rounding from dropping a segment's last frame
+            end = min(timeline.duration, (end_frame + 0.5) / fps)
+            timeline.subclip(first_frame / fps, end).write_videofile(
+                str(output_path),
+                codec=self.video_config['codec'],
+                audio=False,
+                fps=fps,
+                preset=self.video_config['preset'],
+                threads=threads,
+                logger=None,
+                ffmpeg_params=[*x264_params(self.video_config), '-nostdin']
+            )
+        finally:
+            background_clip.close()
+        return Path(output_path)
+
+    @staticmethod
+    def _choose_background_start(background_duration: float, audio_duration: float, seed: Optional[int] = None) -> Optional[float]:
+        """Picks a random offset for a long enough background, or None if it has to loop."""
+        if background_duration > audio_duration:
+            rng = random.Random(seed) if seed is not None else random
+            return rng.uniform(0, background_duration - audio_duration)
+        return None
+
+    def _create_story_video_ffmpeg(
+        self,
+        background_video_path: Path,
+        audio_clip_path: Path,
+        captions: WordTimeline,
+        output_path: Path,
+        intro_image_path: Path,
+        title: str,
+        title_duration: float,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        background_seed: Optional[int] = None
+    ) -> Path:
+        """Renders the same video as create_story_video in a single ffmpeg pass."""
+        try:
+            screensize = (self.video_config['width'], self.video_config['height'])
+            audio_duration = probe_duration(audio_clip_path)
+            background_start = self._choose_background_start(probe_duration(background_video_path), audio_duration, background_seed)
+            if background_start is None:
+                self.logger.info("Background is shorter than audio. Looping to match duration.")
+
+            intro_sprite = rasterize_intro(intro_image_path, title, int(screensize[0] * 0.9))
+            caption_sprites = self.create_caption_sprites(captions, screensize)
+
+            renderer = FFmpegRenderer(self.video_config)
+            return renderer.render(
+                background_video_path=background_video_path,
+                background_start=background_start,
+                audio_clip_path=audio_clip_path,
+                duration=audio_duration,
+                caption_sprites=caption_sprites,
+                intro_sprite=intro_sprite,
                 title_duration=title_duration,
-                background_clip_size=background_clip.size
+                output_path=output_path,
+                progress_callback=progress_callback
             )
 
-            # --- Caption Generation ---
-            self.logger.info("Creating synchronized captions from Whisper segments...")
-            caption_clips = self.create_caption_clips(captions, background_clip.size)
-            self.logger.info(f"Generated {len(caption_clips)} caption clips.")
+        except Exception as e:
+            self.logger.error(f"Error creating video: {e}")
+            raise e
 
-            # --- Final Composition ---
-            self.logger.info("Compositing all clips together...")
-            final_video = CompositeVideoClip([background_clip, intro_overlay, *caption_clips]).set_audio(audio_clip)
-            self.logger.info("Composition complete.")
-            
-            # Write the final video file
-            self.logger.info("Writing final video file... (This may take a while)")
-            final_video.write_videofile(
-                str(output_path), 
-                codec='libx264', 
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a', 
-                remove_temp=True,
-                logger='bar',  # This will print a progress bar to the console
-                ffmpeg_params=['-nostdin'], # Prevents hanging
-                fps=30 # Set output to 30 FPS for faster rendering
+    def _create_story_video_stream(
+        self,
+        background_video_path: Path,
+        audio_clip_path: Path,
+        captions: WordTimeline,
+        output_path: Path,
+        intro_image_path: Path,
+        title: str,
+        title_duration: float,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        background_seed: Optional[int] = None
+    ) -> Path:
+        """Renders the same video as create_story_video with constant memory."""
+        try:
+            screensize = (self.video_config['width'], self.video_config['height'])
+            audio_duration = probe_duration(audio_clip_path)
+            background_start = self._choose_background_start(probe_duration(background_video_path), audio_duration, background_seed)
+            if background_start is None:
+                self.logger.info("Background is shorter than audio. Looping to match duration.")
+
+            intro_sprite = rasterize_intro(intro_image_path, title, int(screensize[0] * 0.9))
+            # Sprites are rasterized as their chunk comes on screen and never cached
+            caption_renderer = CaptionRenderer(self.caption_style, screensize[0] - 100, cached=False)
+
+            return StreamingRenderer(self.video_config).render(
+                background_video_path=background_video_path,
+                background_start=background_start,
+                audio_clip_path=audio_clip_path,
+                duration=audio_duration,
+                layout=self.layout_captions(captions, screensize),
+                caption_renderer=caption_renderer,
+                intro_sprite=intro_sprite,
+                title_duration=title_duration,
+                output_path=output_path,
+                progress_callback=progress_callback
             )
-            
-            self.logger.info(f"Successfully created video: {output_path}")
 
         except Exception as e:
             self.logger.error(f"Error creating video: {e}")
             raise e
 
-    def create_caption_clips(self, captions: Dict, screensize: tuple) -> List[TextClip]:
-        """Creates a list of TextClip objects for the captions, grouped by 4 words."""
-        clips = []
+    def create_caption_sprites(self, captions: WordTimeline, screensize: tuple) -> List[Tuple[float, float, np.ndarray]]:
+        """
+        Lays out the captions and rasterizes every chunk into an RGBA sprite.
+
+        Returns:
+            A list of (start_time, end_time, sprite) tuples sorted by start time.
+        """
         max_width = screensize[0] - 100  # Leave a 50px margin on each side
+        renderer = CaptionRenderer(self.caption_style, max_width)
+        layout = self.layout_captions(captions, screensize)
 
-        # First, flatten all words from all segments into a single list
-        all_words = []
-        for segment in captions.get('segments', []):
-            for word in segment.get('words', []):
-                all_words.append(word)
+        sprites = [
+            (float(layout.start[i]), float(layout.end[i]), renderer.render(layout.text(i)))
+            for i in range(len(layout))
+        ]
+        self.logger.info(f"Created {len(sprites)} caption sprites ({renderer.cache_info()}).")
+        return sprites
 
-        # Process the words in chunks of 4
-        chunk_size = 4
-        for i in range(0, len(all_words), chunk_size):
-            chunk = all_words[i:i + chunk_size]
-            
-            if not chunk:
-                continue
+    def layout_captions(self, captions: WordTimeline, screensize: tuple) -> CaptionLayout:
+        """Packs the caption words into chunks that fit on one line of the caption style."""
+        engine = CaptionLayoutEngine(self.caption_style, screensize[0] - 100, **self.caption_layout)
+        return engine.layout_timeline(captions, uppercase=True)
 
-            # Join the words in the chunk to form the caption text
-            chunk_text = " ".join([word['word'].strip() for word in chunk])
-            
-            # Determine the start and end time of the chunk
-            start_time = chunk[0]['start']
-            end_time = chunk[-1]['end']
-            duration = end_time - start_time
-
-            # Create a TextClip for the chunk
-            text_clip = TextClip(
-                chunk_text.upper(),
-                fontsize=self.caption_style['fontsize'],
-                color=self.caption_style['color'],
-                font=self.caption_style['font'],
-                stroke_color=self.caption_style['stroke_color'],
-                stroke_width=self.caption_style['stroke_width'],
-                method=self.caption_style['method'],
-                size=(max_width, None),
-                align='center'
-            ).set_position(('center', 'center')).set_duration(duration).set_start(start_time)
-            
-            clips.append(text_clip)
+    def _burn_overlays(
+        self,
+        clip,
+        intro_sprite: np.ndarray,
+        title_duration: float,
+        caption_sprites: List[Tuple[float, float, np.ndarray]]
+    ):
+        """
+        Returns a clip with the intro card and the caption active at each time
+        blended into its frames in place. Frames without an overlay pass through untouched.
+        """
+        frame_size = tuple(clip.size)
+        intro = Sprite(intro_sprite)
+        intro_position = intro.centered(frame_size)
+        starts = [start for start, _, _ in caption_sprites]
+        prepared = {}
+
+        def draw_overlays(get_frame, t):
+            layers = []
+            if t < title_duration:
+                layers.append((intro, intro_position))
+
+            index = bisect.bisect_right(starts, t) - 1
+            if index >= 0 and t < caption_sprites[index][1]:
+                if index not in prepared:
+                    # Frames are requested in order, so only the current caption is kept
+                    prepared.clear()
+                    sprite = Sprite(caption_sprites[index][2])
+                    prepared[index] = (sprite, sprite.centered(frame_size))
+                layers.append(prepared[index])
+
+            frame = get_frame(t)
+            if not layers:
+                return frame
+            if frame.dtype != np.uint8 or not frame.flags.writeable:
+                frame = np.array(frame, dtype=np.uint8)  # Decoder buffers are read-only
+            for sprite, position in layers:
+                sprite.blend_into(frame, position)
+            return frame
 
-        self.logger.info(f"Created {len(clips)} caption clips from {len(all_words)} words.")
-        return clips 
\ No newline at end of file
+        return clip.fl(draw_overlays)
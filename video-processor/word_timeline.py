@@ -0,0 +1,161 @@
+"""
+Compact word timeline for captions.
+
+Caption words are kept in a string table (one UTF-8 buffer plus int32 word
+offsets) next to float32 start/end arrays, instead of Whisper's nested result
+dicts. Timelines pickle cheaply to render workers, save to an uncompressed
+.npz without pickling, and are shifted in time by adjusting a single offset.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Union
+import numpy as np
+
+
+class WordTimeline:
+    """
+    Timed caption words, sorted by start time.
+
+    Times are stored relative to `offset`, so shift() is O(1) and shares the
+    arrays with the original timeline.
+    """
+
+    def __init__(self, table: np.ndarray, bounds: np.ndarray, start: np.ndarray, end: np.ndarray, offset: float = 0.0):
+        self.table = table  # uint8 UTF-8 bytes of all words, concatenated
+        self.bounds = bounds  # word i is table[bounds[i]:bounds[i + 1]]
+        self._start = start
+        self._end = end
+        self.offset = float(offset)
+        self._words: Optional[List[str]] = None
+
+    @classmethod
+    def from_arrays(cls, words: Sequence[str], start: Sequence[float], end: Sequence[float]) -> 'WordTimeline':
+        encoded = [word.encode('utf-8') for word in words]
+        bounds = np.zeros(len(encoded) + 1, dtype=np.int32)
+        np.cumsum([len(word) for word in encoded], out=bounds[1:])
+        table = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(
+            table,
+            bounds,
+            np.asarray(start, dtype=np.float32).reshape(len(encoded)),
+            np.asarray(end, dtype=np.float32).reshape(len(encoded))
+        )
+
+    @classmethod
+    def from_words(cls, words: Iterable[Dict]) -> 'WordTimeline':
+        """Builds a timeline from [{'word', 'start', 'end'}] entries."""
+        words = list(words)
+        return cls.from_arrays(
+            [word['word'].strip() for word in words],
+            [word['start'] for word in words],
+            [word['end'] for word in words]
+        )
+
+    @classmethod
+    def from_whisper(cls, result: Dict) -> 'WordTimeline':
+        """Keeps only the word timings of a Whisper transcription result."""
+        return cls.from_words(word for segment in result.get('segments', []) for word in segment.get('words', []))
+
+    @classmethod
+    def empty(cls) -> 'WordTimeline':
+        return cls.from_arrays([], [], [])
+
+    def __getstate__(self) -> Dict:
+        # Send only the arrays to other processes; words are decoded again on demand
+        state = self.__dict__.copy()
+        state['_words'] = None
+        return state
+
+    def __len__(self) -> int:
+        return len(self._start)
+
+    def word(self, index: int) -> str:
+        return self.table[self.bounds[index]:self.bounds[index + 1]].tobytes().decode('utf-8')
+
+    @property
+    def words(self) -> List[str]:
+        """All words, decoded once and cached."""
+        if self._words is None:
+            text = self.table.tobytes()
+            bounds = self.bounds.tolist()
+            self._words = [text[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(self))]
+        return self._words
+
+    @property
+    def start(self) -> np.ndarray:
+        return self._start + np.float32(self.offset) if self.offset else self._start
+
+    @property
+    def end(self) -> np.ndarray:
+        return self._end + np.float32(self.offset) if self.offset else self._end
+
+    @property
+    def duration(self) -> float:
+        return float(self._end.max()) + self.offset if len(self) else 0.0
+
+    def shift(self, seconds: float) -> 'WordTimeline':
+        """Returns the timeline moved later by `seconds`, sharing this one's arrays."""
+        shifted = WordTimeline(self.table, self.bounds, self._start, self._end, self.offset + seconds)
+        shifted._words = self._words
+        return shifted
+
+    def select(self, mask: np.ndarray) -> 'WordTimeline':
+        """Returns the words where mask is True."""
+        indices = np.flatnonzero(mask)
+        words = self.words
+        selected = WordTimeline.from_arrays([words[i] for i in indices], self._start[indices], self._end[indices])
+        selected.offset = self.offset
+        return selected
+
+    def skip_before(self, t: float) -> 'WordTimeline':
+        """
+        Drops the words spoken before t (e.g. the title). The word midpoint is
+        compared so small timing differences don't clip the edges.
+        """
+        if t <= 0:
+            return self
+        return self.select((self.start + self.end) / 2 >= t)
+
+    def digest(self) -> str:
+        """SHA-256 of the words and their times, for cache keys."""
+        sha = hashlib.sha256()
+        for array in (self.table, self.bounds, self._start, self._end):
+            sha.update(np.ascontiguousarray(array).tobytes())
+        sha.update(repr(self.offset).encode('utf-8'))
+        return sha.hexdigest()
+
+    def index_at(self, t: float) -> int:
+        """Index of the word being spoken at time t, or -1 if none is."""
+        t -= self.offset
+        index = int(np.searchsorted(self._start, t, side='right')) - 1
+        if index < 0 or t >= self._end[index]:
+            return -1
+        return index
+
+    def to_words(self) -> List[Dict]:
+        """Expands the timeline back into [{'word', 'start', 'end'}] entries."""
+        return [
+            {'word': word, 'start': float(start), 'end': float(end)}
+            for word, start, end in zip(self.words, self.start, self.end)
+        ]
+
+    def save(self, file: Union[str, Path, BinaryIO]):
+        """Writes the timeline as an uncompressed .npz (no pickled objects) to a path or binary file."""
+        arrays = {
+            'table': self.table,
+            'bounds': self.bounds,
+            'start': self._start,
+            'end': self._end,
+            'offset': np.float64(self.offset)
+        }
+        if hasattr(file, 'write'):
+            np.savez(file, **arrays)
+            return
+        with open(file, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, file: Union[str, Path, BinaryIO]) -> 'WordTimeline':
+        with np.load(file, allow_pickle=False) as data:
+            return cls(data['table'], data['bounds'], data['start'], data['end'], float(data['offset']))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Long-lived video generation worker.
+
+Reads one JSON job per line from stdin and runs it through the batch stage
+pools (see batch_generator.py): TTS and background selection for queued jobs
+run ahead on an asyncio loop while earlier jobs render in worker processes.
+Whisper, the TTS generators and each render process's video editor are only
+initialized once.
+
+Job lines look like:
+    {"job_id": "abc", "text_file": "story.txt", "output_path": "out.mp4",
+     "voice_type": "female", "background_type": "minecraft",
+     "render_backend": "ffmpeg", "caption_mode": "tts", "render_profile": "draft"}
+
+("text" can be given instead of "text_file".) Output keeps the PROGRESS:/ERROR:
+protocol of generate_video_from_text.py, prefixed with the job id:
+    PROGRESS:<job_id>:<progress>
+    ERROR:<job_id>:<message>
+    DONE:<job_id>:<output_path>
+"""
+
+import sys
+import json
+import argparse
+from typing import Iterable, Iterator
+
+from caption_generator import CAPTION_MODES
+from transcription_backends import TRANSCRIPTION_BACKENDS
+from render_profiles import DEFAULT_RENDER_PROFILE, RENDER_PROFILES
+from batch_generator import BatchGenerator
+from generate_video_from_text import split_title_body
+from story_pipeline import StoryJob
+from utils.logger import setup_logger
+
+
+def read_jobs(lines: Iterable[str], generator: BatchGenerator, default_caption_mode: str) -> Iterator[StoryJob]:
+    """Parses job lines into StoryJobs, reporting and skipping invalid ones."""
+    logger = generator.logger
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        job_id = ''
+        try:
+            job = json.loads(line)
+            job_id = str(job.get('job_id', ''))
+            if 'output_path' not in job or not ('text' in job or 'text_file' in job):
+                raise ValueError("Job requires 'output_path' and either 'text' or 'text_file'")
+            render_profile = job.get('render_profile', generator.job_options['render_profile'])
+            if render_profile not in RENDER_PROFILES:
+                raise ValueError(f"Unknown render profile '{render_profile}'")
+            if 'text' in job:
+                full_text = job['text']
+            else:
+                with open(job['text_file'], 'r', encoding='utf-8') as f:
+                    full_text = f.read()
+        except Exception as e:
+            logger.error(f"Rejected job line: {e}")
+            generator.report('ERROR', job_id, f'Invalid job: {e}')
+            continue
+
+        title, body = split_title_body(full_text)
+        logger.info(f"Queued job {job_id}")
+        yield StoryJob(
+            job_id=job_id,
+            title=title,
+            body=body,
+            output_path=job['output_path'],
+            voice_type=job.get('voice_type', 'female'),
+            background_type=job.get('background_type', 'minecraft'),
+            render_backend=job.get('render_backend', 'moviepy'),
+            caption_mode=job.get('caption_mode', default_caption_mode),
+            normalize_background=job.get('normalize_background', True),
+            render_profile=render_profile
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a persistent video generation worker.')
+    parser.add_argument('--workers', type=int, default=1, help='Number of render processes')
+    parser.add_argument('--io-workers', type=int, default=4, help='Jobs whose TTS/background stages run concurrently')
+    parser.add_argument('--transcribe-workers', type=int, default=1, help='Concurrent caption jobs')
+    parser.add_argument('--whisper-model', default='base.en', help='Whisper model to keep loaded')
+    parser.add_argument('--transcription-backend', choices=TRANSCRIPTION_BACKENDS, help='Speech-to-text backend (default: $TRANSCRIPTION_BACKEND or whisper)')
+    parser.add_argument('--transcription-threads', type=int, help='CPU threads for speech-to-text (default: $TRANSCRIPTION_THREADS)')
+    parser.add_argument('--caption-mode', default='tts', choices=CAPTION_MODES, help='Default caption timing source for jobs')
+    parser.add_argument('--render-profile', default=DEFAULT_RENDER_PROFILE, choices=RENDER_PROFILES, help='Default output size and encoder settings for jobs')
+    args = parser.parse_args()
+
+    logger = setup_logger('video_worker_daemon')
+    logger.info(f"Starting video worker daemon with {args.workers} render worker(s)")
+
+    generator = BatchGenerator(
+        io_workers=args.io_workers,
+        render_workers=args.workers,
+        transcribe_workers=args.transcribe_workers,
+        caption_mode=args.caption_mode,
+        whisper_model=args.whisper_model,
+        transcription_backend=args.transcription_backend,
+        transcription_threads=args.transcription_threads,
+        render_profile=args.render_profile
+    )
+    # Load Whisper up front so the first job doesn't pay for it
+    if args.caption_mode == 'whisper':
+        generator.pipeline.caption_gen._load_model()
+
+    print('READY')
+    sys.stdout.flush()
+    try:
+        # stdin is read lazily: a full pipeline stops taking new jobs until it has room
+        generator.run_jobs(read_jobs(sys.stdin, generator, args.caption_mode))
+    finally:
+        logger.info("Video worker daemon stopped.")
+
+
+if __name__ == '__main__':
+    main()